@@ -0,0 +1,99 @@
+"""
+Micro-benchmark for CortexECSMapper.
+
+Compares the compiled mapping plan (map_to_ecs / map_many) against the
+previous per-event string-splitting walk over the YAML rules.
+
+Usage: python bench/bench_mapper.py [--events N] [--repeat R]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+
+from cortex_ecs_mapper import CortexECSMapper, ms_to_iso
+
+
+def legacy_map(mapper, alert):
+    # Reference: map_to_ecs as it ran before the compiled mapping plan
+    ts = ms_to_iso(alert["creation_time"]) if "creation_time" in alert else None
+    cat = alert.get("category", "").lower()
+    if cat in ["execution", "process", "script"]:
+        category = ["intrusion_detection"]
+    elif cat in ["network", "connection"]:
+        category = ["network_traffic"]
+    elif cat in ["file", "malware"]:
+        category = ["malware"]
+    else:
+        category = ["unknown"]
+    ecs_event = {
+        "@timestamp": ts,
+        "event": {
+            "id": alert.get("alert_id"),
+            "action": alert.get("name"),
+            "severity": alert.get("severity"),
+            "category": category,
+            "kind": "alert",
+            "outcome": "unknown",
+        },
+        "tags": ["cortex-xdr", "alert"],
+        "observer": {
+            "product": "Cortex XDR",
+            "vendor": "Palo Alto Networks",
+            "type": alert.get("category", "XDR"),
+        },
+    }
+    if alert.get("source_ip"):
+        ecs_event.setdefault("source", {})["ip"] = alert["source_ip"]
+    if alert.get("user_name"):
+        ecs_event.setdefault("user", {})["name"] = alert["user_name"]
+    if alert.get("host_name"):
+        ecs_event.setdefault("host", {})["name"] = alert["host_name"]
+    for mapping in mapper.mappings:
+        value = alert
+        for key in mapping["cortex_field"].split("."):
+            value = value.get(key) if isinstance(value, dict) else None
+        if value is not None:
+            mapper._set_nested_field(ecs_event, mapping["ecs_field"], value)
+    return ecs_event
+
+
+def load_alerts(n):
+    with open(ROOT / "data" / "fake_cortex_alerts.json") as f:
+        sample = json.load(f)
+    return [dict(sample[i % len(sample)], alert_id=str(i)) for i in range(n)]
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CortexECSMapper benchmark")
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    mapper = CortexECSMapper(ROOT / "config" / "cortex_ecs_mapping.yaml")
+    alerts = load_alerts(args.events)
+
+    results = {
+        "legacy map_to_ecs": timed(lambda: [legacy_map(mapper, a) for a in alerts], args.repeat),
+        "map_to_ecs": timed(lambda: [mapper.map_to_ecs(a) for a in alerts], args.repeat),
+        "map_many": timed(lambda: mapper.map_many(alerts), args.repeat),
+    }
+    for name, secs in results.items():
+        print(f"{name:<22} {secs * 1e6 / args.events:8.2f} us/event  {args.events / secs:12,.0f} events/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Cold-start benchmark for cron-style adapters/cortex_xdr.run_once runs.
+
+Each run is a fresh interpreter started against a fake Cortex API and a fake
+Logstash listener; the time from spawning it to the fake API receiving the
+first request is reported (median/min over --runs), next to a bare
+interpreter start for reference:
+
+  python     `python -c pass`
+  yaml       config/mapping parsed with yaml.safe_load on every run
+  cold       compiled config cache empty (parse + write the cache)
+  warm       compiled config cache up to date (no YAML parsing)
+
+Usage: python bench/bench_startup.py [--runs 15]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import yaml
+
+from fake_cortex import FakeCortexServer
+from fake_logstash import FakeLogstashServer
+from generator import make_alerts
+
+ROOT = Path(__file__).resolve().parents[1]
+
+CHILD = """
+import sys
+sys.path.insert(0, {src!r})
+import adapters.cortex_xdr as adapter
+mode, cfg_path, mapping_path, cache = sys.argv[1:5]
+if mode == "yaml":
+    import yaml
+    def load(path):
+        with open(path) as f:
+            return yaml.safe_load(f)
+else:
+    adapter.CONFIG_CACHE = adapter.ConfigCache(cache)
+    load = adapter.load_yaml
+adapter.run_once(load(cfg_path), load(mapping_path))
+"""
+
+
+def start_to_first_request(cortex, argv):
+    cortex.first_request_at = None
+    start = time.perf_counter()
+    subprocess.run(argv, check=True, capture_output=True)
+    total = time.perf_counter() - start
+    first = (cortex.first_request_at - start) if cortex.first_request_at else total
+    return first, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="run_once startup-to-first-request benchmark")
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--alerts", type=int, default=50, help="alerts served per run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            FakeCortexServer(make_alerts(args.alerts)) as cortex, FakeLogstashServer() as logstash:
+        tmp = Path(tmp)
+        # The shipped config, pointed at the fakes, without persistent state
+        with open(ROOT / "config" / "cortex_xdr.yaml") as f:
+            cfg = yaml.safe_load(f)
+        since = datetime.now(timezone.utc) - timedelta(hours=24)
+        cfg.update(api_url=cortex.url, mode="alerts", since=since.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                   checkpoint_file="", dedup={"enabled": False}, api={"retries": 0})
+        cfg["logstash"].update(host=logstash.address[0], port=logstash.address[1], spool=None)
+        cfg_path = tmp / "cortex_xdr.yaml"
+        cfg_path.write_text(yaml.safe_dump(cfg))
+        mapping_path = ROOT / "config" / "ecs_mapping_cortexxdr.yaml"
+        child = [sys.executable, "-c", CHILD.format(src=str(ROOT / "src"))]
+
+        results = {"python": [start_to_first_request(cortex, [sys.executable, "-c", "pass"]) for _ in range(args.runs)]}
+        for mode in ("yaml", "cold", "warm"):
+            runs = []
+            for i in range(args.runs + (mode == "warm")):
+                cache = tmp / (f"cache-{i}.marshal" if mode == "cold" else "cache.marshal")
+                runs.append(start_to_first_request(cortex, child + [mode, str(cfg_path), str(mapping_path), str(cache)]))
+            # The first warm run only fills the cache
+            results[mode] = runs[1:] if mode == "warm" else runs
+
+    print(f"{'mode':<8}{'first req ms (median)':>24}{'min':>8}{'run ms (median)':>18}")
+    for mode, runs in results.items():
+        first = [r[0] * 1000 for r in runs]
+        total = [r[1] * 1000 for r in runs]
+        print(f"{mode:<8}{statistics.median(first):>24.1f}{min(first):>8.1f}{statistics.median(total):>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
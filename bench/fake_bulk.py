@@ -0,0 +1,106 @@
+"""
+Local HTTP stand-in for an Elasticsearch `_bulk` endpoint or a Logstash
+`http` input.
+
+POST /_bulk expects action/source line pairs and answers with the
+per-item `items` array; any other path takes plain NDJSON documents and
+answers 200. Bodies may be gzip-compressed (Content-Encoding: gzip).
+`reject` maps a document's `event.id` to the item status to answer (e.g.
+429 or 400); a 429/5xx item is rejected only once, so a retry succeeds.
+`status_script` queues whole-request statuses for the next requests.
+"""
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeBulkServer:
+    def __init__(self, reject=None, host="127.0.0.1", port=0):
+        self.reject = dict(reject or {})
+        self.status_script = []
+        self.docs = []
+        self.requests = 0
+        self.compressed_bytes = 0
+        self.raw_bytes = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _item_status(self, doc):
+        doc_id = (doc.get("event") or {}).get("id", doc.get("event.id"))
+        status = self.reject.get(doc_id, 201)
+        if status == 429 or status >= 500:
+            del self.reject[doc_id]
+        return status
+
+    def _bulk(self, lines):
+        items = []
+        for action, source in zip(lines[::2], lines[1::2]):
+            op = next(iter(json.loads(action)))
+            doc = json.loads(source)
+            status = self._item_status(doc)
+            item = {"status": status}
+            if status < 300:
+                self.docs.append(doc)
+            else:
+                item["error"] = {"type": "fake_rejection", "reason": f"status {status}"}
+            items.append({op: item})
+        return {"took": 1, "errors": any(next(iter(i.values()))["status"] >= 300 for i in items), "items": items}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with server.lock:
+                    server.requests += 1
+                    server.compressed_bytes += len(body)
+                    if self.headers.get("Content-Encoding") == "gzip":
+                        body = gzip.decompress(body)
+                    server.raw_bytes += len(body)
+                    lines = body.splitlines()
+                    status = server.status_script.pop(0) if server.status_script else 200
+                    if status != 200:
+                        reply = {"error": f"status {status}"}
+                    elif self.path.split("?")[0].endswith("/_bulk"):
+                        reply = server._bulk(lines)
+                    else:
+                        server.docs.extend(json.loads(line) for line in lines)
+                        reply = {"ok": True}
+                payload = json.dumps(reply).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,116 @@
+"""
+Local stand-in for the Cortex XDR public API.
+
+Serves POST /public_api/v1/alerts/get_alerts and
+/public_api/v1/incidents/get_incidents over plain HTTP, honoring the
+creation_time "gte"/"lte" filters, search_from/search_to windows and ascending
+sort. Replies carry total_count like the real API. `latency` adds a fixed
+delay per request and `page_limit` caps the window size a reply returns.
+With `track` set, `served_at` maps each returned alert/incident ID to the
+time.perf_counter() of its first reply.
+"""
+import bisect
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeCortexServer:
+    ROUTES = {
+        "/public_api/v1/alerts/get_alerts": "alerts",
+        "/public_api/v1/incidents/get_incidents": "incidents",
+    }
+
+    def __init__(self, alerts=(), incidents=(), latency=0.0, page_limit=100, host="127.0.0.1", port=0):
+        self.data = {
+            "alerts": sorted(alerts, key=lambda d: d["creation_time"]),
+            "incidents": sorted(incidents, key=lambda d: d["creation_time"]),
+        }
+        self.times = {k: [d["creation_time"] for d in v] for k, v in self.data.items()}
+        self.latency = latency
+        self.page_limit = page_limit
+        self.requests = 0
+        self.first_request_at = None  # time.perf_counter() of the first POST
+        self.track = False
+        self.served_at = {}
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reply(self, key, request_data):
+        since, until = 0, None
+        for f in request_data.get("filters", []):
+            if f.get("field") == "creation_time" and f.get("operator") == "gte":
+                since = f["value"]
+            elif f.get("field") == "creation_time" and f.get("operator") == "lte":
+                until = f["value"]
+        times = self.times[key]
+        start = bisect.bisect_left(times, since)
+        end = len(times) if until is None else bisect.bisect_right(times, until)
+        frm = request_data.get("search_from", 0)
+        to = min(request_data.get("search_to", frm + self.page_limit), frm + self.page_limit)
+        items = self.data[key][min(start + frm, end):min(start + to, end)]
+        if self.track:
+            now = time.perf_counter()
+            id_field = f"{key[:-1]}_id"
+            with self.lock:
+                for item in items:
+                    self.served_at.setdefault(item[id_field], now)
+        return {"reply": {"total_count": max(0, end - start), "result_count": len(items), key: items}}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                key = server.ROUTES.get(self.path)
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if key is None:
+                    self.send_error(404)
+                    return
+                with server.lock:
+                    server.requests += 1
+                    if server.first_request_at is None:
+                        server.first_request_at = time.perf_counter()
+                if server.latency:
+                    time.sleep(server.latency)
+                payload = json.dumps(server.reply(key, json.loads(body).get("request_data", {}))).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    payload = gzip.compress(payload, compresslevel=1)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
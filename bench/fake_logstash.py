@@ -0,0 +1,104 @@
+"""
+Local TCP/TLS listener standing in for a Logstash json_lines input.
+
+Counts connections, bytes and newline-delimited events; payloads are
+discarded. Pass certfile/keyfile to terminate TLS. With `track` set, each
+event is decoded and `received_at` maps its event.id to the
+time.perf_counter() it arrived.
+"""
+import json
+import socketserver
+import ssl
+import threading
+import time
+
+
+class FakeLogstashServer:
+    def __init__(self, host="127.0.0.1", port=0, certfile=None, keyfile=None):
+        self.bytes = 0
+        self.events = 0
+        self.connections = 0
+        self.track = False
+        self.received_at = {}
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.ssl_context = None
+        if certfile:
+            self.ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            self.ssl_context.load_cert_chain(certfile, keyfile)
+        self.server = socketserver.ThreadingTCPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def address(self):
+        return self.server.server_address[:2]
+
+    def _handler(self):
+        listener = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                conn = self.request
+                if listener.ssl_context is not None:
+                    conn = listener.ssl_context.wrap_socket(conn, server_side=True)
+                with listener.lock:
+                    listener.connections += 1
+                partial = b""
+                while True:
+                    try:
+                        chunk = conn.recv(1024 * 1024)
+                    except OSError:
+                        break
+                    if not chunk:
+                        break
+                    if listener.track:
+                        partial = listener._record_ids(partial + chunk)
+                    with listener.changed:
+                        listener.bytes += len(chunk)
+                        listener.events += chunk.count(b"\n")
+                        listener.changed.notify_all()
+
+        return Handler
+
+    def _record_ids(self, data):
+        # Returns the trailing incomplete line
+        now = time.perf_counter()
+        *lines, rest = data.split(b"\n")
+        with self.lock:
+            for line in lines:
+                event_id = (json.loads(line).get("event") or {}).get("id")
+                if event_id is not None:
+                    self.received_at.setdefault(event_id, now)
+        return rest
+
+    def wait_for(self, events, timeout=60):
+        """Block until at least `events` lines were received; returns the count."""
+        deadline = time.monotonic() + timeout
+        with self.changed:
+            while self.events < events:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.changed.wait(remaining)
+            return self.events
+
+    def reset(self):
+        with self.lock:
+            self.bytes = self.events = self.connections = 0
+            self.received_at = {}
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,79 @@
+"""
+Synthetic Cortex XDR alerts and incidents, modeled on data/fake_cortex_*.json.
+
+Usage: python bench/generator.py --alerts 5000 --incidents 500 --field-size 512 > page.json
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _templates(name):
+    with open(ROOT / "data" / name) as f:
+        return json.load(f)
+
+
+def _pad(text, size, rng):
+    if len(text) >= size:
+        return text
+    filler = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz ") for _ in range(size - len(text) - 1))
+    return f"{text} {filler}"
+
+
+def make_alerts(n, start_ms=None, step_ms=100, field_size=0, seed=0):
+    """
+    `n` alerts with increasing creation_time starting at `start_ms` (default:
+    one hour ago). `field_size` pads description to that many characters.
+    """
+    rng = random.Random(seed)
+    templates = _templates("fake_cortex_alerts.json")
+    start_ms = start_ms if start_ms is not None else int(time.time() * 1000) - 3600 * 1000
+    alerts = []
+    for i in range(n):
+        alert = dict(templates[i % len(templates)])
+        alert["alert_id"] = str(100000 + i)
+        alert["creation_time"] = start_ms + i * step_ms
+        alert["source_ip"] = f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+        alert["host_name"] = f"WIN-{rng.randrange(1000):03d}"
+        alert["description"] = _pad(alert["description"], field_size, rng)
+        alerts.append(alert)
+    return alerts
+
+
+def make_incidents(n, start_ms=None, step_ms=1000, field_size=0, seed=0):
+    """`n` incidents, same conventions as make_alerts."""
+    rng = random.Random(seed)
+    templates = _templates("fake_cortex_incidents.json")
+    start_ms = start_ms if start_ms is not None else int(time.time() * 1000) - 3600 * 1000
+    incidents = []
+    for i in range(n):
+        incident = dict(templates[i % len(templates)])
+        incident["incident_id"] = f"INC-{10000 + i}"
+        incident["creation_time"] = start_ms + i * step_ms
+        incident["alert_count"] = rng.randrange(1, 50)
+        incident["hosts"] = [f"WS-{rng.randrange(1000):03d}" for _ in range(rng.randrange(1, 5))]
+        incident["description"] = _pad(incident["description"], field_size, rng)
+        incidents.append(incident)
+    return incidents
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic Cortex XDR data")
+    parser.add_argument("--alerts", type=int, default=1000)
+    parser.add_argument("--incidents", type=int, default=0)
+    parser.add_argument("--field-size", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    json.dump({
+        "alerts": make_alerts(args.alerts, field_size=args.field_size, seed=args.seed),
+        "incidents": make_incidents(args.incidents, field_size=args.field_size, seed=args.seed),
+    }, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+End-to-end throughput benchmark.
+
+Starts a fake Cortex API and a fake Logstash listener in this process, then
+runs each collector path in a fresh child process against them:
+
+  main      src/main.py main() against a generated config, for as many
+            poll cycles as it takes to drain the fake tenant
+  run_once  adapters/cortex_xdr.run_once, repeated --runs times
+
+Reports events/s, p50/p99 latency (per alert from the fake API reply to its
+arrival at the fake Logstash for `main`, per run for `run_once`), bytes
+shipped and the child's peak RSS.
+
+Usage: python bench/run_bench.py --alerts 20000 --incidents 2000 --latency-ms 20
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from fake_cortex import FakeCortexServer
+from fake_logstash import FakeLogstashServer
+from generator import make_alerts, make_incidents
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def scenario_main(api_url, logstash_addr, args):
+    sys.path.append(str(ROOT / "src"))
+    import main as collector
+    logging.basicConfig(level=logging.WARNING)
+
+    config = {
+        "cortex": {"url": api_url, "api_key": "bench", "api_key_id": 1},
+        "settings": {"initial_lookback_hours": 24, "mode": "both", "page_size": args.page_size,
+                     "max_events_per_poll": args.page_size, "polling_interval": 0.01,
+                     "dedup": {"enabled": True}},
+        "output": "logstash",
+        "logstash": {"host": logstash_addr[0], "port": logstash_addr[1],
+                     "use_ssl": args.tls, "ssl_verify": False},
+    }
+    # One poll cycle per page of the larger stream, plus one that finds it drained
+    cycles = -(-max(args.alerts, args.incidents) // args.page_size) + 1
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / "config.yaml"
+        config_path.write_text(json.dumps(config))  # JSON is valid YAML
+        start = time.perf_counter()
+        sent = collector.main(config_path=config_path, cycles=cycles)
+        elapsed = time.perf_counter() - start
+    # Latencies are measured by the parent, between the fake API and listener
+    return {"events": sent, "seconds": elapsed, "latencies": None, "peak_rss_mb": peak_rss_mb()}
+
+
+def scenario_run_once(api_url, logstash_addr, args):
+    sys.path.append(str(ROOT / "src"))
+    from adapters.cortex_xdr import load_yaml, run_once
+    logging.getLogger().setLevel(logging.WARNING)
+
+    since = datetime.now(timezone.utc) - timedelta(hours=24)
+    cfg = {
+        "api_fqdn": "bench.local", "api_url": api_url, "api_key": "bench", "api_key_id": 1,
+        "mode": "both", "since": since.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "page_size": args.page_size, "page_concurrency": args.concurrency,
+        "logstash": {"host": logstash_addr[0], "port": logstash_addr[1],
+                     "ssl": args.tls, "ssl_ca": args.tls_cert or ""},
+    }
+    mapping = load_yaml(ROOT / "config" / "ecs_mapping_cortexxdr.yaml")
+    events, durations = 0, []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        events += run_once(cfg, mapping)
+        durations.append(time.perf_counter() - start)
+    return {"events": events, "seconds": sum(durations), "latencies": durations, "peak_rss_mb": peak_rss_mb()}
+
+
+SCENARIOS = {"main": scenario_main, "run_once": scenario_run_once}
+
+
+def self_signed_cert(directory):
+    cert, key = Path(directory) / "cert.pem", Path(directory) / "key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+         "-keyout", str(key), "-out", str(cert)],
+        check=True, capture_output=True,
+    )
+    return str(cert), str(key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cortex XDR -> Logstash end-to-end benchmark")
+    parser.add_argument("--alerts", type=int, default=5000)
+    parser.add_argument("--incidents", type=int, default=500)
+    parser.add_argument("--field-size", type=int, default=256, help="pad descriptions to N chars")
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="fake API delay per request")
+    parser.add_argument("--page-limit", type=int, default=500, help="max items per API reply")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4, help="run_once page_concurrency")
+    parser.add_argument("--runs", type=int, default=3, help="run_once repetitions")
+    parser.add_argument("--tls", action="store_true", help="terminate TLS on the fake Logstash")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+    args.tls_cert = None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        certfile = keyfile = None
+        if args.tls:
+            certfile, keyfile = self_signed_cert(tmp)
+            args.tls_cert = certfile
+        cortex = FakeCortexServer(
+            make_alerts(args.alerts, field_size=args.field_size),
+            make_incidents(args.incidents, field_size=args.field_size),
+            latency=args.latency_ms / 1000, page_limit=args.page_limit,
+        )
+        results = {}
+        ctx = multiprocessing.get_context("spawn")
+        with cortex, FakeLogstashServer(certfile=certfile, keyfile=keyfile) as logstash:
+            for name in args.scenario or sorted(SCENARIOS):
+                logstash.reset()
+                cortex.requests = 0
+                cortex.served_at = {}
+                cortex.track = logstash.track = name == "main"
+                with ctx.Pool(1) as pool:
+                    res = pool.apply(SCENARIOS[name], (cortex.url, logstash.address, args))
+                received = logstash.wait_for(res["events"], timeout=30)
+                latencies = res.pop("latencies")
+                if latencies is None:
+                    with logstash.lock:
+                        arrived = dict(logstash.received_at)
+                    latencies = [arrived[i] - cortex.served_at[i] for i in arrived if i in cortex.served_at]
+                res.update(
+                    events_per_sec=res["events"] / res["seconds"] if res["seconds"] else 0.0,
+                    p50_ms=percentile(latencies, 0.50) * 1000,
+                    p99_ms=percentile(latencies, 0.99) * 1000,
+                    received=received, bytes=logstash.bytes,
+                    connections=logstash.connections, api_requests=cortex.requests,
+                )
+                results[name] = res
+
+    print(f"{'scenario':<10}{'events':>9}{'events/s':>12}{'p50 ms':>10}{'p99 ms':>10}"
+          f"{'MB sent':>10}{'API reqs':>10}{'conns':>7}{'RSS MB':>9}")
+    for name, r in results.items():
+        print(f"{name:<10}{r['events']:>9}{r['events_per_sec']:>12,.0f}{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+              f"{r['bytes'] / 1e6:>10.2f}{r['api_requests']:>10}{r['connections']:>7}{r['peak_rss_mb']:>9.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,112 @@
-import json, socket, ssl, logging
+import socket, ssl, logging, sys, hashlib, threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
 from datetime import datetime, timezone
 from pathlib import Path
-import requests, yaml
+
+# Only what every run needs is imported here; optional outputs, worker pools,
+# the profiler and the YAML parser are imported on first use (cron cold starts)
+try:
+    from ..api_transport import CortexTransport
+    from ..checkpoint_store import CheckpointStore
+    from ..config_cache import ConfigCache
+    from ..dedup import DedupIndex
+    from ..enrichment import DETAIL_SECTIONS, IncidentEnricher, detail_sections
+    from ..json_codec import get_codec
+    from ..normalize import BatchNormalizer
+    from ..spool import Spool
+except ImportError:
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from api_transport import CortexTransport
+    from checkpoint_store import CheckpointStore
+    from config_cache import ConfigCache
+    from dedup import DedupIndex
+    from enrichment import DETAIL_SECTIONS, IncidentEnricher, detail_sections
+    from json_codec import get_codec
+    from normalize import BatchNormalizer
+    from spool import Spool
 
 log = logging.getLogger("cortex_xdr")
-logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+def setup_logging():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
 SEV_MAP = {"informational":20,"low":30,"medium":60,"med":60,"high":80,"critical":90}
 
 def to_epoch_ms(dt_str): return int(datetime.fromisoformat(dt_str.replace("Z","+00:00")).timestamp()*1000)
 def ms_to_iso(ms): return datetime.fromtimestamp(ms/1000, tz=timezone.utc).isoformat()
 def sev_num(v): return int(v) if isinstance(v,(int,float)) else SEV_MAP.get(str(v).lower(),60)
+# Same conversions as ms_to_iso / sev_num, per page column and memoized
+NORMALIZER = BatchNormalizer(SEV_MAP, 60)
+
+# Repository root: config/ and state/ (relative state paths resolve against it)
+ROOT = Path(__file__).resolve().parents[2]
+
+# Parsed config/mapping files, reused while they are unchanged (mtime, then sha256)
+CONFIG_CACHE = ConfigCache(ROOT/"state"/"adapter-config-cache.marshal")
 
 def load_yaml(p):
-    with open(p, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    return CONFIG_CACHE.load(p)
 
 class LogstashSender:
-    def __init__(self, host, port, ssl_enabled=False, ssl_ca=None):
-        self.host, self.port, self.ssl_enabled, self.ssl_ca = host, port, ssl_enabled, ssl_ca
-    def send_batch(self, docs):
-        if not docs: return
+    def __init__(self, host, port, ssl_enabled=False, ssl_ca=None, spool=None, codec=None, chunk_docs=500):
+        self.host, self.port, self.ssl_enabled, self.ssl_ca, self.spool = host, port, ssl_enabled, ssl_ca, spool
+        self.codec = codec or get_codec()
+        self.chunk_docs = chunk_docs
+    def _connect(self):
         s = socket.create_connection((self.host, self.port), timeout=15)
         try:
             if self.ssl_enabled:
                 ctx = ssl.create_default_context(cafile=self.ssl_ca) if self.ssl_ca else ssl.create_default_context()
                 s = ctx.wrap_socket(s, server_hostname=self.host)
-            for d in docs:
-                s.sendall((json.dumps(d, ensure_ascii=False)+"\n").encode("utf-8"))
+            if self.spool is not None and not self.spool.empty():
+                log.info("Replayed %d spooled bytes", self.spool.drain(s.sendall))
+        except OSError:
+            s.close(); raise
+        return s
+    def send_batch(self, docs):
+        """
+        Stream `docs` (any iterable) over one connection, chunk_docs at a time.
+        Returns the number of docs sent or spooled.
+        """
+        dumps=self.codec.dumps; it=iter(docs)
+        def chunks():
+            while True:
+                part=list(islice(it, self.chunk_docs))
+                if not part: return
+                yield len(part), b"".join(dumps(d)+b"\n" for d in part)
+        return self.send_chunks(chunks())
+    def send_chunks(self, chunks):
+        """
+        Write pre-serialized (count, ndjson_bytes) chunks over one connection.
+        Once Logstash is unreachable the remainder goes to the spool (if any).
+        Returns the number of docs sent or spooled.
+        """
+        sock=None; down=False; n=0
+        try:
+            for count, data in chunks:
+                n+=count
+                if not down:
+                    try:
+                        if sock is None: sock=self._connect()
+                        sock.sendall(data); continue
+                    except OSError as e:
+                        if self.spool is None: raise
+                        down=True; log.error("Logstash unavailable (%s), spooling", e)
+                self.spool.append(data.splitlines(keepends=True))
+            if sock is None and not down and self.spool is not None and not self.spool.empty():
+                # Nothing new to send: still replay what an earlier run spooled
+                try: sock=self._connect()
+                except OSError as e: log.error("Logstash unavailable (%s), spool kept", e)
         finally:
-            s.close()
+            if sock is not None: sock.close()
+        return n
 
 class CortexXDR:
     def __init__(self, cfg):
-        self.base = f"https://{cfg['api_fqdn']}/public_api/v1"
+        self.base = f"{cfg.get('api_url') or 'https://'+cfg['api_fqdn']}/public_api/v1"
         self.headers = {
             "Authorization": cfg["api_key"],
             "x-xdr-auth-id": str(cfg["api_key_id"]),
@@ -43,56 +116,331 @@ class CortexXDR:
         self.verify = bool(cfg.get("verify_ssl", True))
         self.page = int(cfg.get("page_size", 200))
         self.mode = cfg.get("mode","incidents")
+        self.concurrency = max(1, int(cfg.get("page_concurrency", 1)))
+        # Keep-alive pool, optional token bucket and 429/5xx retries shared by every page request
+        self.transport = CortexTransport.from_config(cfg.get("api"), headers=self.headers,
+                                                     verify=self.verify, pool_size=self.concurrency)
+        self.session = self.transport.session
     def _post(self, path, body):
-        r = requests.post(f"{self.base}{path}", headers=self.headers, json=body, timeout=60, verify=self.verify)
-        r.raise_for_status(); return r.json()
-    def _paged(self, path, since_ms, key):
-        frm=0; out=[]
+        return self.transport.post(f"{self.base}{path}", body)
+    def _body(self, since_ms, frm, until_ms=None):
+        filters=[{"field":"creation_time","operator":"gte","value":since_ms}]
+        if until_ms is not None: filters.append({"field":"creation_time","operator":"lte","value":until_ms})
+        return {"request_data":{
+            "filters":filters,
+            "search_from":frm,"search_to":frm+self.page,
+            "sort":{"field":"creation_time","keyword":"asc"}}}
+    def _page(self, path, since_ms, key, frm, until_ms=None):
+        return (self._post(path, self._body(since_ms, frm, until_ms)).get("reply") or {}).get(key) or []
+    def _pages(self, path, since_ms, key, until_ms=None):
+        if self.concurrency > 1: return self._pages_parallel(path, since_ms, key, until_ms)
+        return self._pages_seq(path, since_ms, key, until_ms=until_ms)
+    def _pages_seq(self, path, since_ms, key, frm=0, until_ms=None):
         while True:
-            body={"request_data":{
-                "filters":[{"field":"creation_time","operator":"gte","value":since_ms}],
-                "search_from":frm,"search_to":frm+self.page,
-                "sort":{"field":"creation_time","keyword":"asc"}}}
-            data=self._post(path, body); items=(data.get("reply") or {}).get(key) or []
-            out.extend(items)
-            if len(items)<self.page: break
+            items=self._page(path, since_ms, key, frm, until_ms)
+            if items: yield items
+            if len(items)<self.page: return
             frm+=self.page
+    def _pages_parallel(self, path, since_ms, key, until_ms=None):
+        # First page tells us total_count; remaining windows are fetched concurrently,
+        # at most `concurrency` pages ahead of the consumer, and yielded in window order
+        reply=self._post(path, self._body(since_ms, 0, until_ms)).get("reply") or {}
+        first=reply.get(key) or []
+        if first: yield first
+        if len(first)<self.page: return
+        total=reply.get("total_count")
+        if total is None:
+            yield from self._pages_seq(path, since_ms, key, frm=self.page, until_ms=until_ms); return
+        windows=iter(range(self.page, int(total), self.page))
+        frm, last = None, []
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            fetch=lambda w: (w, pool.submit(self._page, path, since_ms, key, w, until_ms))
+            ahead=deque(fetch(w) for w in islice(windows, self.concurrency))
+            while ahead:
+                frm, fut = ahead.popleft()
+                nxt=next(windows, None)
+                if nxt is not None: ahead.append(fetch(nxt))
+                last=fut.result()
+                if last: yield last
+        # total_count may have grown while we were fetching
+        if frm is not None and len(last)>=self.page:
+            yield from self._pages_seq(path, since_ms, key, frm=frm+self.page, until_ms=until_ms)
+    def incident_details(self, incident_id, alerts_limit=1000):
+        body={"request_data":{"incident_id":str(incident_id),"alerts_limit":alerts_limit}}
+        return detail_sections(self._post("/incidents/get_incident_extra_data/", body))
+    def iter_incidents_since(self, since_ms, until_ms=None): return self._pages("/incidents/get_incidents", since_ms, "incidents", until_ms)
+    def iter_alerts_since(self, since_ms, until_ms=None):    return self._pages("/alerts/get_alerts", since_ms, "alerts", until_ms)
+    def get_incidents_since(self, since_ms, until_ms=None): return [i for p in self.iter_incidents_since(since_ms, until_ms) for i in p]
+    def get_alerts_since(self, since_ms, until_ms=None):    return [a for p in self.iter_alerts_since(since_ms, until_ms) for a in p]
+
+class RawPolicy:
+    """
+    What of the source document goes into panw.cortex_xdr.raw:
+    keep (all), allow (top-level `keys` only), truncate (compact JSON text cut
+    to `max_bytes` + full size) or hash (sha256 + size of the compact JSON).
+    Always an object, so the field keeps one mapping type. Counts the
+    raw bytes before/after for the run report (in-process mapping only).
+    """
+    def __init__(self, policy="keep", keys=(), max_bytes=4096, codec=None):
+        if policy not in ("keep","allow","truncate","hash"): raise ValueError(f"unknown raw policy: {policy}")
+        self.policy, self.keys, self.max_bytes = policy, tuple(keys), int(max_bytes)
+        self.dumps=(codec or get_codec()).dumps
+        self.before=self.after=0; self.lock=threading.Lock()
+    def __getstate__(self): return {k:v for k,v in self.__dict__.items() if k!="lock"}
+    def __setstate__(self, state): self.__dict__.update(state, lock=threading.Lock())
+    def __call__(self, doc):
+        body=self.dumps(doc)
+        if self.policy=="allow":
+            out={k:doc[k] for k in self.keys if k in doc}; size=len(self.dumps(out))
+        elif self.policy=="truncate":
+            out={"truncated":body[:self.max_bytes].decode("utf-8","ignore"),"size":len(body)}; size=len(self.dumps(out))
+        elif self.policy=="hash":
+            out={"sha256":hashlib.sha256(body).hexdigest(),"size":len(body)}; size=len(self.dumps(out))
+        else:
+            out=doc; size=len(body)
+        with self.lock: self.before+=len(body); self.after+=size
         return out
-    def get_incidents_since(self, since_ms): return self._paged("/incidents/get_incidents", since_ms, "incidents")
-    def get_alerts_since(self, since_ms):    return self._paged("/alerts/get_alerts", since_ms, "alerts")
+    def report(self):
+        if self.before: log.info("Raw payload (%s): %d -> %d bytes, %.1f%% saved", self.policy, self.before,
+                                 self.after, 100.0*(self.before-self.after)/self.before)
+
+def make_raw_policy(cfg):
+    """RawPolicy from the `raw:` block, or None to embed the whole document unmeasured."""
+    rcfg=cfg.get("raw") or {}
+    if rcfg.get("policy","keep")=="keep" and not rcfg.get("report"): return None
+    return RawPolicy(rcfg.get("policy","keep"), keys=rcfg.get("keys") or (), max_bytes=rcfg.get("max_bytes",4096),
+                     codec=get_codec((cfg.get("logstash") or {}).get("codec","auto")))
 
-def apply_mapping(doc, mapping):
+# Left out of the raw copy: the tenant tag, and incident details (already mapped fields)
+_NOT_RAW=("_tenant",)+DETAIL_SECTIONS
+
+def _finish(out, doc, raw):
+    if "_tenant" in doc: out["tenant"]=doc["_tenant"]
+    if any(k in doc for k in _NOT_RAW): doc={k:v for k,v in doc.items() if k not in _NOT_RAW}
+    out["panw.cortex_xdr.raw"]=raw(doc) if raw else doc
+    return out
+
+def apply_mapping(doc, mapping, raw=None):
     out={}
     for ecs_field, src in mapping["mappings"].items():
         is_array = ecs_field.endswith("[]")
         ecs_key   = ecs_field[:-2] if is_array else ecs_field
         value = doc.get(src)
-        if ecs_key=="@timestamp" and value is not None: value = ms_to_iso(value)
-        elif ecs_key=="event.severity" and value is not None: value = sev_num(value)
         if value is not None:
+            if ecs_key=="@timestamp": value = NORMALIZER.timestamp(value)
+            elif ecs_key=="event.severity": value = NORMALIZER.severity(value)
             if is_array and not isinstance(value, list): value=[value]
             out[ecs_key]=value
-    out["panw.cortex_xdr.raw"]=doc
-    return out
+    return _finish(out, doc, raw)
+
+def apply_mapping_many(docs, mapping, raw=None):
+    """apply_mapping over a page: each mapped field is read and normalized as one column."""
+    out=[{} for _ in docs]
+    for ecs_field, src in mapping["mappings"].items():
+        is_array = ecs_field.endswith("[]")
+        ecs_key   = ecs_field[:-2] if is_array else ecs_field
+        values = [doc.get(src) for doc in docs]
+        if ecs_key=="@timestamp": values = NORMALIZER.timestamps(values)
+        elif ecs_key=="event.severity": values = NORMALIZER.severities(values)
+        for o, value in zip(out, values):
+            if value is not None:
+                if is_array and not isinstance(value, list): value=[value]
+                o[ecs_key]=value
+    return [_finish(o, doc, raw) for o, doc in zip(out, docs)]
 
-def run_once():
-    root = Path(__file__).resolve().parents[1]
-    cfg = load_yaml(root/"config"/"cortex_xdr.yaml")
-    mapping = load_yaml(root/"config"/"ecs_mapping_cortexxdr.yaml")
+def make_sender(cfg, root):
+    if cfg.get("output","logstash")=="http":
+        try: from ..http_sender import HttpBulkSender
+        except ImportError: from http_sender import HttpBulkSender
+        return HttpBulkSender({"http_output": cfg["http_output"]})
+    lscfg=cfg["logstash"]
+    scfg=lscfg.get("spool") or {}
+    spool=Spool(root/scfg.get("dir","state/adapter-spool"), segment_bytes=int(scfg.get("segment_bytes",16*1024*1024)),
+                max_bytes=int(scfg.get("max_bytes",1024*1024*1024)), policy=scfg.get("policy","drop_oldest")) if scfg else None
+    return LogstashSender(lscfg["host"], int(lscfg["port"]),
+                          ssl_enabled=bool(lscfg.get("ssl",False)), ssl_ca=lscfg.get("ssl_ca") or None, spool=spool,
+                          codec=get_codec(lscfg.get("codec","auto")), chunk_docs=int(lscfg.get("chunk_docs",500)))
+
+def make_encoder(cfg, map_fn):
+    """ParallelEncoder when parallel.workers > 0, else None (map + serialize in-process)."""
+    pcfg=cfg.get("parallel") or {}
+    if not int(pcfg.get("workers",0)): return None
+    try: from ..parallel_encoder import ParallelEncoder
+    except ImportError: from parallel_encoder import ParallelEncoder
+    return ParallelEncoder(map_fn, codec=(cfg.get("logstash") or {}).get("codec","auto"),
+                           workers=int(pcfg["workers"]), chunk_docs=int(pcfg.get("chunk_docs",500)))
+
+def ship(sender, encoder, pages, map_page, profiler=None):
+    """Map (map_page: one page -> docs) and send raw pages, in worker processes when `encoder` is set."""
+    if profiler:
+        # Page at a time so fetch/map/serialize are measured apart from the socket writes
+        return profiler.call("send", sender.send_chunks, profiler.chunks(pages, map_page, sender.codec.dumps))
+    if encoder: return sender.send_chunks(encoder.encode(pages))
+    return sender.send_batch(d for page in pages for d in map_page(page))
+
+def streams_for(cfg, xdr):
+    """(stream, page iterator factory) pairs enabled by `mode`."""
+    mode=cfg.get("mode","incidents")
+    return [(stream, pages) for stream, pages in (("incidents", xdr.iter_incidents_since), ("alerts", xdr.iter_alerts_since))
+            if mode in (stream,"both")]
+
+def tenant_cfgs(cfg):
+    """One config per `tenants:` entry (overriding top-level keys, named by `name`), or just cfg."""
+    tenants=cfg.get("tenants") or []
+    out=[{**cfg, **t, "api": {**(cfg.get("api") or {}), **(t.get("api") or {})},
+          "tenant": t.get("name") or t["api_fqdn"], "tag_tenant": True} for t in tenants]
+    if len({t["tenant"] for t in out})<len(out): raise ValueError("duplicate tenant names")
+    return out or [cfg]
+
+def run_once(cfg=None, mapping=None, profiler=None):
+    """
+    One incremental pull for every tenant: tenants are fetched on a shared
+    thread pool (tenant_workers) and share the checkpoint store, dedup
+    index, encoder and Logstash output. Returns the number of docs sent.
+    With a StageProfiler, mapping stays in-process and every stage is profiled.
+    """
+    cfg = cfg or load_yaml(ROOT/"config"/"cortex_xdr.yaml")
+    mapping = mapping or load_yaml(ROOT/"config"/"ecs_mapping_cortexxdr.yaml")
+    ckpt = CheckpointStore(ROOT/cfg["checkpoint_file"] if cfg.get("checkpoint_file") else None)
+    dcfg = cfg.get("dedup") or {}
+    dedup = DedupIndex(max_size=int(dcfg.get("max_size",100000)), ttl=float(dcfg.get("ttl_seconds",86400)),
+                       path=ROOT/dcfg["file"] if dcfg.get("file") else None) if dcfg.get("enabled") else None
+    raw=make_raw_policy(cfg); map_page=partial(apply_mapping_many, mapping=mapping, raw=raw)
+    sender=make_sender(cfg, ROOT)
+    encoder=None if profiler else make_encoder(cfg, partial(apply_mapping, mapping=mapping, raw=raw))
+    tenants=tenant_cfgs(cfg)
+    sent, failed = 0, []
+    try:
+        with ThreadPoolExecutor(max_workers=min(len(tenants), int(cfg.get("tenant_workers",8)))) as pool:
+            futures=[(t, pool.submit(run_tenant, t, map_page, ckpt, dedup, sender, encoder, profiler)) for t in tenants]
+            # Every tenant runs to completion; one failing does not cost the others their dedup entries
+            for t, future in futures:
+                try: sent+=future.result()
+                except Exception as e:
+                    log.error("Tenant %s failed: %s", t.get("tenant") or t.get("api_fqdn"), e); failed.append(e)
+    finally:
+        if encoder: encoder.close()
+        if dedup: dedup.save(); log.info("Dedup: %s", dedup.stats())
+    if raw: raw.report()
+    if failed: raise failed[0]
+    return sent
+
+# Incident-details caches by tenant, kept across runs of a long-lived process
+_enrichers={}
+
+def make_enricher(cfg, xdr, tenant):
+    """IncidentEnricher fetching through `xdr` when enrichment.enabled, else None."""
+    ecfg=cfg.get("enrichment") or {}
+    enricher=_enrichers.get(tenant) or IncidentEnricher.from_config(None, ecfg)
+    if enricher is None: return None
+    _enrichers[tenant]=enricher
+    enricher.fetch_details=partial(xdr.incident_details, alerts_limit=int(ecfg.get("alerts_limit",1000)))
+    return enricher
+
+def run_tenant(cfg, map_page, ckpt, dedup, sender, encoder, profiler=None):
+    since_ms = to_epoch_ms(cfg.get("since","1970-01-01T00:00:00Z"))
+    tenant = cfg.get("tenant") or cfg["api_fqdn"]
+    tag = cfg.get("tag_tenant")
+    xdr = CortexXDR(cfg)
+    enricher = make_enricher(cfg, xdr, tenant)
+    marks={}; counts={}
+    def raw_pages():
+        # Pages are mapped and shipped as they arrive; memory stays bounded by page size
+        for stream, pages in streams_for(cfg, xdr):
+            counts[stream]=0
+            for items in pages(max(since_ms, ckpt.get(stream, tenant, since_ms))):
+                counts[stream]+=len(items)
+                marks[stream]=max(marks.get(stream,0), max(i.get("creation_time") or 0 for i in items))
+                if tag:
+                    for i in items: i["_tenant"]=tenant
+                if dedup: items=dedup.filter(items)
+                # After dedup: details are only fetched for new or modified incidents
+                if enricher and stream=="incidents" and items: enricher.enrich(items)
+                if items: yield items
+
+    sent=ship(sender, encoder, raw_pages(), map_page, profiler)
+    for stream, n in counts.items(): log.info("%s %s: %d", tenant, stream, n)
+    log.info("%s: sent to Logstash: %d docs", tenant, sent)
+    # Only advance once the documents are shipped
+    for stream, mark in marks.items(): ckpt.advance(stream, mark, tenant)
+    return sent
+
+def backfill(cfg=None, mapping=None):
+    """
+    Historical backfill: split [since, until) into windows, fetch/map/send each
+    window on a bounded worker pool and record finished windows so an
+    interrupted backfill resumes where it stopped. Returns docs shipped.
+    """
+    cfg = cfg or load_yaml(ROOT/"config"/"cortex_xdr.yaml")
+    mapping = mapping or load_yaml(ROOT/"config"/"ecs_mapping_cortexxdr.yaml")
+    bcfg = cfg.get("backfill") or {}
     since_ms = to_epoch_ms(cfg.get("since","1970-01-01T00:00:00Z"))
+    until_ms = to_epoch_ms(bcfg["until"]) if bcfg.get("until") else int(datetime.now(timezone.utc).timestamp()*1000)
+    step = max(1, int(float(bcfg.get("window_hours",6))*3600*1000))
+    workers = max(1, int(bcfg.get("workers",4)))
+    tenant = cfg.get("tenant") or cfg["api_fqdn"]
+    mode = cfg.get("mode","incidents")
+    progress = CheckpointStore(ROOT/bcfg.get("state_file","state/adapter-backfill.json"))
+    ckpt = CheckpointStore(ROOT/cfg["checkpoint_file"] if cfg.get("checkpoint_file") else None)
+
+    windows=[(s, min(s+step, until_ms)) for s in range(since_ms, until_ms, step)]
+    # Window start -> end of the range shipped so far (a later `until` extends the tail window)
+    key=lambda w: f"{mode}:{w[0]}"
+    done={w: progress.get(key(w), tenant, w[0]) for w in windows}
+    todo=[w for w in windows if done[w]<w[1]]
+    log.info("Backfill %s..%s: %d windows, %d already done", ms_to_iso(since_ms), ms_to_iso(until_ms),
+             len(windows), len(windows)-len(todo))
 
     xdr = CortexXDR(cfg)
-    docs=[]
-    if cfg.get("mode","incidents") in ("incidents","both"):
-        incs=xdr.get_incidents_since(since_ms); log.info("Incidents: %d", len(incs))
-        docs += [apply_mapping(i, mapping) for i in incs]
-    if cfg.get("mode","incidents") in ("alerts","both"):
-        alrts=xdr.get_alerts_since(since_ms); log.info("Alerts: %d", len(alrts))
-        docs += [apply_mapping(a, mapping) for a in alrts]
+    pool_size = workers*xdr.concurrency
+    from requests.adapters import HTTPAdapter
+    for prefix in ("https://","http://"): xdr.session.mount(prefix, HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+    sender = make_sender(cfg, ROOT)
+    raw = make_raw_policy(cfg)
+    map_page = partial(apply_mapping_many, mapping=mapping, raw=raw)
+    encoder = make_encoder(cfg, partial(apply_mapping, mapping=mapping, raw=raw))
+    def work(w):
+        n=0
+        for stream, pages in streams_for(cfg, xdr):
+            # Each window's documents stream straight to the output; nothing accumulates
+            n+=ship(sender, encoder, pages(done[w], w[1]-1), map_page)
+        progress.advance(key(w), w[1], tenant)
+        log.info("Window %s: %d docs", ms_to_iso(w[0]), n)
+        return n
 
-    lscfg=cfg["logstash"]
-    sender=LogstashSender(lscfg["host"], int(lscfg["port"]),
-                          ssl_enabled=bool(lscfg.get("ssl",False)), ssl_ca=lscfg.get("ssl_ca") or None)
-    sender.send_batch(docs); log.info("Sent to Logstash: %d docs", len(docs))
+    total=0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for n in pool.map(work, todo): total+=n
+    finally:
+        if encoder: encoder.close()
+    # Everything before until_ms is shipped: incremental runs continue from there
+    for stream, _ in streams_for(cfg, xdr): ckpt.advance(stream, until_ms-1, tenant)
+    log.info("Backfill done: %d docs", total)
+    if raw: raw.report()
+    return total
+
+def profile(runs=1, directory=None):
+    """run_once `runs` times under a StageProfiler, then write report.txt and the .pstats files."""
+    try: from ..profiler import StageProfiler
+    except ImportError: from profiler import StageProfiler
+    profiler = StageProfiler().start()
+    try:
+        for _ in range(runs): run_once(profiler=profiler)
+    finally:
+        report = profiler.write(directory or ROOT/"state"/"adapter-profile"); profiler.stop()
+    log.info("Profile report: %s", report)
+    return report
 
-if __name__=="__main__": run_once()
+if __name__=="__main__":
+    import argparse
+    ap=argparse.ArgumentParser(description="Cortex XDR -> ECS -> Logstash adapter")
+    ap.add_argument("--backfill", action="store_true", help="time-sliced parallel backfill from `since`")
+    ap.add_argument("--profile", type=int, default=0, metavar="RUNS",
+                    help="profile RUNS runs per stage (fetch, map, serialize, send)")
+    ap.add_argument("--profile-dir", metavar="DIR", help="report + .pstats output (default: state/adapter-profile)")
+    args=ap.parse_args()
+    setup_logging()
+    if args.backfill: backfill()
+    elif args.profile: profile(args.profile, args.profile_dir)
+    else: run_once()
@@ -0,0 +1,128 @@
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Status codes worth retrying: quota exhausted and transient server errors
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second with bursts up to `burst`."""
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, rate))
+        self.tokens = self.burst
+        self.clock = clock
+        self.sleep = sleep
+        self.last = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            # Reserve the token now; a negative balance is the wait before it is ours
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            self.sleep(wait)
+
+
+def retry_after_seconds(value):
+    """Parse a Retry-After header (delta-seconds or HTTP-date); None if absent or invalid."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class CortexTransport:
+    """
+    Shared HTTP transport for the Cortex XDR public API.
+
+    One keep-alive connection pool per client, gzip-compressed replies
+    (decoded by requests), an optional token-bucket limiter sized to the
+    tenant's API quota, and retries with exponential backoff and full jitter
+    on connection errors, 429 and 5xx replies, honoring Retry-After up to
+    `max_retry_after` seconds.
+    """
+    def __init__(self, headers=None, verify=True, timeout=60, pool_size=10,
+                 rate_limit=None, burst=None, retries=4, backoff=0.5, max_backoff=30.0,
+                 max_retry_after=300.0):
+        self.logger = logging.getLogger(__name__)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Accept-Encoding": "gzip", **(headers or {})})
+        self.verify = verify
+        self.timeout = timeout
+        self.limiter = TokenBucket(rate_limit, burst) if rate_limit else None
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.sleep = time.sleep
+
+    @classmethod
+    def from_config(cls, api_cfg, headers=None, verify=True, pool_size=10):
+        """Build from an `api:` config block (all keys optional)."""
+        api_cfg = api_cfg or {}
+        return cls(
+            headers=headers, verify=verify,
+            timeout=api_cfg.get('timeout', 60),
+            pool_size=api_cfg.get('pool_size', pool_size),
+            rate_limit=api_cfg.get('rate_limit'),
+            burst=api_cfg.get('burst'),
+            retries=api_cfg.get('retries', 4),
+            backoff=api_cfg.get('backoff', 0.5),
+            max_backoff=api_cfg.get('max_backoff', 30.0),
+            max_retry_after=api_cfg.get('max_retry_after', 300.0),
+        )
+
+    def _delay(self, attempt, retry_after=None):
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if retry_after is not None and retry_after > self.max_retry_after:
+            self.logger.warning(f"Retry-After of {retry_after:.0f}s capped to {self.max_retry_after:g}s")
+            retry_after = self.max_retry_after
+        return max(delay, retry_after or 0)
+
+    def post(self, url, body):
+        """POST `body` as JSON and return the decoded reply, retrying transient failures."""
+        for attempt in range(self.retries + 1):
+            if self.limiter is not None:
+                self.limiter.acquire()
+            retry_after = None
+            try:
+                r = self.session.post(url, json=body, timeout=self.timeout, verify=self.verify)
+                r.raise_for_status()
+                return r.json()
+            except requests.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status not in RETRY_STATUSES or attempt == self.retries:
+                    raise
+                retry_after = retry_after_seconds(e.response.headers.get("Retry-After"))
+                reason = f"HTTP {status}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.retries:
+                    raise
+                reason = str(e)
+            delay = self._delay(attempt, retry_after)
+            self.logger.warning(f"Cortex API request failed ({reason}), retry {attempt + 1}/{self.retries} in {delay:.1f}s")
+            self.sleep(delay)
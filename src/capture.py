@@ -0,0 +1,138 @@
+import bisect
+import heapq
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+
+try:
+    from .json_codec import get_codec
+except ImportError:
+    from json_codec import get_codec
+
+# One index entry per recorded reply: capture time (ms), first creation_time
+# (ms), byte offset of its first line, number of events
+INDEX_ENTRY = struct.Struct("<qqQI")
+
+
+class CaptureWriter:
+    """
+    Records Cortex API replies as compact NDJSON segments, one event per line.
+
+    Each stream gets its own `<stream>-<seq>.ndjson` segments, rotated at
+    `segment_bytes`, and a binary `<stream>-<seq>.idx` with one fixed-size
+    entry per reply (capture time, first creation_time, offset, count), so a
+    reader can seek to a time window and reproduce the original timing.
+    """
+    def __init__(self, directory, segment_bytes=64 * 1024 * 1024, codec="auto"):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.dumps = get_codec(codec).dumps
+        self.lock = threading.Lock()
+        self.open = {}  # stream -> (seq, data file, index file)
+
+    def _files(self, stream):
+        current = self.open.get(stream)
+        if current is not None and current[1].tell() < self.segment_bytes:
+            return current
+        if current is not None:
+            current[1].close()
+            current[2].close()
+        seq = max((int(p.stem.rsplit("-", 1)[1]) for p in self.directory.glob(f"{stream}-*.ndjson")), default=0) + 1
+        current = self.open[stream] = (
+            seq,
+            open(self.directory / f"{stream}-{seq:06d}.ndjson", "ab"),
+            open(self.directory / f"{stream}-{seq:06d}.idx", "ab"),
+        )
+        return current
+
+    def record(self, stream, events, captured_ms=None):
+        """Append one reply's `events`; empty replies are not recorded."""
+        if not events:
+            return
+        captured_ms = int(time.time() * 1000) if captured_ms is None else captured_ms
+        dumps = self.dumps
+        data = b"".join([dumps(event) + b"\n" for event in events])
+        with self.lock:
+            _, data_file, index_file = self._files(stream)
+            offset = data_file.tell()
+            data_file.write(data)
+            data_file.flush()
+            index_file.write(INDEX_ENTRY.pack(captured_ms, events[0].get("creation_time") or 0, offset, len(events)))
+            index_file.flush()
+
+    def close(self):
+        with self.lock:
+            for _, data_file, index_file in self.open.values():
+                data_file.close()
+                index_file.close()
+            self.open.clear()
+
+
+class CaptureReader:
+    """
+    Replays a capture written by CaptureWriter.
+
+    Segments are memory-mapped and decoded one reply at a time, so memory
+    stays bounded by the largest reply whatever the capture size. The index
+    locates the first reply of a `since_ms` window by bisection.
+    """
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.loads = json.loads
+
+    def streams(self):
+        return sorted({p.stem.rsplit("-", 1)[0] for p in self.directory.glob("*.ndjson")})
+
+    def _segments(self, stream):
+        return sorted(self.directory.glob(f"{stream}-*.ndjson"))
+
+    @staticmethod
+    def _index(path):
+        raw = path.with_suffix(".idx").read_bytes()
+        return [INDEX_ENTRY.unpack_from(raw, i) for i in range(0, len(raw) - len(raw) % INDEX_ENTRY.size, INDEX_ENTRY.size)]
+
+    def batches(self, stream, since_ms=None, until_ms=None):
+        """Yield (captured_ms, events) per recorded reply of `stream`, optionally limited to a creation_time window."""
+        for path in self._segments(stream):
+            index = self._index(path)
+            if not index or os.path.getsize(path) == 0:
+                continue
+            start = 0
+            if since_ms is not None:
+                # Last reply starting at or before since_ms may still hold matching events
+                start = max(0, bisect.bisect_right([entry[1] for entry in index], since_ms) - 1)
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for i in range(start, len(index)):
+                    captured_ms, first_ms, offset, count = index[i]
+                    if until_ms is not None and first_ms > until_ms:
+                        return
+                    end = index[i + 1][2] if i + 1 < len(index) else len(mm)
+                    events = [self.loads(line) for line in mm[offset:end].splitlines()]
+                    if since_ms is not None or until_ms is not None:
+                        events = [e for e in events
+                                  if (since_ms is None or (e.get("creation_time") or 0) >= since_ms)
+                                  and (until_ms is None or (e.get("creation_time") or 0) <= until_ms)]
+                    if events:
+                        yield captured_ms, events
+
+    def replay(self, streams=None, speed=0, since_ms=None, until_ms=None, sleep=time.sleep):
+        """
+        Yield the replies of `streams` (default: all) merged in capture order.
+        `speed` 0 replays as fast as possible; 1.0 reproduces the original
+        gaps between replies, 2.0 halves them, and so on.
+        """
+        sources = [
+            ((captured_ms, n, events) for n, (captured_ms, events) in enumerate(self.batches(s, since_ms, until_ms)))
+            for s in (streams or self.streams())
+        ]
+        previous = None
+        for captured_ms, _, events in heapq.merge(*sources, key=lambda item: item[:2]):
+            if speed and previous is not None and captured_ms > previous:
+                sleep((captured_ms - previous) / 1000 / speed)
+            previous = captured_ms
+            yield events
@@ -0,0 +1,77 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+
+class CheckpointStore:
+    """
+    Crash-safe watermark store, one value per (tenant, stream).
+
+    State is a small JSON document rewritten atomically on every advance:
+    written to a temp file in the same directory, fsync'd, then renamed over
+    the previous file. A crash leaves either the old or the new state, never
+    a torn file. Without a path the store is in-memory only.
+    """
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self.logger = logging.getLogger(__name__)
+        self.lock = threading.Lock()
+        self.state = self._load()
+
+    def _load(self):
+        if self.path is None or not self.path.exists():
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Failed to load checkpoints from {self.path}: {str(e)}")
+            return {}
+
+    def get(self, stream, tenant="default", default=None):
+        with self.lock:
+            return self.state.get(tenant, {}).get(stream, default)
+
+    def advance(self, stream, value, tenant="default"):
+        """Move the watermark forward; older values are ignored. Returns True if it moved."""
+        with self.lock:
+            streams = self.state.setdefault(tenant, {})
+            current = streams.get(stream)
+            if current is not None and value <= current:
+                return False
+            streams[stream] = value
+            self._write()
+            return True
+
+    def _write(self):
+        if self.path is None:
+            return
+        write_atomic(self.path, json.dumps(self.state, sort_keys=True).encode("utf-8"))
+
+
+def write_atomic(path, data):
+    """
+    Replace `path` with `data` (bytes) crash-safely: write a temp file in the
+    same directory, fsync it, rename it over `path` and fsync the directory.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=path.name, suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    # Persist the rename itself
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
@@ -0,0 +1,75 @@
+import hashlib
+import marshal
+import os
+import sys
+from pathlib import Path
+
+# Cache files from another layout or interpreter (marshal format) are rebuilt
+CACHE_VERSION = (1, marshal.version, sys.version_info[:2])
+
+
+class ConfigCache:
+    """
+    Parsed YAML files kept in one marshal file, so short one-shot runs skip
+    importing and running the YAML parser while nothing has changed.
+
+    An entry is reused as is while the file's mtime and size match; when
+    they differ the file is hashed and only re-parsed if its content did
+    change. The cache is rewritten (atomically) only when an entry changes.
+    Files whose parsed form marshal cannot store (e.g. YAML dates) are
+    simply parsed every time.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = None  # absolute path -> ((mtime_ns, size), sha256, parsed)
+        self.hits = 0
+        self.misses = 0
+
+    def _load_entries(self):
+        if self.entries is None:
+            try:
+                version, entries = marshal.loads(self.path.read_bytes())
+                self.entries = entries if version == CACHE_VERSION else {}
+            except (OSError, ValueError, EOFError, TypeError):
+                self.entries = {}
+        return self.entries
+
+    def load(self, source):
+        """Parsed content of the YAML file `source`."""
+        entries = self._load_entries()
+        key = os.path.abspath(source)
+        st = os.stat(key)
+        stamp = (st.st_mtime_ns, st.st_size)
+        entry = entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            self.hits += 1
+            return entry[2]
+        with open(key, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).digest()
+        if entry is not None and entry[1] == digest:
+            # Touched but unchanged
+            self.hits += 1
+            value = entry[2]
+        else:
+            self.misses += 1
+            import yaml
+            value = yaml.load(data, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+            try:
+                marshal.dumps(value)
+            except ValueError:
+                entries.pop(key, None)
+                return value
+        entries[key] = (stamp, digest, value)
+        self.save()
+        return value
+
+    def save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_bytes(marshal.dumps((CACHE_VERSION, self.entries)))
+            os.replace(tmp, self.path)
+        except OSError:
+            # Read-only state directory: the cache is an optimization only
+            pass
@@ -1,119 +1,257 @@
-import requests
 import logging
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from pathlib import Path
+
+try:
+    from .api_transport import CortexTransport
+    from .capture import CaptureReader, CaptureWriter
+    from .checkpoint_store import CheckpointStore
+    from .enrichment import IncidentEnricher, detail_sections
+    from .json_codec import iter_json_array
+except ImportError:
+    from api_transport import CortexTransport
+    from capture import CaptureReader, CaptureWriter
+    from checkpoint_store import CheckpointStore
+    from enrichment import IncidentEnricher, detail_sections
+    from json_codec import iter_json_array
+
+
+def _repo_path(path):
+    if path and not Path(path).is_absolute():
+        return Path(__file__).parent.parent / path
+    return Path(path) if path else path
+
+
+def checkpoint_path(config):
+    """settings.checkpoint_file resolved against the repo root (None = in-memory)."""
+    return _repo_path(config['settings'].get('checkpoint_file'))
 
 
 class CortexXDR:
-    def __init__(self, config):
+    def __init__(self, config, checkpoints=None):
         self.base_url = config['cortex']['url']
         self.api_key = config['cortex']['api_key']
         self.api_key_id = config['cortex']['api_key_id']
+        self.tenant = config['cortex'].get('tenant', 'default')
+        # Events of an explicitly named tenant carry it as `_tenant` (-> ECS `tenant`)
+        self.tag_tenant = 'tenant' in config['cortex']
         self.mode = config.get('settings', {}).get('mode', 'alerts')  # "alerts", "incidents", or "both"
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.transport = CortexTransport.from_config(config['cortex'].get('api'), headers={
             "Authorization": f"Bearer {self.api_key}",
             "x-xdr-auth-id": str(self.api_key_id),
             "Content-Type": "application/json"
         })
+        self.session = self.transport.session
         self.logger = logging.getLogger(__name__)
-        self.last_fetch_time = datetime.utcnow() - timedelta(
+        # Used for a stream until it has a stored checkpoint
+        self.initial_fetch_time = datetime.now(timezone.utc) - timedelta(
             hours=config['settings'].get('initial_lookback_hours', 24)
         )
+        # Tenants polled from one process share a single store (one file writer)
+        self.checkpoints = checkpoints or CheckpointStore(checkpoint_path(config))
+        self.page_size = config['settings'].get('page_size', 100)
+        # IDs already returned at each stream's watermark (the "gte" filter re-sends them)
+        self.boundary_ids = {}
+        # Whether the last fetch of a stream stopped at max_results with more pending
+        self.has_more = {}
+        # Fetched-up-to watermark per stream; stored only once the batch is shipped
+        self.watermarks = {}
+        # id(batch) -> (batch, stream, watermark, boundary IDs, epoch) awaiting acknowledge()
+        self.pending = {}
+        # stream -> (watermark, boundary IDs) after its last shipped batch
+        self.acked = {}
+        # stream -> number of rewinds; batches fetched before a rewind are fetched again
+        self.epochs = {}
+        self.lock = threading.Lock()
+        # Optional linked alerts/artifacts per incident, cached per incident version
+        self.enrich_cfg = config['settings'].get('enrichment') or {}
+        self.enricher = IncidentEnricher.from_config(self.incident_details, self.enrich_cfg)
+        # Optional recording of every fetched reply for offline replay
+        capture_cfg = config['settings'].get('capture') or {}
+        self.capture = None
+        if capture_cfg.get('enabled', False):
+            self.capture = CaptureWriter(
+                _repo_path(capture_cfg.get('dir', 'state/capture')) / self.tenant,
+                segment_bytes=capture_cfg.get('segment_bytes', 64 * 1024 * 1024),
+            )
 
-    def get_alerts(self, max_results=100):
+    def since_ms(self, stream):
+        """Watermark (epoch ms) to resume `stream` ("alerts" or "incidents") from."""
+        if stream in self.watermarks:
+            return self.watermarks[stream]
+        return self.checkpoints.get(
+            stream, tenant=self.tenant,
+            default=int(self.initial_fetch_time.timestamp() * 1000)
+        )
+
+    def _fetch(self, stream, max_results):
+        """
+        Fetch up to `max_results` events of `stream` since its watermark,
+        paging by `page_size`. The watermark moves on in memory; the stored
+        checkpoint follows once acknowledge() reports the batch shipped.
         """
-        Fetch alerts from Cortex XDR API since last_fetch_time.
+        url = f"{self.base_url}/public_api/v1/{stream}/get_{stream}"
+        with self.lock:
+            since = self.since_ms(stream)
+            epoch = self.epochs.get(stream, 0)
+            # IDs already returned at the watermark timestamp (the "gte" filter re-sends them)
+            seen = self.boundary_ids.get(stream, set())
+        id_field = f"{stream[:-1]}_id"
+        items = []
+        offset = 0
+        while len(items) < max_results:
+            size = min(self.page_size, max_results - len(items))
+            payload = {
+                "request_data": {
+                    "search_from": offset,
+                    "search_to": offset + size,
+                    "filters": [{
+                        "field": "creation_time",
+                        "operator": "gte",
+                        "value": since
+                    }],
+                    "sort": {"field": "creation_time", "keyword": "asc"}
+                }
+            }
+            data = self.transport.post(url, payload)
+            page = data.get("reply", {}).get(stream, [])
+            offset += len(page)
+            # Repeats are dropped before counting against the budget, so a
+            # watermark shared by max_results or more events is paged past
+            if seen:
+                page_items = [i for i in page if i["creation_time"] != since or i.get(id_field) not in seen]
+            else:
+                page_items = page
+            items.extend(page_items)
+            if len(page) < size:
+                self.has_more[stream] = False
+                break
+        else:
+            self.has_more[stream] = True
+
+        if items:
+            latest_ts = max(i["creation_time"] for i in items)
+            latest_ids = {i.get(id_field) for i in items if i["creation_time"] == latest_ts}
+            boundary = seen | latest_ids if latest_ts == since else latest_ids
+            with self.lock:
+                # A rewind while fetching: this batch is acknowledged as stale
+                if self.epochs.get(stream, 0) == epoch:
+                    self.boundary_ids[stream] = boundary
+                    self.watermarks[stream] = latest_ts
+
+        if self.capture is not None:
+            self.capture.record(stream, items)
+        if self.tag_tenant:
+            for item in items:
+                item["_tenant"] = self.tenant
+        if items:
+            self.pending[id(items)] = (items, stream, latest_ts, boundary, epoch)
+        return items
+
+    def acknowledge(self, batch, shipped=True):
+        """
+        Store the checkpoint of a batch returned by get_alerts/get_incidents
+        once it has been shipped (batches of other clients are ignored). If
+        a batch was not fully shipped, its stream is rewound to the last
+        shipped batch: the next poll fetches it again, and batches fetched
+        after it are ignored here (they are fetched again too).
         """
-        url = f"{self.base_url}/public_api/v1/alerts/get_alerts"
+        entry = self.pending.pop(id(batch), None)
+        if entry is None or entry[0] is not batch:
+            return
+        _, stream, watermark, boundary, epoch = entry
+        with self.lock:
+            if epoch != self.epochs.get(stream, 0):
+                return
+            if shipped:
+                self.acked[stream] = (watermark, boundary)
+                self.checkpoints.advance(stream, watermark, tenant=self.tenant)
+                return
+            self.logger.warning(f"Batch of {len(batch)} {stream} not shipped: fetching again from the last shipped batch")
+            self.epochs[stream] = epoch + 1
+            if stream in self.acked:
+                self.watermarks[stream], self.boundary_ids[stream] = self.acked[stream]
+            else:
+                self.watermarks.pop(stream, None)
+                self.boundary_ids.pop(stream, None)
+
+    def incident_details(self, incident_id):
+        """Linked alerts and artifacts of one incident (get_incident_extra_data)."""
+        url = f"{self.base_url}/public_api/v1/incidents/get_incident_extra_data/"
         payload = {
             "request_data": {
-                "search_from": 0,
-                "search_to": max_results,
-                "filters": [{
-                    "field": "creation_time",
-                    "operator": "gte",
-                    "value": int(self.last_fetch_time.timestamp() * 1000)
-                }]
+                "incident_id": str(incident_id),
+                "alerts_limit": self.enrich_cfg.get('alerts_limit', 1000)
             }
         }
-        try:
-            r = self.session.post(url, json=payload)
-            r.raise_for_status()
-            data = r.json()
-            alerts = data.get("reply", {}).get("alerts", [])
-
-            if alerts:
-                latest_ts = max(a["creation_time"] for a in alerts)
-                self.last_fetch_time = datetime.utcfromtimestamp(latest_ts / 1000)
-
-            return alerts
+        return detail_sections(self.transport.post(url, payload))
 
+    def get_alerts(self, max_results=100):
+        """
+        Fetch alerts from Cortex XDR API since the alerts checkpoint.
+        """
+        try:
+            return self._fetch("alerts", max_results)
         except Exception as e:
             self.logger.error(f"Failed to fetch alerts: {str(e)}")
             return []
 
     def get_incidents(self, max_results=100):
         """
-        Optional: fetch incidents from Cortex XDR API since last_fetch_time.
+        Optional: fetch incidents from Cortex XDR API since the incidents checkpoint.
         Returns empty list if API endpoint or incidents not used.
         """
-        url = f"{self.base_url}/public_api/v1/incidents/get_incidents"
-        payload = {
-            "request_data": {
-                "search_from": 0,
-                "search_to": max_results,
-                "filters": [{
-                    "field": "creation_time",
-                    "operator": "gte",
-                    "value": int(self.last_fetch_time.timestamp() * 1000)
-                }]
-            }
-        }
         try:
-            r = self.session.post(url, json=payload)
-            r.raise_for_status()
-            data = r.json()
-            incidents = data.get("reply", {}).get("incidents", [])
-
-            if incidents:
-                latest_ts = max(i["creation_time"] for i in incidents)
-                self.last_fetch_time = datetime.utcfromtimestamp(latest_ts / 1000)
-
+            incidents = self._fetch("incidents", max_results)
+            if self.enricher is not None and incidents:
+                self.enricher.enrich(incidents)
             return incidents
-
         except Exception as e:
             self.logger.error(f"Failed to fetch incidents: {str(e)}")
             return []
         
 class MockCortexClient:
-    def __init__(self, config):
+    """
+    Stand-in client serving data/fake_cortex_*.json, or, with
+    settings.replay_dir, a recorded capture: successive calls then walk
+    through the capture, max_results events at a time.
+    """
+    def __init__(self, config, checkpoints=None):
         self.config = config
         self.logger = logging.getLogger(__name__)
-    
+        self.data_dir = Path(__file__).parent.parent / "data"
+        replay_dir = config.get('settings', {}).get('replay_dir')
+        self.replay = CaptureReader(_repo_path(replay_dir)) if replay_dir else None
+        self.cursors = {}
+
+    def _replay(self, stream, max_results):
+        cursor = self.cursors.get(stream)
+        if cursor is None:
+            events = (e for _, batch in self.replay.batches(stream) for e in batch)
+            cursor = self.cursors[stream] = events
+        return list(islice(cursor, max_results))
+
+    def _load(self, name, max_results):
+        if self.replay is not None:
+            return self._replay(name.rsplit("_", 1)[1].split(".")[0], max_results)
+        # Only the first max_results records are decoded, never the whole file
+        with open(self.data_dir / name) as f:
+            return list(islice(iter_json_array(f), max_results))
+
     def get_alerts(self, max_results=100):
         """Simule l'API Cortex avec des données fictives"""
-        import json
-        from pathlib import Path
-        
         try:
-            alerts_file = Path(__file__).parent.parent / "data" / "fake_cortex_alerts.json"
-            with open(alerts_file) as f:
-                alerts = json.load(f)
-                return alerts[:max_results]
+            return self._load("fake_cortex_alerts.json", max_results)
         except Exception as e:
             self.logger.error(f"Failed to load fake alerts: {str(e)}")
             return []
-    
+
     def get_incidents(self, max_results=100):
         """Simule l'API Cortex avec des données fictives"""
-        import json
-        from pathlib import Path
-        
         try:
-            incidents_file = Path(__file__).parent.parent / "data" / "fake_cortex_incidents.json"
-            with open(incidents_file) as f:
-                incidents = json.load(f)
-                return incidents[:max_results]
+            return self._load("fake_cortex_incidents.json", max_results)
         except Exception as e:
             self.logger.error(f"Failed to load fake incidents: {str(e)}")
             return []
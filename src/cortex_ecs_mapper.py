@@ -1,12 +1,40 @@
 from datetime import datetime, timezone
 import yaml
 
+try:
+    from .normalize import BatchNormalizer
+except ImportError:
+    from normalize import BatchNormalizer
+
 
 # Helper to convert milliseconds to ECS-compliant ISO8601 timestamp
 def ms_to_iso(ms):
     return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).isoformat()
 
 
+# Cortex category -> ECS event.category, checked in order
+CATEGORY_TABLE = (
+    (frozenset(("execution", "process", "script")), "intrusion_detection"),
+    (frozenset(("network", "connection")), "network_traffic"),
+    (frozenset(("file", "malware")), "malware"),
+)
+
+
+def compile_mappings(mappings):
+    """
+    Precompute the accessor/setter plan for YAML field mappings.
+
+    Each rule becomes (source head key, remaining source keys,
+    ECS parent keys, ECS leaf key) so no string splitting happens per event.
+    """
+    plan = []
+    for mapping in mappings:
+        src = mapping["cortex_field"].split(".")
+        dst = mapping["ecs_field"].split(".")
+        plan.append((src[0], tuple(src[1:]), tuple(dst[:-1]), dst[-1]))
+    return tuple(plan)
+
+
 class CortexECSMapper:
     def __init__(self, mapping_file=None):
         # If no mapping file is provided, just skip
@@ -15,21 +43,31 @@ class CortexECSMapper:
                 self.mappings = yaml.safe_load(f).get("field_mappings", [])
         else:
             self.mappings = []
+        self.plan = compile_mappings(self.mappings)
+        # Memoized timestamp/category conversions, shared by every event mapped
+        self.normalizer = BatchNormalizer(category_table=CATEGORY_TABLE)
 
-    def map_to_ecs(self, alert):
-        ts = (
-            ms_to_iso(alert["creation_time"])
-            if "creation_time" in alert
-            else datetime.now(timezone.utc).isoformat()
-        )
+    def map_to_ecs(self, alert, timestamp=None, category=None):
+        """
+        Map one Cortex event. map_many passes the event's @timestamp and
+        ECS category, already normalized for the whole batch.
+        """
+        get = alert.get
+        if timestamp is None:
+            creation_time = get("creation_time")
+            timestamp = (
+                self.normalizer.timestamp(creation_time)
+                if creation_time is not None
+                else datetime.now(timezone.utc).isoformat()
+            )
 
         ecs_event = {
-            "@timestamp": ts,
+            "@timestamp": timestamp,
             "event": {
-                "id": alert.get("alert_id"),
-                "action": alert.get("name"),
-                "severity": alert.get("severity"),
-                "category": self._determine_category(alert),
+                "id": get("alert_id"),
+                "action": get("name"),
+                "severity": get("severity"),
+                "category": [category] if category is not None else self._determine_category(alert),
                 "kind": "alert",
                 "outcome": "unknown",
             },
@@ -37,40 +75,54 @@ class CortexECSMapper:
             "observer": {
                 "product": "Cortex XDR",
                 "vendor": "Palo Alto Networks",
-                "type": alert.get("category", "XDR"),
+                "type": get("category", "XDR"),
             },
         }
 
+        # Set by the collector for events of a named tenant
+        value = get("_tenant")
+        if value is not None:
+            ecs_event["tenant"] = value
+
         # Only set nested fields if values exist
-        if alert.get("source_ip"):
-            ecs_event.setdefault("source", {})["ip"] = alert["source_ip"]
+        value = get("source_ip")
+        if value:
+            ecs_event["source"] = {"ip": value}
 
-        if alert.get("user_name"):
-            ecs_event.setdefault("user", {})["name"] = alert["user_name"]
+        value = get("user_name")
+        if value:
+            ecs_event["user"] = {"name": value}
 
-        if alert.get("host_name"):
-            ecs_event.setdefault("host", {})["name"] = alert["host_name"]
+        value = get("host_name")
+        if value:
+            ecs_event["host"] = {"name": value}
 
-        # Apply YAML mappings dynamically
-        for mapping in self.mappings:
-            value = alert
-            for key in mapping["cortex_field"].split("."):
+        # Apply the compiled YAML mappings
+        for head, rest, parents, leaf in self.plan:
+            value = get(head)
+            for key in rest:
                 value = value.get(key) if isinstance(value, dict) else None
             if value is not None:
-                self._set_nested_field(ecs_event, mapping["ecs_field"], value)
+                obj = ecs_event
+                for key in parents:
+                    obj = obj.setdefault(key, {})
+                obj[leaf] = value
 
         return ecs_event
 
+    def map_many(self, alerts):
+        """
+        Map a whole page of Cortex events in one call; creation times and
+        categories are normalized column-wise first.
+        """
+        map_to_ecs = self.map_to_ecs
+        timestamps = self.normalizer.timestamps([alert.get("creation_time") for alert in alerts])
+        categories = self.normalizer.categories([alert.get("category", "") for alert in alerts])
+        return [map_to_ecs(*args) for args in zip(alerts, timestamps, categories)]
+
     def _determine_category(self, alert):
         """Normalize Cortex categories to ECS categories"""
-        cat = alert.get("category", "").lower()
-        if cat in ["execution", "process", "script"]:
-            return ["intrusion_detection"]
-        elif cat in ["network", "connection"]:
-            return ["network_traffic"]
-        elif cat in ["file", "malware"]:
-            return ["malware"]
-        return ["unknown"]
+        return [self.normalizer.category(alert.get("category", ""))]
 
     def _set_nested_field(self, obj, field_path, value):
         keys = field_path.split(".")
@@ -0,0 +1,134 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+try:
+    from .checkpoint_store import write_atomic
+except ImportError:
+    from checkpoint_store import write_atomic
+
+
+def event_key(event):
+    """
+    Identity of a Cortex alert/incident version: its ID plus modification time,
+    prefixed with the tenant for events fetched by a multi-tenant collector.
+    Returns None for events without an ID (never deduplicated).
+    """
+    event_id = event.get("alert_id") or event.get("incident_id")
+    if event_id is None:
+        return None
+    modified = (
+        event.get("modification_time")
+        or event.get("last_modified_ts")
+        or event.get("creation_time")
+    )
+    tenant = event.get("_tenant")
+    if tenant is not None:
+        return f"{tenant}:{event_id}:{modified}"
+    return f"{event_id}:{modified}"
+
+
+class DedupIndex:
+    """
+    Memory-bounded index of already shipped events.
+
+    An LRU of event keys capped at `max_size` entries, where entries older
+    than `ttl` seconds are evicted as well. Optionally saved to and reloaded
+    from `path` so a restart does not re-ship the lookback window. Events
+    are checked before they are sent and recorded once shipped (filter()
+    does both at once).
+    """
+    def __init__(self, max_size=100000, ttl=86400, path=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = Path(path) if path else None
+        self.logger = logging.getLogger(__name__)
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> time first seen
+        self.inflight = set()  # checked, not yet recorded or released
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for key, seen_at in json.load(f):
+                    self.entries[key] = seen_at
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Failed to load dedup index from {self.path}: {str(e)}")
+            self.entries.clear()
+        self._evict(time.time())
+
+    def save(self):
+        if self.path is None:
+            return
+        with self.lock:
+            data = json.dumps(list(self.entries.items())).encode("utf-8")
+        write_atomic(self.path, data)
+
+    def _evict(self, now):
+        entries = self.entries
+        cutoff = now - self.ttl
+        # Entries are in insertion order, so the oldest are at the front
+        while entries and (len(entries) > self.max_size or next(iter(entries.values())) < cutoff):
+            entries.popitem(last=False)
+
+    def check(self, events):
+        """
+        Return the events neither shipped nor in flight, and mark them in
+        flight: until record() or release() they count as seen, but are not
+        part of the saved index.
+        """
+        now = time.time()
+        fresh = []
+        with self.lock:
+            entries = self.entries
+            inflight = self.inflight
+            for event in events:
+                key = event_key(event)
+                if key is None:
+                    fresh.append(event)
+                elif key in entries:
+                    self.hits += 1
+                    entries.move_to_end(key)
+                    entries[key] = now
+                elif key in inflight:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                    inflight.add(key)
+                    fresh.append(event)
+            self._evict(now)
+        return fresh
+
+    def record(self, events):
+        """Record checked events as shipped."""
+        now = time.time()
+        with self.lock:
+            for event in events:
+                key = event_key(event)
+                if key is not None:
+                    self.inflight.discard(key)
+                    self.entries[key] = now
+            self._evict(now)
+
+    def release(self, events):
+        """Forget checked events that were not shipped, so they pass the next check."""
+        with self.lock:
+            for event in events:
+                self.inflight.discard(event_key(event))
+
+    def filter(self, events):
+        """Return the events not seen before and record them."""
+        fresh = self.check(events)
+        self.record(fresh)
+        return fresh
+
+    def stats(self):
+        return {"size": len(self.entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Incident-details reply sections copied onto the incident
+DETAIL_SECTIONS = ("alerts", "network_artifacts", "file_artifacts")
+
+
+class TTLCache:
+    """Thread-safe LRU cache capped at `max_size` entries, each valid for `ttl` seconds."""
+    def __init__(self, max_size=10000, ttl=3600, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()  # key -> (stored_at, value)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or self.clock() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (self.clock(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def detail_sections(reply):
+    """The alerts/artifact lists of a get_incident_extra_data reply."""
+    reply = reply.get("reply", reply)
+    return {
+        section: (reply.get(section) or {}).get("data", [])
+        for section in DETAIL_SECTIONS if section in reply
+    }
+
+
+class IncidentEnricher:
+    """
+    Adds each incident's linked alerts and artifacts (the incident-details
+    endpoint) to the incident headers.
+
+    `fetch_details(incident_id)` returns the detail sections to merge. Calls
+    run on at most `workers` threads; results are cached under (incident
+    ID, modification time), so an unchanged incident is fetched once per
+    `ttl`. A failed call leaves that incident as it was.
+    """
+    def __init__(self, fetch_details, workers=4, cache_size=10000, ttl=3600):
+        self.fetch_details = fetch_details
+        self.workers = max(1, workers)
+        self.cache = TTLCache(cache_size, ttl)
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def from_config(cls, fetch_details, enrich_cfg):
+        """IncidentEnricher for an enabled enrichment block, otherwise None."""
+        enrich_cfg = enrich_cfg or {}
+        if not enrich_cfg.get('enabled', False):
+            return None
+        return cls(
+            fetch_details,
+            workers=enrich_cfg.get('workers', 4),
+            cache_size=enrich_cfg.get('cache_size', 10000),
+            ttl=enrich_cfg.get('ttl_seconds', 3600),
+        )
+
+    @staticmethod
+    def _key(incident):
+        return incident.get("incident_id"), incident.get("modification_time") or incident.get("creation_time")
+
+    def _fetch(self, incident):
+        try:
+            details = self.fetch_details(incident["incident_id"])
+        except Exception as e:
+            self.logger.error(f"Failed to fetch details of incident {incident.get('incident_id')}: {str(e)}")
+            return None
+        self.cache.put(self._key(incident), details)
+        return details
+
+    def enrich(self, incidents):
+        """Merge details into `incidents` (in place) and return them."""
+        missing = []
+        for incident in incidents:
+            if incident.get("incident_id") is None:
+                continue
+            details = self.cache.get(self._key(incident))
+            if details is None:
+                missing.append(incident)
+            else:
+                incident.update(details)
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(missing))) as pool:
+                for incident, details in zip(missing, pool.map(self._fetch, missing)):
+                    if details is not None:
+                        incident.update(details)
+        return incidents
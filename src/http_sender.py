@@ -0,0 +1,262 @@
+import gzip
+import json
+import logging
+import random
+import threading
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from .json_codec import get_codec
+    from .metrics import NULL_METRICS
+    from .spool import Spool
+except ImportError:
+    from json_codec import get_codec
+    from metrics import NULL_METRICS
+    from spool import Spool
+
+# Statuses (whole request or single _bulk item) worth retrying
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+class BulkError(Exception):
+    """Raised when documents could not be delivered; `lines` are the undelivered NDJSON lines."""
+    def __init__(self, message, lines):
+        super().__init__(message)
+        self.lines = lines
+
+
+class HttpBulkSender:
+    """
+    Acknowledged HTTP output: gzip-compressed NDJSON batches POSTed to an
+    Elasticsearch `_bulk` endpoint (`format: bulk`) or a Logstash `http`
+    input (`format: ndjson`).
+
+    Every call delivers what it was given before returning, cutting it into
+    requests of at most `batch_bytes`, and returns how many events were
+    delivered (or spooled), so a caller never counts an event as shipped
+    before the output acknowledged it. Connections are pooled and kept alive. For `_bulk` the
+    per-item results are parsed: 409 on a `create` counts as already
+    indexed, 429/5xx items are retried alone with exponential backoff, other
+    item errors are rejected and logged. Batches that still cannot be
+    delivered go to the optional disk spool and are replayed first on the
+    next flush.
+
+    Exposes the LogstashSender interface (send, send_many, send_ndjson,
+    close) plus send_batch/send_chunks for the standalone adapter.
+    """
+    def __init__(self, config):
+        self.config = config['http_output']
+        self.logger = logging.getLogger(__name__)
+        self.url = self.config['url']
+        self.format = self.config.get('format', 'bulk')
+        if self.format not in ('bulk', 'ndjson'):
+            raise ValueError(f"Unknown http_output format: {self.format}")
+        self.action = (json.dumps({
+            self.config.get('op_type', 'create'): {"_index": self.config['index']} if self.config.get('index') else {}
+        }, separators=(",", ":")) + "\n").encode()
+        self.compress = self.config.get('gzip', True)
+        self.batch_bytes = self.config.get('batch_bytes', 5 * 1024 * 1024)
+        self.retries = self.config.get('max_retries', 3)
+        self.backoff = self.config.get('backoff', 1.0)
+        self.timeout = self.config.get('timeout', 30)
+        self.codec = get_codec(self.config.get('codec', 'auto'))
+        self.metrics = NULL_METRICS
+        self.sleep = time.sleep
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.config.get('pool_size', 4))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.verify = self.config.get('ssl_verify', True)
+        self.session.headers["Content-Type"] = "application/x-ndjson"
+        if self.config.get('api_key'):
+            self.session.headers["Authorization"] = f"ApiKey {self.config['api_key']}"
+        elif self.config.get('username'):
+            self.session.auth = (self.config['username'], self.config.get('password', ''))
+
+        self.spool = None
+        spool_cfg = self.config.get('spool')
+        if spool_cfg:
+            directory = Path(spool_cfg.get('dir', 'state/http-spool'))
+            if not directory.is_absolute():
+                directory = Path(__file__).parent.parent / directory
+            self.spool = Spool(
+                directory,
+                segment_bytes=spool_cfg.get('segment_bytes', 16 * 1024 * 1024),
+                max_bytes=spool_cfg.get('max_bytes', 1024 * 1024 * 1024),
+                policy=spool_cfg.get('policy', 'drop_oldest'),
+            )
+
+        self.lock = threading.RLock()
+        self.buffer = []
+        self.buffered_bytes = 0
+        self.lost = 0  # events neither delivered nor spooled
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- public interface ----
+
+    def send(self, event):
+        return self.send_many([event]) == 1
+
+    def send_many(self, events):
+        """Deliver `events`; returns how many were delivered or spooled."""
+        dumps = self.codec.dumps
+        return self._deliver_lines([dumps(event) + b"\n" for event in events])
+
+    def send_ndjson(self, data, count):
+        """Deliver `count` events already serialized as NDJSON bytes; returns how many were delivered or spooled."""
+        return self._deliver_lines(data.splitlines(keepends=True))
+
+    def send_batch(self, docs):
+        """Deliver `docs` (any iterable) and flush; returns docs delivered or spooled."""
+        dumps = self.codec.dumps
+        with self.lock:
+            lost = self.lost
+            n = 0
+            for doc in docs:
+                self._add(dumps(doc) + b"\n")
+                n += 1
+            self._flush()
+            return n - (self.lost - lost)
+
+    def send_chunks(self, chunks):
+        """Deliver pre-serialized (count, ndjson_bytes) chunks and flush; returns docs delivered or spooled."""
+        with self.lock:
+            lost = self.lost
+            n = 0
+            for count, data in chunks:
+                for line in data.splitlines(keepends=True):
+                    self._add(line)
+                n += count
+            self._flush()
+            return n - (self.lost - lost)
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def close(self):
+        self.flush()
+        self.session.close()
+
+    # ---- buffering ----
+
+    def _deliver_lines(self, lines):
+        if self.metrics.enabled:
+            self.metrics.inc("http_output_serialized_bytes_total", sum(map(len, lines)))
+        with self.lock:
+            lost = self.lost
+            for line in lines:
+                self._add(line)
+            self._flush()
+            return len(lines) - (self.lost - lost)
+
+    def _add(self, line):
+        if self.buffer and self.buffered_bytes + len(line) > self.batch_bytes:
+            self._flush()
+        self.buffer.append(line)
+        self.buffered_bytes += len(line)
+
+    def _flush(self):
+        lines, self.buffer = self.buffer, []
+        self.buffered_bytes = 0
+        try:
+            if self.spool is not None and not self.spool.empty():
+                # Spooled lines only leave the spool once acknowledged
+                drained = self.spool.drain(lambda data: self._deliver(data.splitlines(keepends=True)),
+                                           chunk_bytes=self.batch_bytes)
+                self.logger.info(f"Replayed {drained} spooled bytes over HTTP")
+        except (BulkError, requests.RequestException) as e:
+            self._undelivered(lines, e)
+            return
+        if not lines:
+            return
+        try:
+            self._deliver(lines)
+        except BulkError as e:
+            self._undelivered(e.lines, e)
+        except requests.RequestException as e:
+            self._undelivered(lines, e)
+
+    def _undelivered(self, lines, error):
+        self.logger.error(f"HTTP output failed: {str(error)}")
+        if not lines:
+            return
+        self.metrics.inc("http_output_failed_events_total", len(lines))
+        spooled = self.spool.append(lines) if self.spool is not None else 0
+        if spooled:
+            self.metrics.inc("http_output_spooled_events_total", spooled)
+            self.logger.warning(f"Spooled {spooled} events until the HTTP output is back")
+        self.lost += len(lines) - spooled
+
+    # ---- delivery ----
+
+    def _deliver(self, lines):
+        """
+        POST `lines`, retrying only the documents that failed transiently.
+        Raises BulkError with the undelivered lines once retries run out.
+        """
+        pending = lines
+        for attempt in range(self.retries + 1):
+            if attempt:
+                delay = random.uniform(0, self.backoff * 2 ** (attempt - 1))
+                self.metrics.inc("http_output_retried_events_total", len(pending))
+                self.logger.warning(f"Retrying {len(pending)} events in {delay:.1f}s ({attempt}/{self.retries})")
+                self.sleep(delay)
+            try:
+                pending = self._post(pending)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+                continue
+            if not pending:
+                return
+            error = f"{len(pending)} events failed transiently"
+        raise BulkError(f"giving up after {self.retries} retries: {error}", pending)
+
+    def _post(self, lines):
+        """One request; returns the lines that should be retried."""
+        if self.format == 'bulk':
+            body = b"".join(self.action + line for line in lines)
+        else:
+            body = b"".join(lines)
+        headers = {}
+        if self.compress:
+            body = gzip.compress(body, compresslevel=self.config.get('gzip_level', 5))
+            headers["Content-Encoding"] = "gzip"
+        r = self.session.post(self.url, data=body, headers=headers, timeout=self.timeout)
+        self.metrics.inc("http_output_requests_total", status=r.status_code)
+        if r.status_code in RETRY_STATUSES:
+            return lines
+        if r.status_code >= 300:
+            raise BulkError(f"HTTP {r.status_code}: {r.text[:200]}", lines)
+        self.metrics.inc("http_output_sent_bytes_total", len(body))
+        if self.format != 'bulk':
+            return []
+        reply = r.json()
+        if not reply.get("errors"):
+            return []
+        retry = []
+        rejected = 0
+        for line, item in zip(lines, reply.get("items", [])):
+            result = next(iter(item.values()))
+            status = result.get("status", 200)
+            if status < 300 or status == 409:
+                continue
+            if status in RETRY_STATUSES:
+                retry.append(line)
+            else:
+                rejected += 1
+                self.logger.error(f"Bulk item rejected ({status}): {result.get('error')}")
+        if rejected:
+            self.metrics.inc("http_output_rejected_events_total", rejected)
+            self.lost += rejected
+        return retry
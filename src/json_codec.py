@@ -0,0 +1,83 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+
+class StdlibCodec:
+    """Compact UTF-8 JSON via the standard library."""
+    name = "json"
+
+    def dumps(self, obj):
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    """orjson encoder; produces the same compact UTF-8 output as StdlibCodec."""
+    name = "orjson"
+
+    def dumps(self, obj):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+def get_codec(name="auto"):
+    """
+    Return the JSON codec called `name`: "json", "orjson", or "auto"
+    (orjson when it is installed, the stdlib otherwise).
+    """
+    if name in (None, "auto"):
+        return OrjsonCodec() if orjson is not None else StdlibCodec()
+    if name == "json":
+        return StdlibCodec()
+    if name == "orjson":
+        if orjson is None:
+            raise ImportError("orjson codec requested but orjson is not installed")
+        return OrjsonCodec()
+    raise ValueError(f"Unknown JSON codec: {name}")
+
+
+def iter_json_array(fp, chunk_size=64 * 1024):
+    """
+    Yield the elements of a top-level JSON array read from the text file
+    object `fp`, decoding incrementally so only one element (plus one read
+    chunk) is held in memory at a time.
+    """
+    decoder = json.JSONDecoder()
+    buf = fp.read(chunk_size).lstrip()
+    if not buf.startswith("["):
+        raise ValueError("expected a JSON array")
+    pos, eof = 1, False
+    while True:
+        # Skip separators, refilling the buffer as needed
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            chunk = fp.read(chunk_size)
+            buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+        if pos >= len(buf):
+            raise ValueError("unterminated JSON array")
+        if buf[pos] == "]":
+            return
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            end = None
+        # Incomplete element (or a number that may continue): read more and retry
+        if (end is None or end == len(buf)) and not eof:
+            chunk = fp.read(chunk_size)
+            buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+            continue
+        if end is None:
+            raise ValueError("invalid JSON array element")
+        yield obj
+        pos = end
@@ -1,37 +1,318 @@
 import socket
 import ssl
-import json
+import sys
 import logging
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+    import termios
+    TIOCOUTQ = getattr(termios, 'TIOCOUTQ', None)
+except ImportError:  # not available on Windows
+    fcntl = TIOCOUTQ = None
+
+try:
+    from .json_codec import get_codec
+    from .metrics import NULL_METRICS
+    from .spool import Spool
+except ImportError:
+    from json_codec import get_codec
+    from metrics import NULL_METRICS
+    from spool import Spool
+
+class LogstashEndpoint:
+    """One Logstash node: its persistent connection, health and throughput counters."""
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.name = f"{host}:{port}"
+        self.sock = None
+        self.healthy = True
+        self.failures = 0
+        self.inflight = 0
+        self.sent_bytes = 0
+        self.sent_events = 0
+        self.started = None
+
+    def outstanding(self):
+        """Bytes written to this node but not yet acknowledged (kernel send queue + in-progress writes)."""
+        queued = 0
+        if self.sock is not None and TIOCOUTQ is not None:
+            try:
+                queued = int.from_bytes(fcntl.ioctl(self.sock.fileno(), TIOCOUTQ, b"\0" * 4), sys.byteorder)
+            except (OSError, ValueError):
+                pass
+        return queued + self.inflight
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started if self.started else 0
+        return {
+            "endpoint": self.name,
+            "healthy": self.healthy,
+            "sent_bytes": self.sent_bytes,
+            "sent_events": self.sent_events,
+            "bytes_per_second": self.sent_bytes / elapsed if elapsed else 0.0,
+            "events_per_second": self.sent_events / elapsed if elapsed else 0.0,
+        }
+
 
 class LogstashSender:
+    """
+    Long-lived Logstash TCP/TLS sender (json_lines codec).
+
+    Each endpoint gets one connection, opened lazily and reused for every
+    event. With several `hosts`, writes are balanced round-robin or to the
+    node with the fewest unacknowledged bytes (`balance: least_bytes`); a
+    failed write fails over to the next node. A node is ejected after
+    `eject_after` consecutive failures and a background thread probes it
+    every `probe_interval` seconds until it accepts connections again.
+    With a `spool` block in the config, events that cannot be delivered
+    anywhere are written to a disk spool and replayed ahead of new events
+    once Logstash is reachable again.
+
+    Each event is serialized once; the same bytes go to the socket and to the
+    opt-in debug sinks (`debug_stdout`, `debug_file`).
+    """
     def __init__(self, config):
         self.config = config['logstash']
         self.logger = logging.getLogger(__name__)
         self.ssl_context = ssl.create_default_context()
-        if not self.config['ssl_verify']:
+        if not self.config.get('ssl_verify', True):
             self.ssl_context.check_hostname = False
             self.ssl_context.verify_mode = ssl.CERT_NONE
+        self.timeout = self.config.get('timeout', 15)
+        self.buffer_size = self.config.get('buffer_size', 64 * 1024)
+        self.codec = get_codec(self.config.get('codec', 'auto'))
+        self.debug_stdout = self.config.get('debug_stdout', False)
+        self.debug_file = self.config.get('debug_file')
+        self.metrics = NULL_METRICS
+        self.endpoints = self._endpoints()
+        self.balance = self.config.get('balance', 'round_robin')
+        if self.balance not in ('round_robin', 'least_bytes'):
+            raise ValueError(f"Unknown Logstash balance mode: {self.balance}")
+        self.eject_after = self.config.get('eject_after', 3)
+        self.probe_interval = self.config.get('probe_interval', 10)
+        self.next_index = 0
+        self.prober = None
+        self.closing = threading.Event()
+        self.spool = None
+        spool_cfg = self.config.get('spool')
+        if spool_cfg:
+            directory = Path(spool_cfg.get('dir', 'state/spool'))
+            if not directory.is_absolute():
+                directory = Path(__file__).parent.parent / directory
+            self.spool = Spool(
+                directory,
+                segment_bytes=spool_cfg.get('segment_bytes', 16 * 1024 * 1024),
+                max_bytes=spool_cfg.get('max_bytes', 1024 * 1024 * 1024),
+                policy=spool_cfg.get('policy', 'drop_oldest'),
+            )
+
+    def _endpoints(self):
+        # `hosts` entries are "host:port" strings or {host, port} mappings; default: host/port
+        entries = self.config.get('hosts') or [{'host': self.config['host'], 'port': self.config['port']}]
+        endpoints = []
+        for entry in entries:
+            if isinstance(entry, dict):
+                host, port = entry['host'], entry.get('port', self.config.get('port', 5044))
+            else:
+                host, _, port = str(entry).rpartition(':')
+                if not host:
+                    host, port = port, self.config.get('port', 5044)
+            endpoints.append(LogstashEndpoint(host, int(port)))
+        return endpoints
+
+    @property
+    def sock(self):
+        """Connection to the first endpoint (the only one in single-host setups)."""
+        return self.endpoints[0].sock
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _connect(self, endpoint=None):
+        endpoint = endpoint or self.endpoints[0]
+        sock = socket.create_connection((endpoint.host, endpoint.port), timeout=self.timeout)
+        if self.config.get('use_ssl'):
+            sock = self.ssl_context.wrap_socket(sock, server_hostname=endpoint.host)
+        endpoint.sock = sock
+        return sock
+
+    def close(self):
+        self.closing.set()
+        if len(self.endpoints) > 1:
+            for stats in self.stats():
+                self.logger.info(
+                    f"Logstash {stats['endpoint']}: {stats['sent_events']} events, "
+                    f"{stats['events_per_second']:.0f} events/s, {stats['bytes_per_second'] / 1024:.0f} KiB/s"
+                )
+        for endpoint in self.endpoints:
+            endpoint.close()
+
+    def stats(self):
+        """Per-endpoint health and throughput."""
+        return [endpoint.stats() for endpoint in self.endpoints]
+
+    def _pick(self):
+        healthy = [e for e in self.endpoints if e.healthy]
+        if not healthy:
+            return None
+        # Rotating the start point spreads ties (e.g. idle nodes) evenly
+        start = self.next_index % len(healthy)
+        self.next_index += 1
+        rotated = healthy[start:] + healthy[:start]
+        if self.balance == 'least_bytes':
+            return min(rotated, key=LogstashEndpoint.outstanding)
+        return rotated[0]
+
+    def _write(self, data, count=0):
+        """
+        Write bytes to a balanced endpoint, reconnecting or failing over to
+        another node on errors; raises once every attempt failed.
+        """
+        error = None
+        for attempt in range(len(self.endpoints) + 1):
+            endpoint = self._pick()
+            if endpoint is None:
+                break
+            endpoint.inflight += len(data)
+            try:
+                sock = endpoint.sock or self._connect(endpoint)
+                sock.sendall(data)
+            except OSError as e:
+                error = e
+                self._failed_endpoint(endpoint, e)
+                continue
+            finally:
+                endpoint.inflight -= len(data)
+            endpoint.failures = 0
+            endpoint.started = endpoint.started or time.monotonic()
+            endpoint.sent_bytes += len(data)
+            endpoint.sent_events += count
+            if self.metrics.enabled:
+                self.metrics.inc("logstash_endpoint_sent_bytes_total", len(data), endpoint=endpoint.name)
+                self.metrics.inc("logstash_endpoint_sent_events_total", count, endpoint=endpoint.name)
+            return
+        raise error or OSError("no healthy Logstash endpoint")
+
+    def _failed_endpoint(self, endpoint, error):
+        endpoint.close()
+        endpoint.failures += 1
+        self.metrics.inc("logstash_reconnects_total")
+        self.metrics.inc("logstash_endpoint_failures_total", endpoint=endpoint.name)
+        self.logger.warning(f"Logstash {endpoint.name} connection lost, reconnecting: {str(error)}")
+        if endpoint.failures >= self.eject_after and endpoint.healthy:
+            endpoint.healthy = False
+            self.metrics.set("logstash_endpoint_up", 0, endpoint=endpoint.name)
+            self.logger.error(f"Ejected Logstash {endpoint.name} after {endpoint.failures} consecutive failures")
+            self._start_prober()
+
+    def _start_prober(self):
+        if (self.prober is None or not self.prober.is_alive()) and not self.closing.is_set():
+            self.prober = threading.Thread(target=self._probe, name="logstash-probe", daemon=True)
+            self.prober.start()
+
+    def _probe(self):
+        # Reconnect ejected nodes in the background; exits once all are back
+        while not self.closing.wait(self.probe_interval):
+            ejected = [e for e in self.endpoints if not e.healthy]
+            if not ejected:
+                return
+            for endpoint in ejected:
+                try:
+                    self._connect(endpoint)
+                except OSError:
+                    continue
+                endpoint.failures = 0
+                endpoint.healthy = True
+                self.metrics.set("logstash_endpoint_up", 1, endpoint=endpoint.name)
+                self.logger.info(f"Logstash {endpoint.name} is reachable again")
+
+    def _debug(self, data):
+        # Optional debug sinks, fed with the bytes already sent to Logstash
+        if self.debug_stdout:
+            sys.stdout.write(data.decode('utf-8'))
+        if self.debug_file:
+            with open(self.debug_file, "ab") as f:
+                f.write(data)
+
+    def _drain_spool(self):
+        if self.spool is not None and not self.spool.empty():
+            drained = self.spool.drain(self._write)
+            self.logger.info(f"Replayed {drained} spooled bytes to Logstash")
 
     def send(self, event):
+        return self.send_many([event]) == 1
+
+    def send_many(self, events):
+        """
+        Send a batch of events as newline-delimited JSON.
+        Events are buffered and written with one sendall per buffer-full.
+        Returns the number of events written (or spooled for later replay).
+        """
+        dumps = self.codec.dumps
+        lines = [dumps(event) + b"\n" for event in events]
+        if self.metrics.enabled:
+            self.metrics.inc("logstash_serialized_bytes_total", sum(map(len, lines)))
+        sent = 0
+        buffered = 0
+        buf = bytearray()
         try:
-            # OPTION 1 : Envoi réel à Logstash (décommentez pour production)
-            with socket.create_connection(
-                (self.config['host'], self.config['port'])
-            ) as sock:
-                if self.config['use_ssl']:
-                    with self.ssl_context.wrap_socket(
-                        sock, server_hostname=self.config['host']
-                    ) as ssock:
-                        ssock.sendall(json.dumps(event).encode('utf-8'))
-                else:
-                    sock.sendall(json.dumps(event).encode('utf-8'))
-            
-            # OPTION 2 : Écriture dans fichier (pour debug)
-            print(json.dumps(event, indent=2))
-            with open("elk_output.json", "a", encoding="utf-8") as f:
-                f.write(json.dumps(event) + "\n")
-            
-            return True
+            self._drain_spool()
+            for line in lines:
+                buf += line
+                buffered += 1
+                if len(buf) >= self.buffer_size:
+                    sent += self._flush(buf, buffered)
+                    buf.clear()
+                    buffered = 0
+            if buf:
+                sent += self._flush(buf, buffered)
         except Exception as e:
-            self.logger.error(f"Failed to send to Logstash: {str(e)}")
-            return False
\ No newline at end of file
+            sent += self._failed(lines[sent:], e)
+        return sent
+
+    def send_ndjson(self, data, count):
+        """
+        Send `count` events already serialized as NDJSON bytes (e.g. by a
+        ParallelEncoder) with a single write. Returns the number of events
+        written (or spooled for later replay).
+        """
+        self.metrics.inc("logstash_serialized_bytes_total", len(data))
+        try:
+            self._drain_spool()
+            return self._flush(data, count)
+        except Exception as e:
+            return self._failed(data.splitlines(keepends=True), e)
+
+    def _failed(self, lines, error):
+        # Spool undelivered lines when configured; returns how many were kept
+        self.logger.error(f"Failed to send to Logstash: {str(error)}")
+        self.metrics.inc("logstash_failed_events_total", len(lines))
+        if self.spool is None:
+            return 0
+        spooled = self.spool.append(lines)
+        if spooled:
+            self.metrics.inc("logstash_spooled_events_total", spooled)
+            self.logger.warning(f"Spooled {spooled} events until Logstash is back")
+        return spooled
+
+    def _flush(self, buf, count):
+        data = bytes(buf)
+        self._write(data, count)
+        self.metrics.inc("logstash_sent_bytes_total", len(data))
+        self._debug(data)
+        return count
@@ -1,4 +1,3 @@
-import json
 import logging
 import time
 from pathlib import Path
@@ -7,11 +6,33 @@ from pathlib import Path
 try:
     # Pour l'exécution en tant que module (python -m src.main)
     from .cortex_ecs_mapper import CortexECSMapper
+    from .http_sender import HttpBulkSender
     from .logstash_sender import LogstashSender
+    from .parallel_encoder import ParallelEncoder
+    from .pipeline import Pipeline
+    from .profiler import StageProfiler
+    from .rollup import RollupAggregator
+    from .dedup import DedupIndex
+    from .metrics import NULL_METRICS, Metrics, MetricsServer, instrument
+    from .scheduler import AdaptivePollScheduler
+    from .tenant_poller import TenantPoller, tenant_configs
+    from .json_codec import iter_json_array
+    from .capture import CaptureReader
 except ImportError:
     # Pour l'exécution directe (python src/main.py)
     from cortex_ecs_mapper import CortexECSMapper
+    from http_sender import HttpBulkSender
     from logstash_sender import LogstashSender
+    from parallel_encoder import ParallelEncoder
+    from pipeline import Pipeline
+    from profiler import StageProfiler
+    from rollup import RollupAggregator
+    from dedup import DedupIndex
+    from metrics import NULL_METRICS, Metrics, MetricsServer, instrument
+    from scheduler import AdaptivePollScheduler
+    from tenant_poller import TenantPoller, tenant_configs
+    from json_codec import iter_json_array
+    from capture import CaptureReader
 
 # Cortex client optionnel avec fallback complet
 try:
@@ -25,7 +46,7 @@ except ImportError:
         try:
             # Fallback 2: Créer un mock minimal si rien n'existe
             class MockCortexClient:
-                def __init__(self, config):
+                def __init__(self, config, checkpoints=None):
                     self.config = config
                     self.logger = logging.getLogger(__name__)
                 
@@ -49,14 +70,72 @@ def setup_logging():
     )
 
 # -------------------- Load Config --------------------
-def load_config():
-    config_path = Path(__file__).parent.parent / "config/config.yaml"
+def load_config(config_path=None):
+    config_path = Path(config_path) if config_path else Path(__file__).parent.parent / "config/config.yaml"
     if not config_path.exists():
         raise FileNotFoundError(f"Config file not found: {config_path}")
     import yaml
     with open(config_path) as f:
         return yaml.safe_load(f)
 
+# -------------------- Dedup Index --------------------
+def build_dedup(config, base_dir, persist=True):
+    """
+    DedupIndex from the optional settings.dedup block, or None when disabled.
+    With persist=False the index stays in memory (replays must not touch it).
+    """
+    dedup_cfg = config.get('settings', {}).get('dedup') or {}
+    if not dedup_cfg.get('enabled', False):
+        return None
+    path = dedup_cfg.get('file') if persist else None
+    if path and not Path(path).is_absolute():
+        path = base_dir / path
+    return DedupIndex(
+        max_size=dedup_cfg.get('max_size', 100000),
+        ttl=dedup_cfg.get('ttl_seconds', 86400),
+        path=path,
+    )
+
+# -------------------- Output --------------------
+def build_output(config):
+    """Sink selected by `output`: "logstash" (TCP json_lines, default) or "http" (_bulk / Logstash http input)."""
+    output = config.get('output', 'logstash')
+    if output == 'http':
+        return HttpBulkSender(config)
+    if output != 'logstash':
+        raise ValueError(f"Unknown output: {output}")
+    return LogstashSender(config)
+
+# -------------------- Cortex Clients --------------------
+def build_clients(config):
+    """
+    {tenant name: client} for every entry of `tenants:`, all sharing one
+    checkpoint store; a single {None: client} from `cortex:` otherwise.
+    """
+    tenants = tenant_configs(config)
+    if not tenants:
+        return {None: CortexClient(config)}
+    clients = {}
+    checkpoints = None
+    for name, tenant_config in tenants.items():
+        clients[name] = CortexClient(tenant_config, checkpoints=checkpoints)
+        checkpoints = getattr(clients[name], 'checkpoints', None)
+    return clients
+
+def acknowledger(clients):
+    """
+    Pipeline `ack` callback handing shipped batches back to the clients,
+    which store their checkpoints then (None if no client keeps any).
+    """
+    acks = [client.acknowledge for client in clients.values() if hasattr(client, 'acknowledge')]
+    if not acks:
+        return None
+
+    def ack(batch, shipped):
+        for acknowledge in acks:
+            acknowledge(batch, shipped)
+    return ack
+
 # -------------------- Fake Logstash Sender --------------------
 class FakeLogstashSender:
     def send(self, event):
@@ -65,11 +144,76 @@ class FakeLogstashSender:
         print(json.dumps(event, indent=2))
         return True
 
+# -------------------- Polling Source --------------------
+def poll_batches(cortex, config, pipeline, metrics=NULL_METRICS, cycles=None):
+    """
+    Yield one batch of raw events per endpoint and poll cycle until the
+    pipeline stops (or after `cycles` cycles). The delay between cycles
+    adapts to the backlog.
+    """
+    logger = logging.getLogger(__name__)
+    settings = config.get('settings', {})
+    mode = settings.get('mode', 'alerts')
+    streams = ['alerts', 'incidents'] if mode in ['incidents', 'both'] else ['alerts']
+    budget = settings.get('max_events_per_poll', settings.get('max_results', 100))
+    scheduler = AdaptivePollScheduler.from_settings(settings)
+    has_more = getattr(cortex, 'has_more', {})
+    # Dedup hits/misses already added to the counters
+    dedup_exported = {"hits": 0, "misses": 0}
+    cycle = 0
+    while True:
+        cycle_start = time.perf_counter()
+
+        # Récupérer les alertes
+        alerts = cortex.get_alerts(max_results=budget)
+        logger.info(f"Fetched {len(alerts)} alerts")
+        yield alerts
+        fetched = len(alerts)
+
+        # Récupérer les incidents (si configuré)
+        if mode in ['incidents', 'both']:
+            incidents = cortex.get_incidents(max_results=budget)
+            logger.info(f"Fetched {len(incidents)} incidents")
+            yield incidents
+            fetched += len(incidents)
+
+        if pipeline.dedup is not None:
+            logger.info(f"Dedup index: {pipeline.dedup.stats()}")
+            pipeline.dedup.save()
+
+        if metrics.enabled:
+            metrics.observe("collector_poll_cycle_seconds", time.perf_counter() - cycle_start)
+            for stream in streams if hasattr(cortex, 'since_ms') else []:
+                metrics.set("cortex_checkpoint_lag_seconds",
+                            time.time() - cortex.since_ms(stream) / 1000, stream=stream)
+            if pipeline.dedup is not None:
+                stats = pipeline.dedup.stats()
+                for kind in ("hits", "misses"):
+                    metrics.inc(f"dedup_{kind}_total", stats[kind] - dedup_exported[kind])
+                    dedup_exported[kind] = stats[kind]
+
+        cycle += 1
+        if cycles and cycle >= cycles:
+            return
+
+        delay = scheduler.next_delay(fetched, backlog=any(has_more.get(s) for s in streams))
+        metrics.set("collector_poll_delay_seconds", delay)
+        if delay:
+            logger.info(f"Next poll in {delay:g}s")
+        if pipeline.wait(delay):
+            return
+
 # -------------------- Main Function --------------------
-def main(test_mode=False):
+def main(test_mode=False, replay=None, replay_speed=0, profile=0, profile_dir=None,
+         config_path=None, cycles=0):
+    """
+    Run the collector. `cycles` > 0 stops polling after that many poll
+    cycles (profiling runs `profile` cycles). Returns the number of events
+    the pipeline sent (None in test mode).
+    """
     setup_logging()
     logger = logging.getLogger(__name__)
-    config = load_config()
+    config = load_config(config_path)
     
     # Définir les chemins corrects
     base_dir = Path(__file__).parent.parent
@@ -77,75 +221,124 @@ def main(test_mode=False):
     fake_incidents_file = base_dir / "data" / "fake_cortex_incidents.json"
     
     # ECS mapper
-    mapper = CortexECSMapper(base_dir / "config" / "cortex_ecs_mapping.yaml")
+    mapping_file = base_dir / "config" / "cortex_ecs_mapping.yaml"
+    mapper = CortexECSMapper(mapping_file)
     
     if test_mode:
         logstash = FakeLogstashSender()
-        events = []
-        
-        # Charger les alertes fictives
-        logger.info(f"Loading fake Cortex alerts from {fake_alerts_file}")
-        try:
-            with open(fake_alerts_file) as f:
-                alerts = json.load(f)
-                events.extend(alerts)
-                logger.info(f"Loaded {len(alerts)} fake alerts")
-        except FileNotFoundError:
-            logger.error(f"Fake alerts file not found: {fake_alerts_file}")
-            return
-        
-        # Charger les incidents fictifs (si configuré)
         mode = config.get('settings', {}).get('mode', 'alerts')
+        sources = [("alerts", fake_alerts_file)]
         if mode in ['incidents', 'both']:
-            logger.info(f"Loading fake Cortex incidents from {fake_incidents_file}")
+            sources.append(("incidents", fake_incidents_file))
+
+        # Les événements sont lus, mappés et envoyés un par un (mémoire bornée)
+        total = 0
+        for kind, path in sources:
+            logger.info(f"Loading fake Cortex {kind} from {path}")
             try:
-                with open(fake_incidents_file) as f:
-                    incidents = json.load(f)
-                    events.extend(incidents)
-                    logger.info(f"Loaded {len(incidents)} fake incidents")
+                with open(path) as f:
+                    count = 0
+                    for event in iter_json_array(f):
+                        logstash.send(mapper.map_to_ecs(event))
+                        count += 1
             except FileNotFoundError:
-                logger.error(f"Fake incidents file not found: {fake_incidents_file}")
-        
-        # Traiter tous les événements
-        for event in events:
-            ecs_event = mapper.map_to_ecs(event)
-            logstash.send(ecs_event)
-        
-        logger.info(f"Finished sending {len(events)} fake events")
-        
+                logger.error(f"Fake {kind} file not found: {path}")
+                if kind == "alerts":
+                    return
+                continue
+            logger.info(f"Loaded {count} fake {kind}")
+            total += count
+
+        logger.info(f"Finished sending {total} fake events")
+
     else:
-        if CortexClient is None:
+        if CortexClient is None and replay is None:
             logger.error("CortexClient not available. Install or configure it to run in production mode.")
             return
 
-        cortex = CortexClient(config)
-        logstash = LogstashSender(config)
-        logger.info("Starting Cortex XDR Collector")
+        # A replay feeds a recorded capture through the same pipeline, offline
+        clients = {} if replay else build_clients(config)
+        logstash = build_output(config)
+        if replay:
+            logger.info(f"Replaying capture {replay} (speed {replay_speed or 'max'})")
+        else:
+            logger.info(f"Starting Cortex XDR Collector ({len(clients)} tenant(s))")
+
+        metrics_cfg = config.get('metrics') or {}
+        metrics = NULL_METRICS
+        if metrics_cfg.get('enabled', False):
+            metrics = Metrics()
+            instrument(metrics, mapper=mapper, sender=logstash)
+            for cortex in clients.values():
+                instrument(metrics, cortex=cortex)
+            MetricsServer(
+                metrics,
+                host=metrics_cfg.get('host', '127.0.0.1'),
+                port=metrics_cfg.get('port', 9108),
+            ).start()
+
+        # Per-stage CPU/allocation profile of `profile` poll cycles
+        profiler = None
+        if profile:
+            profiler = StageProfiler().start()
+            profiler.instrument(mapper=mapper, sender=logstash)
+            for cortex in clients.values():
+                profiler.instrument(cortex=cortex)
+            logger.info(f"Profiling {profile} poll cycle(s)")
 
+        aggregator = RollupAggregator.from_config(config.get('rollup'))
+        encoder = None
+        if aggregator is not None and config['settings'].get('map_workers'):
+            logger.warning("Rollup enabled: mapping stays in-process, settings.map_workers ignored")
+        elif profiler is not None and config['settings'].get('map_workers'):
+            logger.warning("Profiling: mapping stays in-process, settings.map_workers ignored")
+        elif aggregator is None and profiler is None:
+            # Optional worker processes for mapping + serialization; they get their
+            # own mapper so instrumentation wrappers never need pickling, and
+            # serialize with the codec of the selected output
+            encoder = ParallelEncoder.from_config(
+                CortexECSMapper(mapping_file).map_to_ecs,
+                config['settings'],
+                codec=logstash.codec.name,
+            )
+            if encoder is not None:
+                instrument(metrics, encoder=encoder)
+        pipeline = Pipeline(
+            mapper, logstash,
+            queue_size=config['settings'].get('pipeline_queue_size', 4),
+            dedup=build_dedup(config, base_dir, persist=not replay),
+            encoder=encoder,
+            aggregator=aggregator,
+            ack=acknowledger(clients),
+        )
         try:
-            while True:
-                events = []
-                
-                # Récupérer les alertes
-                alerts = cortex.get_alerts()
-                logger.info(f"Fetched {len(alerts)} alerts")
-                events.extend(alerts)
-
-                # Récupérer les incidents (si configuré)
-                mode = config.get('settings', {}).get('mode', 'alerts')
-                if mode in ['incidents', 'both']:
-                    incidents = cortex.get_incidents()
-                    logger.info(f"Fetched {len(incidents)} incidents")
-                    events.extend(incidents)
-
-                for event in events:
-                    ecs_event = mapper.map_to_ecs(event)
-                    if not logstash.send(ecs_event):
-                        logger.error(f"Failed to send event: {event.get('alert_id', event.get('incident_id', 'unknown'))}")
-
-                time.sleep(config['settings']['polling_interval'])
+            if replay:
+                mode = config['settings'].get('mode', 'alerts')
+                streams = ['alerts', 'incidents'] if mode in ['incidents', 'both'] else ['alerts']
+                source = CaptureReader(replay).replay(streams, speed=replay_speed)
+            elif None in clients:
+                source = poll_batches(clients[None], config, pipeline, metrics, cycles=profile or cycles)
+            else:
+                # One scheduler and a shared fetch pool for all tenants
+                source = TenantPoller(clients, config, pipeline, metrics).batches(cycles=profile or cycles)
+            sent = pipeline.run(source)
+            if replay:
+                logger.info(f"Replay finished: {sent} events sent, {pipeline.failed} failed")
         except KeyboardInterrupt:
             logger.info("Shutting down Cortex XDR Collector")
+        finally:
+            if pipeline.dedup is not None:
+                pipeline.dedup.save()
+            if aggregator is not None:
+                logger.info(f"Rollup absorbed {aggregator.absorbed} events")
+            logstash.close()
+            if encoder is not None:
+                encoder.close()
+            if profiler is not None:
+                report = profiler.write(Path(profile_dir) if profile_dir else base_dir / "state" / "profile")
+                profiler.stop()
+                logger.info(f"Profile report: {report}")
+        return pipeline.sent
 
 # -------------------- CLI Argument Handling --------------------
 if __name__ == "__main__":
@@ -155,7 +348,21 @@ if __name__ == "__main__":
     parser.add_argument('--test-mode', action='store_true', help='Run in test mode with fake data')
     parser.add_argument('--mode', choices=['alerts', 'incidents', 'both'], 
                        help='Override config mode for testing')
+    parser.add_argument('--replay', metavar='DIR',
+                        help='Replay a capture (settings.capture) through the pipeline instead of polling Cortex')
+    parser.add_argument('--replay-speed', type=float, default=0,
+                        help='0 = as fast as possible, 1 = original timing, 2 = twice as fast...')
+    
+    parser.add_argument('--profile', type=int, default=0, metavar='CYCLES',
+                        help='Profile CYCLES poll cycles per stage (fetch, map, serialize, send), then exit')
+    parser.add_argument('--profile-dir', metavar='DIR',
+                        help='Where to write report.txt and the .pstats files (default: state/profile)')
+    
+    parser.add_argument('--config', metavar='FILE', help='Config file (default: config/config.yaml)')
+    parser.add_argument('--cycles', type=int, default=0,
+                        help='Stop after this many poll cycles (0 = poll until interrupted)')
     
     args = parser.parse_args()
     
-    main(test_mode=args.test_mode)
\ No newline at end of file
+    main(test_mode=args.test_mode, replay=args.replay, replay_speed=args.replay_speed,
+         profile=args.profile, profile_dir=args.profile_dir, config_path=args.config, cycles=args.cycles)
\ No newline at end of file
@@ -0,0 +1,204 @@
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets (seconds) shared by every histogram
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _fmt_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Metrics:
+    """
+    In-process counters, gauges and histograms rendered in the Prometheus
+    text exposition format.
+    """
+    enabled = True
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}  # key -> [per-bucket counts..., sum, count]
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges[_key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    hist[i] += 1
+            hist[-2] += value
+            hist[-1] += 1
+
+    @contextmanager
+    def time(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for kind, series in (("counter", self.counters), ("gauge", self.gauges)):
+                typed = set()
+                for (name, labels), value in sorted(series.items()):
+                    if name not in typed:
+                        lines.append(f"# TYPE {name} {kind}")
+                        typed.add(name)
+                    lines.append(f"{name}{_fmt_labels(labels)} {value}")
+            typed = set()
+            for (name, labels), hist in sorted(self.histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                for bound, count in zip(self.buckets, hist):
+                    lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', bound)])} {count}")
+                lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {hist[-1]}")
+                lines.append(f"{name}_sum{_fmt_labels(labels)} {hist[-2]}")
+                lines.append(f"{name}_count{_fmt_labels(labels)} {hist[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+class NullMetrics:
+    """Drop-in for Metrics when instrumentation is disabled; every call is a no-op."""
+    enabled = False
+
+    def inc(self, name, value=1, **labels):
+        pass
+
+    def set(self, name, value, **labels):
+        pass
+
+    def observe(self, name, value, **labels):
+        pass
+
+    def time(self, name, **labels):
+        return nullcontext()
+
+    def render(self):
+        return ""
+
+
+NULL_METRICS = NullMetrics()
+
+
+def _timed(metrics, name, fn, **labels):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            metrics.observe(name, time.perf_counter() - start, **labels)
+    return wrapper
+
+
+def instrument(metrics, cortex=None, mapper=None, sender=None, encoder=None):
+    """
+    Wrap the collector components' hot methods with latency histograms.
+    With a ParallelEncoder, chunks are timed from submission to their
+    encoded result (worker-side mapping + serialization, queueing included).
+    Nothing is wrapped when `metrics` is disabled, so the disabled cost is zero.
+    """
+    if not metrics.enabled:
+        return
+    if cortex is not None:
+        for endpoint in ("alerts", "incidents"):
+            fetch = getattr(cortex, f"get_{endpoint}")
+
+            @functools.wraps(fetch)
+            def counted(*args, _fetch=fetch, _endpoint=endpoint, **kwargs):
+                with metrics.time("cortex_fetch_seconds", endpoint=_endpoint):
+                    items = _fetch(*args, **kwargs)
+                metrics.inc("cortex_fetched_events_total", len(items), endpoint=_endpoint)
+                return items
+            setattr(cortex, f"get_{endpoint}", counted)
+    if mapper is not None:
+        mapper.map_to_ecs = _timed(metrics, "ecs_map_event_seconds", mapper.map_to_ecs)
+        mapper.map_many = _timed(metrics, "ecs_map_batch_seconds", mapper.map_many)
+    if sender is not None:
+        sender.metrics = metrics
+        sender.send = _timed(metrics, "logstash_send_seconds", sender.send, call="send")
+        sender.send_many = _timed(metrics, "logstash_send_seconds", sender.send_many, call="send_many")
+        sender.send_ndjson = _timed(metrics, "logstash_send_seconds", sender.send_ndjson, call="send_ndjson")
+    if encoder is not None:
+        submit = encoder.submit
+
+        @functools.wraps(submit)
+        def timed_submit(docs):
+            start = time.perf_counter()
+            futures = submit(docs)
+            for future in futures:
+                future.add_done_callback(
+                    lambda f: metrics.observe("ecs_encode_chunk_seconds", time.perf_counter() - start))
+            return futures
+        encoder.submit = timed_submit
+
+
+class MetricsServer:
+    """Serves `metrics.render()` on GET /metrics from a background thread."""
+    def __init__(self, metrics, host="127.0.0.1", port=9108):
+        self.metrics = metrics
+        self.logger = logging.getLogger(__name__)
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def _handler(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name="metrics-http", daemon=True).start()
+        self.logger.info(f"Serving Prometheus metrics on port {self.port}")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
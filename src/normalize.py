@@ -0,0 +1,106 @@
+from datetime import datetime, timezone
+
+# "<fraction>+00:00" suffix per millisecond value; isoformat() omits a zero fraction
+_FRACTIONS = ("+00:00",) + tuple(f".{ms:03d}000+00:00" for ms in range(1, 1000))
+_SECONDS = tuple(f"{s:02d}" for s in range(60))
+
+
+class BatchNormalizer:
+    """
+    Column-wise normalization of a page's timestamps, severities and
+    categories.
+
+    ISO timestamps are assembled from a cached "YYYY-MM-DDTHH:MM:" prefix
+    per minute and lookup tables for seconds and milliseconds, so no
+    datetime is built per event; severities and categories are memoized per
+    distinct raw value. Caches persist across pages and are cleared when
+    they reach `max_entries`. Results are identical to the per-event
+    conversions (datetime.isoformat(), str(v).lower() + table lookup), and
+    an instance can be shared between threads.
+    """
+    def __init__(self, severity_map=None, severity_default=60, category_table=(),
+                 category_default="unknown", max_entries=65536):
+        self.severity_map = severity_map or {}
+        self.severity_default = severity_default
+        self.category_table = tuple(category_table)
+        self.category_default = category_default
+        self.max_entries = max_entries
+        self.minutes = {}
+        self.severity_cache = {}
+        self.category_cache = {}
+
+    def _remember(self, cache, key, value):
+        if len(cache) >= self.max_entries:
+            cache.clear()
+        try:
+            cache[key] = value
+        except TypeError:  # unhashable raw value
+            pass
+        return value
+
+    def timestamps(self, values):
+        """ISO 8601 UTC strings for epoch-ms `values`; None stays None."""
+        minutes = self.minutes
+        out = []
+        append = out.append
+        for ms in values:
+            if type(ms) is not int:
+                append(None if ms is None else datetime.fromtimestamp(ms / 1000, tz=timezone.utc).isoformat())
+                continue
+            seconds, fraction = divmod(ms, 1000)
+            minute, second = divmod(seconds, 60)
+            prefix = minutes.get(minute)
+            if prefix is None:
+                prefix = self._remember(
+                    minutes, minute, datetime.fromtimestamp(minute * 60, tz=timezone.utc).isoformat()[:-8]
+                )
+            append(prefix + _SECONDS[second] + _FRACTIONS[fraction])
+        return out
+
+    def _severity(self, value):
+        if isinstance(value, (int, float)):
+            return int(value)
+        return self.severity_map.get(str(value).lower(), self.severity_default)
+
+    def severities(self, values):
+        """Numeric severity per value: numbers as int, names through severity_map; None stays None."""
+        cache = self.severity_cache
+        out = []
+        append = out.append
+        for value in values:
+            if value is None:
+                append(None)
+                continue
+            try:
+                append(cache[value])
+            except (KeyError, TypeError):
+                append(self._remember(cache, value, self._severity(value)))
+        return out
+
+    def _category(self, value):
+        value = value.lower()
+        for names, category in self.category_table:
+            if value in names:
+                return category
+        return self.category_default
+
+    def categories(self, values):
+        """ECS category of each Cortex category (first matching category_table entry)."""
+        cache = self.category_cache
+        out = []
+        append = out.append
+        for value in values:
+            try:
+                append(cache[value])
+            except (KeyError, TypeError):
+                append(self._remember(cache, value, self._category(value)))
+        return out
+
+    def timestamp(self, ms):
+        return self.timestamps((ms,))[0]
+
+    def severity(self, value):
+        return self.severities((value,))[0]
+
+    def category(self, value):
+        return self.categories((value,))[0]
@@ -0,0 +1,89 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .json_codec import get_codec
+except ImportError:
+    from json_codec import get_codec
+
+# Per-process state set up once by _init_worker
+_worker = {}
+
+
+def _init_worker(map_fn, codec_name):
+    _worker["map"] = map_fn
+    _worker["dumps"] = get_codec(codec_name).dumps
+
+
+def _encode_chunk(docs):
+    map_fn, dumps = _worker["map"], _worker["dumps"]
+    return len(docs), b"".join([dumps(map_fn(doc)) + b"\n" for doc in docs])
+
+
+class ParallelEncoder:
+    """
+    Map and serialize raw Cortex documents to NDJSON in worker processes.
+
+    `map_fn` (picklable: a module-level function, a partial of one, or a
+    bound method of a plain mapper instance) is shipped to each worker once.
+    Documents are split into chunks of `chunk_docs`; each chunk comes back as
+    a (count, ndjson_bytes) pair, so the parent only writes bytes. Results are
+    always returned in submission order.
+    """
+    def __init__(self, map_fn, codec="auto", workers=None, chunk_docs=500):
+        get_codec(codec)  # fail fast in the parent on an unknown/missing codec
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_docs = max(1, chunk_docs)
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(map_fn, codec)
+        )
+        # Submitted chunks not finished yet, cancelled on close()
+        self.pending = set()
+
+    @classmethod
+    def from_config(cls, map_fn, settings, codec="auto"):
+        """ParallelEncoder for `settings.map_workers` > 0, otherwise None (map in-process)."""
+        workers = settings.get('map_workers', 0)
+        if not workers:
+            return None
+        return cls(map_fn, codec=codec, workers=workers, chunk_docs=settings.get('map_chunk_docs', 500))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, docs):
+        """Queue `docs` for encoding; returns one future per chunk, in order."""
+        docs = list(docs)
+        futures = [
+            self.pool.submit(_encode_chunk, docs[i:i + self.chunk_docs])
+            for i in range(0, len(docs), self.chunk_docs)
+        ]
+        for future in futures:
+            self.pending.add(future)
+            future.add_done_callback(self.pending.discard)
+        return futures
+
+    def encode(self, pages, lookahead=None):
+        """
+        Yield (count, ndjson_bytes) chunks for `pages` (an iterable of
+        document lists) in input order, keeping at most `lookahead` chunks
+        (default: two per worker) in flight.
+        """
+        lookahead = lookahead or 2 * self.workers
+        pending = deque()
+        for page in pages:
+            pending.extend(self.submit(page))
+            while len(pending) > lookahead:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def close(self):
+        # shutdown(cancel_futures=True) needs Python 3.9
+        for future in list(self.pending):
+            future.cancel()
+        self.pool.shutdown(wait=True)
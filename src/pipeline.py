@@ -0,0 +1,219 @@
+import logging
+import queue
+import threading
+from collections import deque
+
+# Sentinel passed down the queues when a stage has finished
+_STOP = object()
+# Payload of a batch that could not be mapped
+_FAILED = object()
+
+
+def _event_id(event):
+    # Raw Cortex event or mapped ECS document
+    return event.get('alert_id') or event.get('incident_id') or (event.get('event') or {}).get('id', 'unknown')
+
+
+class Pipeline:
+    """
+    Three-stage fetch -> map -> send pipeline.
+
+    Each stage runs in its own worker thread and hands batches to the next
+    one through a bounded queue, so a slow sender blocks the fetcher
+    (backpressure) instead of letting events pile up in memory. An optional
+    DedupIndex drops already shipped events before they are mapped; events
+    are recorded in it only once the send stage has shipped them.
+
+    With a ParallelEncoder the map stage only hands batches to worker
+    processes; the send stage writes the resulting NDJSON chunks in order.
+    An optional RollupAggregator sits between mapping and sending (it needs
+    the mapped events, so it is not combined with an encoder); its closed
+    windows are also flushed while no batches arrive. A batch whose events
+    sit in open rollup groups is only acknowledged (and recorded in the
+    DedupIndex) once those groups' summaries have been sent.
+
+    `ack(batch, shipped)`, if given, is called from the send stage for every
+    fetched batch, in fetch order, once it has been handled: `shipped` is
+    False if events failed to map or send since the previous batch's ack.
+    """
+    def __init__(self, mapper, sender, queue_size=4, dedup=None, encoder=None, aggregator=None,
+                 flush_interval=1.0, ack=None):
+        if encoder is not None and aggregator is not None:
+            raise ValueError("rollup aggregation needs in-process mapping (no encoder)")
+        self.mapper = mapper
+        self.sender = sender
+        self.dedup = dedup
+        self.encoder = encoder
+        self.aggregator = aggregator
+        self.flush_interval = flush_interval
+        self.ack = ack
+        # Whether events were lost since the last acknowledged batch
+        self.unshipped = False
+        # Rollup mode: (seq, raw, fresh) of batches with events in open groups
+        self.held = deque()
+        self.seq = 0
+        self.map_queue = queue.Queue(maxsize=queue_size)
+        self.send_queue = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        self.logger = logging.getLogger(__name__)
+        self.sent = 0
+        self.failed = 0
+
+    def stop(self):
+        self.stop_event.set()
+
+    def wait(self, timeout):
+        """Sleep between polls; returns True as soon as the pipeline is stopped."""
+        return self.stop_event.wait(timeout)
+
+    def _fetch(self, source):
+        try:
+            for batch in source:
+                if self.stop_event.is_set():
+                    break
+                if batch:
+                    self.map_queue.put(batch)
+        except Exception as e:
+            self.logger.error(f"Fetch stage failed: {str(e)}")
+        finally:
+            self.map_queue.put(_STOP)
+
+    def _map(self):
+        timeout = self.flush_interval if self.aggregator is not None else None
+        while True:
+            try:
+                batch = self.map_queue.get(timeout=timeout)
+            except queue.Empty:
+                self._emit(self.aggregator.expire())
+                self._release()
+                continue
+            if batch is _STOP:
+                if self.aggregator is not None:
+                    self._emit(self.aggregator.flush())
+                    self._release()
+                self.send_queue.put(_STOP)
+                return
+            # The raw batch travels along so the send stage can acknowledge it
+            raw = batch
+            if self.dedup is not None:
+                batch = self.dedup.check(batch)
+            if self.aggregator is not None:
+                self._aggregate(raw, batch)
+                continue
+            if not batch:
+                self.send_queue.put(([(raw, batch)], batch, None))
+                continue
+            try:
+                if self.encoder is not None:
+                    payload = self.encoder.submit(batch)
+                else:
+                    payload = self.mapper.map_many(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                self.logger.error(f"Failed to map batch of {len(batch)} events: {str(e)}")
+                payload = _FAILED
+            self.send_queue.put(([(raw, batch)], batch, payload))
+
+    def _aggregate(self, raw, batch):
+        seq = self.seq
+        self.seq += 1
+        self.held.append((seq, raw, batch))
+        try:
+            self._emit(self.aggregator.process(self.mapper.map_many(batch), seq=seq))
+        except Exception as e:
+            self.failed += len(batch)
+            self.logger.error(f"Failed to map batch of {len(batch)} events: {str(e)}")
+            self.send_queue.put(([], [], _FAILED))
+        self._release()
+
+    def _release(self):
+        # A batch is complete once no open rollup group holds its events (groups
+        # remember the first batch they hold) and the summaries queued so far are sent
+        oldest = self.aggregator.oldest_seq()
+        done = []
+        while self.held and (oldest is None or self.held[0][0] < oldest):
+            _, raw, fresh = self.held.popleft()
+            done.append((raw, fresh))
+        if done:
+            self.send_queue.put((done, [], None))
+
+    def _emit(self, ecs_events):
+        # Rolled-up output no longer lines up with raw events: it is its own batch
+        if ecs_events:
+            self.send_queue.put(([], ecs_events, ecs_events))
+
+    def _send(self):
+        while True:
+            item = self.send_queue.get()
+            if item is _STOP:
+                return
+            done, batch, payload = item
+            sent = 0
+            if payload is _FAILED:
+                # Already counted by the map stage
+                self.unshipped = True
+            elif payload is not None:
+                if self.encoder is not None:
+                    sent = self._send_encoded(payload)
+                else:
+                    sent = self.sender.send_many(payload)
+                self.sent += sent
+                self.failed += len(batch) - sent
+                self.unshipped |= sent < len(batch)
+                for event in batch[sent:]:
+                    self.logger.error(f"Failed to send event: {_event_id(event)}")
+            if done:
+                self._acknowledge(done, batch, sent)
+
+    def _acknowledge(self, done, batch, sent):
+        # done: (raw batch, its fresh events) pairs; the fresh events are the
+        # batch just sent, or events already shipped within rollup summaries
+        shipped = not self.unshipped
+        self.unshipped = False
+        for raw, fresh in done:
+            if self.dedup is not None:
+                kept = fresh[:sent] if fresh is batch else (fresh if shipped else fresh[:0])
+                self.dedup.record(kept)
+                if len(kept) < len(fresh):
+                    self.dedup.release(fresh[len(kept):])
+            if self.ack is not None:
+                try:
+                    self.ack(raw, shipped)
+                except Exception as e:
+                    self.logger.error(f"Failed to acknowledge batch: {str(e)}")
+
+    def _send_encoded(self, futures):
+        # Chunks are written in submission order; stop at the first failure
+        sent = 0
+        for future in futures:
+            try:
+                count, data = future.result()
+            except Exception as e:
+                self.logger.error(f"Failed to map batch chunk: {str(e)}")
+                break
+            written = self.sender.send_ndjson(data, count)
+            sent += written
+            if written < count:
+                break
+        return sent
+
+    def run(self, source):
+        """
+        Run the pipeline until `source` (an iterable of raw event batches)
+        is exhausted or stop() is called.
+        """
+        threads = [
+            threading.Thread(target=self._fetch, args=(source,), name="pipeline-fetch", daemon=True),
+            threading.Thread(target=self._map, name="pipeline-map", daemon=True),
+            threading.Thread(target=self._send, name="pipeline-send", daemon=True),
+        ]
+        for t in threads:
+            t.start()
+        try:
+            for t in threads:
+                while t.is_alive():
+                    t.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stop()
+            raise
+        return self.sent
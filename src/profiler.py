@@ -0,0 +1,217 @@
+import cProfile
+import functools
+import io
+import logging
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+# Collector stages, in pipeline order
+STAGES = ("fetch", "map", "serialize", "send")
+
+_END = object()
+
+# Python 3.9+; without it a stage's peak is its net allocation at exit (a lower bound)
+_reset_peak = getattr(tracemalloc, "reset_peak", None)
+
+
+def _ndjson(dumps, events):
+    return b"".join([dumps(event) + b"\n" for event in events])
+
+
+class _StageStats:
+    __slots__ = ("calls", "seconds", "allocated", "peak", "sites")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.allocated = 0  # net bytes still allocated when the stage was left
+        self.peak = 0       # largest transient allocation within one call
+        self.sites = Counter()  # "file:line" -> net bytes
+
+
+class StageProfiler:
+    """
+    cProfile and tracemalloc measurements split by collector stage.
+
+    Code runs inside `stage(name)` (or `call`/`iterate`); each stage has its
+    own cProfile.Profile, and a tracemalloc snapshot is diffed at every stage
+    switch so allocations land on the stage that made them. Stages nest: a
+    stage entered from another one (e.g. serialize inside send) suspends the
+    outer stage until it returns.
+
+    tracemalloc and (since Python 3.12) cProfile are process-wide, so
+    profiled stages never overlap: a stage waits until another thread's
+    stage has finished. Throughput while profiling is therefore lower than
+    in normal operation; the figures are per-stage costs, not latencies.
+    """
+    def __init__(self, top=25, frames=1):
+        self.top = top
+        self.frames = frames
+        self.lock = threading.RLock()
+        self.profiles = {name: cProfile.Profile() for name in STAGES}
+        self.stats = {name: _StageStats() for name in STAGES}
+        self.active = None
+        self.since = 0.0
+        self.base = 0
+        self.snapshot = None
+        self.started = None
+        self.logger = logging.getLogger(__name__)
+        self.own_tracing = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self.own_tracing = True
+        self.started = time.perf_counter()
+        return self
+
+    def stop(self):
+        if self.own_tracing:
+            tracemalloc.stop()
+            self.own_tracing = False
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+
+    def _switch(self, name):
+        # Close the running stage's segment (time, allocations), then open `name`'s
+        now = time.perf_counter()
+        if self.active is not None:
+            self.profiles[self.active].disable()
+        snapshot = self._snapshot() if tracemalloc.is_tracing() else None
+        if self.active is not None:
+            stats = self.stats[self.active]
+            stats.seconds += now - self.since
+            if snapshot is not None and self.snapshot is not None:
+                current, peak = tracemalloc.get_traced_memory()
+                stats.allocated += current - self.base
+                stats.peak = max(stats.peak, (peak if _reset_peak is not None else current) - self.base)
+                for diff in snapshot.compare_to(self.snapshot, "lineno"):
+                    if diff.size_diff:
+                        frame = diff.traceback[0]
+                        stats.sites[f"{frame.filename}:{frame.lineno}"] += diff.size_diff
+        self.active = name
+        self.snapshot = snapshot
+        if snapshot is not None:
+            if _reset_peak is not None:
+                _reset_peak()
+            self.base = tracemalloc.get_traced_memory()[0]
+        if name is not None:
+            self.profiles[name].enable()
+        self.since = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        with self.lock:
+            outer = self.active
+            self.stats[name].calls += 1
+            self._switch(name)
+            try:
+                yield
+            finally:
+                self._switch(outer)
+
+    def call(self, name, fn, *args, **kwargs):
+        with self.stage(name):
+            return fn(*args, **kwargs)
+
+    def iterate(self, name, iterable):
+        """Yield the items of `iterable`, producing each one inside stage `name`."""
+        it = iter(iterable)
+        while True:
+            with self.stage(name):
+                item = next(it, _END)
+            if item is _END:
+                return
+            yield item
+
+    def wrap(self, name, fn):
+        @functools.wraps(fn)
+        def profiled(*args, **kwargs):
+            with self.stage(name):
+                return fn(*args, **kwargs)
+        return profiled
+
+    def instrument(self, cortex=None, mapper=None, sender=None):
+        """
+        Attribute the collector components' work to stages: client fetches,
+        batch mapping, and the sender's serialization and write (send_many is
+        split into serializing to NDJSON and send_ndjson).
+        """
+        if cortex is not None:
+            for endpoint in ("alerts", "incidents"):
+                setattr(cortex, f"get_{endpoint}", self.wrap("fetch", getattr(cortex, f"get_{endpoint}")))
+        if mapper is not None:
+            mapper.map_many = self.wrap("map", mapper.map_many)
+        if sender is not None:
+            send_ndjson = sender.send_ndjson
+
+            def send_many(events):
+                with self.stage("send"):
+                    data = self.call("serialize", _ndjson, sender.codec.dumps, events)
+                    return send_ndjson(data, len(events))
+            sender.send_many = send_many
+
+    def chunks(self, pages, map_page, dumps):
+        """(count, ndjson) chunks of raw `pages`, with fetch, map and serialize profiled separately."""
+        for page in self.iterate("fetch", pages):
+            docs = self.call("map", map_page, page)
+            yield len(docs), self.call("serialize", _ndjson, dumps, docs)
+
+    def report(self):
+        """Per-stage summary, then each stage's hottest functions and allocation sites."""
+        with self.lock:
+            elapsed = time.perf_counter() - (self.started or time.perf_counter())
+            out = io.StringIO()
+            out.write(f"Profiled {elapsed:.3f}s wall time\n\n")
+            out.write(f"{'stage':<10} {'calls':>8} {'seconds':>10} {'net KiB':>10} {'peak KiB':>10}\n")
+            ranked = sorted(STAGES, key=lambda name: self.stats[name].seconds, reverse=True)
+            for name in ranked:
+                stats = self.stats[name]
+                out.write(f"{name:<10} {stats.calls:>8} {stats.seconds:>10.3f} "
+                          f"{stats.allocated / 1024:>10.1f} {stats.peak / 1024:>10.1f}\n")
+            for name in ranked:
+                stats = self.stats[name]
+                if not stats.calls:
+                    continue
+                out.write(f"\n==== {name} ====\n")
+                pstats.Stats(self.profiles[name], stream=out).sort_stats("cumulative").print_stats(self.top)
+                if stats.sites:
+                    out.write("Top allocation sites (net bytes):\n")
+                    for site, size in stats.sites.most_common(self.top):
+                        out.write(f"{size:>12}  {site}\n")
+            return out.getvalue()
+
+    def write(self, directory):
+        """
+        Write report.txt, one <stage>.pstats per stage that ran and a
+        combined profile.pstats (for snakeviz / pstats browsing); returns
+        the report path.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        report = directory / "report.txt"
+        report.write_text(self.report())
+        with self.lock:
+            combined = None
+            for name in STAGES:
+                if not self.stats[name].calls:
+                    continue
+                profile = self.profiles[name]
+                profile.dump_stats(str(directory / f"{name}.pstats"))
+                if combined is None:
+                    combined = pstats.Stats(profile)
+                else:
+                    combined.add(profile)
+            if combined is not None:
+                combined.dump_stats(str(directory / "profile.pstats"))
+        self.logger.info(f"Profile written to {directory}")
+        return report
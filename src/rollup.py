@@ -0,0 +1,162 @@
+import time
+from collections import OrderedDict
+
+
+def _lookup(event, path):
+    value = event
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+class _Group:
+    __slots__ = ("first", "count", "first_ts", "last_ts", "sample_ids", "start", "last", "seq")
+
+    def __init__(self, event, now, seq=None):
+        self.first = event
+        self.count = 1
+        self.first_ts = self.last_ts = event.get("@timestamp")
+        self.sample_ids = [_lookup(event, ("event", "id"))]
+        self.start = self.last = now
+        self.seq = seq  # input batch of the first event
+
+    def add(self, event, now, max_samples):
+        self.count += 1
+        self.last = now
+        ts = event.get("@timestamp")
+        if ts is not None:
+            if self.first_ts is None or ts < self.first_ts:
+                self.first_ts = ts
+            if self.last_ts is None or ts > self.last_ts:
+                self.last_ts = ts
+        if len(self.sample_ids) < max_samples:
+            self.sample_ids.append(_lookup(event, ("event", "id")))
+
+
+class RollupAggregator:
+    """
+    Rolls up near-identical ECS events before they are shipped.
+
+    Events sharing the values of the `key` fields (dotted ECS paths) are
+    grouped. In `tumbling` mode a group closes `window` seconds after its
+    first event; in `sliding` mode each new event pushes the close time to
+    `window` seconds later, up to `max_window` seconds after the first one.
+    A closed group is emitted as its first event plus `event.count`,
+    `event.start`/`event.end` (first/last @timestamp) and up to
+    `max_samples` event IDs; a group of one is emitted unchanged. Events
+    whose `event.severity` is in `passthrough_severities` bypass the stage.
+    At most `max_groups` groups are kept; the oldest is emitted early when
+    the limit is reached.
+    """
+    def __init__(self, key=("event.action", "host.name", "source.ip"), window=30, mode="tumbling",
+                 max_window=None, max_groups=10000, max_samples=5,
+                 passthrough_severities=("high", "critical"), clock=time.monotonic):
+        if mode not in ("tumbling", "sliding"):
+            raise ValueError(f"Unknown rollup mode: {mode}")
+        self.key_paths = [tuple(field.split(".")) for field in key]
+        self.window = window
+        self.mode = mode
+        self.max_window = max(max_window or window * 10, window)
+        self.max_groups = max_groups
+        self.max_samples = max_samples
+        self.passthrough = {str(s).lower() for s in passthrough_severities}
+        self.clock = clock
+        # Insertion order (tumbling: close time) or last update (sliding)
+        self.groups = OrderedDict()
+        self.absorbed = 0
+
+    @classmethod
+    def from_config(cls, rollup_cfg):
+        """RollupAggregator for an enabled `rollup:` block, otherwise None."""
+        rollup_cfg = rollup_cfg or {}
+        if not rollup_cfg.get('enabled', False):
+            return None
+        return cls(
+            key=rollup_cfg.get('key', ("event.action", "host.name", "source.ip")),
+            window=rollup_cfg.get('window_seconds', 30),
+            mode=rollup_cfg.get('mode', 'tumbling'),
+            max_window=rollup_cfg.get('max_window_seconds'),
+            max_groups=rollup_cfg.get('max_groups', 10000),
+            max_samples=rollup_cfg.get('max_samples', 5),
+            passthrough_severities=rollup_cfg.get('passthrough_severities', ("high", "critical")),
+        )
+
+    def _closes_at(self, group):
+        if self.mode == "sliding":
+            return min(group.last + self.window, group.start + self.max_window)
+        return group.start + self.window
+
+    def process(self, events, seq=None):
+        """
+        Feed mapped events; returns what should be shipped now, in order.
+        `seq` numbers the input batch (increasing), see oldest_seq().
+        """
+        now = self.clock()
+        out = self.expire(now)
+        for event in events:
+            if str(_lookup(event, ("event", "severity"))).lower() in self.passthrough:
+                out.append(event)
+                continue
+            key = tuple(_lookup(event, path) for path in self.key_paths)
+            group = self.groups.get(key)
+            if group is not None and now >= self._closes_at(group):
+                out.append(self._summary(self.groups.pop(key)))
+                group = None
+            if group is None:
+                if len(self.groups) >= self.max_groups:
+                    out.append(self._summary(self.groups.popitem(last=False)[1]))
+                self.groups[key] = _Group(event, now, seq)
+                continue
+            group.add(event, now, self.max_samples)
+            self.absorbed += 1
+            if self.mode == "sliding":
+                self.groups.move_to_end(key)
+        return out
+
+    def expire(self, now=None):
+        """Summaries of the groups whose window has closed."""
+        now = self.clock() if now is None else now
+        if self.mode == "sliding":
+            # max_window can close a group before groups updated earlier than it
+            closed = [key for key, group in self.groups.items() if now >= self._closes_at(group)]
+            return [self._summary(self.groups.pop(key)) for key in closed]
+        out = []
+        while self.groups:
+            key, group = next(iter(self.groups.items()))
+            if now < self._closes_at(group):
+                break
+            del self.groups[key]
+            out.append(self._summary(group))
+        return out
+
+    def oldest_seq(self):
+        """Lowest `seq` still held in an open group (None if none is): earlier batches are fully emitted."""
+        seqs = [group.seq for group in self.groups.values() if group.seq is not None]
+        return min(seqs) if seqs else None
+
+    def flush(self):
+        """Summaries of every open group (shutdown)."""
+        out = [self._summary(group) for group in self.groups.values()]
+        self.groups.clear()
+        return out
+
+    def _summary(self, group):
+        if group.count == 1:
+            return group.first
+        summary = dict(group.first)
+        summary["event"] = {
+            **group.first.get("event", {}),
+            "count": group.count,
+            "start": group.first_ts,
+            "end": group.last_ts,
+        }
+        summary["tags"] = list(group.first.get("tags", [])) + ["rollup"]
+        panw = group.first.get("panw") or {}
+        summary["panw"] = {**panw, "cortex_xdr": {**(panw.get("cortex_xdr") or {}), "rollup": {
+            "sample_ids": group.sample_ids,
+            "window_seconds": self.window,
+            "mode": self.mode,
+        }}}
+        return summary
@@ -0,0 +1,36 @@
+class AdaptivePollScheduler:
+    """
+    Backlog-aware delay between poll cycles.
+
+    - a cycle that hit its event budget (backlog pending): poll again after
+      `min_interval`
+    - a cycle that returned events: wait the regular `interval`
+    - an empty cycle: multiply the previous delay by `backoff`, up to
+      `max_interval`
+    """
+    def __init__(self, interval=60, min_interval=0, max_interval=300, backoff=2.0):
+        self.interval = interval
+        self.min_interval = min(min_interval, interval)
+        self.max_interval = max(max_interval, interval)
+        self.backoff = backoff
+        self.delay = interval
+
+    @classmethod
+    def from_settings(cls, settings):
+        interval = settings.get('polling_interval', 60)
+        return cls(
+            interval=interval,
+            min_interval=settings.get('min_polling_interval', 0),
+            max_interval=settings.get('max_polling_interval', interval),
+            backoff=settings.get('backoff_factor', 2.0),
+        )
+
+    def next_delay(self, fetched, backlog=False):
+        """Seconds to wait after a cycle that fetched `fetched` new events."""
+        if backlog:
+            self.delay = self.min_interval
+        elif fetched:
+            self.delay = self.interval
+        else:
+            self.delay = min(self.max_interval, max(self.delay, self.interval) * self.backoff)
+        return self.delay
@@ -0,0 +1,140 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+try:
+    from .checkpoint_store import write_atomic
+except ImportError:
+    from checkpoint_store import write_atomic
+
+
+class Spool:
+    """
+    Disk-backed write-ahead spool for outbound NDJSON records.
+
+    Records that could not be delivered are appended to numbered segment
+    files (rotated at `segment_bytes`) and drained in large chunks once the
+    output is back. The read position is kept in an atomically written
+    offset file so a crash never skips or loses spooled data (at worst the
+    last chunk is replayed). Total disk usage is capped at `max_bytes`; when
+    full, `policy` decides whether the oldest segments are discarded
+    ("drop_oldest") or new records are refused ("drop_newest").
+    """
+    SUFFIX = ".seg"
+
+    def __init__(self, directory, segment_bytes=16 * 1024 * 1024,
+                 max_bytes=1024 * 1024 * 1024, policy="drop_oldest"):
+        if policy not in ("drop_oldest", "drop_newest"):
+            raise ValueError(f"Unknown spool policy: {policy}")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.logger = logging.getLogger(__name__)
+        self.lock = threading.Lock()
+        self.offset_file = self.directory / "offset.json"
+        self.dropped = 0
+        self.segments = sorted(
+            int(p.stem) for p in self.directory.glob(f"*{self.SUFFIX}") if p.stem.isdigit()
+        )
+        self.read_segment, self.read_offset = self._load_offset()
+
+    def _path(self, seq):
+        return self.directory / f"{seq:012d}{self.SUFFIX}"
+
+    def _load_offset(self):
+        try:
+            with open(self.offset_file, encoding="utf-8") as f:
+                state = json.load(f)
+            return state["segment"], state["offset"]
+        except (OSError, ValueError, KeyError):
+            return None, 0
+
+    def _save_offset(self, seq, offset):
+        self.read_segment, self.read_offset = seq, offset
+        write_atomic(self.offset_file, json.dumps({"segment": seq, "offset": offset}).encode("utf-8"))
+
+    def _consumed(self, seq):
+        return self.read_offset if seq == self.read_segment else 0
+
+    def _used(self):
+        return sum(self._path(s).stat().st_size - self._consumed(s) for s in self.segments)
+
+    def size(self):
+        """Bytes spooled and not yet drained."""
+        with self.lock:
+            return self._used()
+
+    def empty(self):
+        return not self.segments
+
+    def _drop_oldest(self):
+        seq = self.segments.pop(0)
+        path = self._path(seq)
+        lost = path.stat().st_size - self._consumed(seq)
+        path.unlink()
+        self.dropped += lost
+        self.logger.warning(f"Spool full, dropped oldest segment {path.name} ({lost} bytes)")
+
+    def append(self, records):
+        """
+        Append encoded NDJSON records (bytes, newline-terminated).
+        Returns the number of records accepted.
+        """
+        data = b"".join(records)
+        if not data:
+            return 0
+        with self.lock:
+            used = self._used()
+            if used + len(data) > self.max_bytes:
+                if self.policy == "drop_newest":
+                    self.dropped += len(data)
+                    self.logger.warning(f"Spool full, refused {len(records)} records")
+                    return 0
+                while self.segments and used + len(data) > self.max_bytes:
+                    seq = self.segments[0]
+                    used -= self._path(seq).stat().st_size - self._consumed(seq)
+                    self._drop_oldest()
+            if not self.segments or self._path(self.segments[-1]).stat().st_size >= self.segment_bytes:
+                self.segments.append(self.segments[-1] + 1 if self.segments else 1)
+            with open(self._path(self.segments[-1]), "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            return len(records)
+
+    def drain(self, write, chunk_bytes=1024 * 1024):
+        """
+        Replay spooled records through `write(bytes)` in chunks of whole lines,
+        oldest first. Stops (re-raising) on the first failed write; the read
+        offset only moves past chunks that were written. Returns bytes drained.
+        """
+        drained = 0
+        with self.lock:
+            while self.segments:
+                seq = self.segments[0]
+                offset = self._consumed(seq)
+                with open(self._path(seq), "rb") as f:
+                    f.seek(offset)
+                    while True:
+                        chunk = f.read(chunk_bytes)
+                        if not chunk:
+                            break
+                        end = chunk.rfind(b"\n") + 1
+                        if end == 0:
+                            # Record longer than chunk_bytes: read it whole
+                            chunk += f.readline()
+                            end = len(chunk)
+                        else:
+                            f.seek(offset + end)
+                        write(chunk[:end])
+                        offset += end
+                        drained += end
+                        self._save_offset(seq, offset)
+                self.segments.pop(0)
+                self._path(seq).unlink()
+                self._save_offset(None, 0)
+        return drained
@@ -0,0 +1,135 @@
+import heapq
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+try:
+    from .metrics import NULL_METRICS
+    from .scheduler import AdaptivePollScheduler
+except ImportError:
+    from metrics import NULL_METRICS
+    from scheduler import AdaptivePollScheduler
+
+
+def tenant_configs(config):
+    """
+    One client config per entry of `tenants:`. Each entry overrides the
+    shared `cortex:` block (url, api_key, api_key_id, api rate limits...) and
+    must have a `name`, used as the checkpoint key and the ECS `tenant` field.
+    """
+    configs = {}
+    for entry in config.get('tenants') or []:
+        entry = dict(entry)
+        name = entry.pop('name')
+        if name in configs:
+            raise ValueError(f"Duplicate tenant name: {name}")
+        cortex = config.get('cortex', {})
+        if 'api' in entry:
+            # Per-tenant transport settings (rate limit...) on top of the shared ones
+            entry['api'] = {**(cortex.get('api') or {}), **entry['api']}
+        configs[name] = {**config, 'cortex': {**cortex, **entry, 'tenant': name}}
+    return configs
+
+
+def _fetch_tenant(client, streams, budget):
+    # One poll of every stream of a tenant: (batches, backlog pending)
+    batches = [client.get_alerts(max_results=budget)]
+    if 'incidents' in streams:
+        batches.append(client.get_incidents(max_results=budget))
+    has_more = getattr(client, 'has_more', {})
+    return batches, any(has_more.get(s) for s in streams)
+
+
+class TenantPoller:
+    """
+    Polls many Cortex tenants from one process.
+
+    Every tenant keeps its own client (checkpoints, rate limiter) and its own
+    AdaptivePollScheduler; one loop keeps a heap of due times and runs the
+    due fetches on a shared thread pool of `workers` threads, sleeping until
+    the next tenant is due or a fetch completes. A tenant is never polled
+    twice concurrently.
+    """
+    def __init__(self, clients, config, pipeline, metrics=NULL_METRICS):
+        self.clients = clients
+        self.pipeline = pipeline
+        self.metrics = metrics
+        self.logger = logging.getLogger(__name__)
+        settings = config.get('settings', {})
+        mode = settings.get('mode', 'alerts')
+        self.streams = ['alerts', 'incidents'] if mode in ['incidents', 'both'] else ['alerts']
+        self.budget = settings.get('max_events_per_poll', settings.get('max_results', 100))
+        self.workers = settings.get('tenant_workers', min(8, len(clients)) or 1)
+        self.schedulers = {name: AdaptivePollScheduler.from_settings(settings) for name in clients}
+        # Dedup index snapshot at most once per regular polling interval
+        self.save_interval = settings.get('polling_interval', 60)
+        # Dedup hits/misses already added to the counters
+        self.dedup_exported = {"hits": 0, "misses": 0}
+
+    def batches(self, cycles=None):
+        """
+        Yield raw event batches from all tenants until the pipeline stops, or
+        until every tenant has been polled `cycles` times.
+        """
+        due = [(0.0, name) for name in self.clients]
+        heapq.heapify(due)
+        inflight = {}
+        polls = dict.fromkeys(self.clients, 0)
+        last_save = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tenant-poll") as pool:
+            while not self.pipeline.stop_event.is_set():
+                now = time.monotonic()
+                while due and due[0][0] <= now:
+                    _, name = heapq.heappop(due)
+                    future = pool.submit(_fetch_tenant, self.clients[name], self.streams, self.budget)
+                    inflight[future] = (name, now)
+                timeout = max(0.0, due[0][0] - now) if due else None
+                if not inflight and not due:
+                    return
+                if not inflight:
+                    if self.pipeline.wait(timeout):
+                        return
+                    continue
+                # Wake up for whichever comes first: a finished fetch, a due tenant, or stop()
+                done, _ = wait(inflight, timeout=min(timeout, 1.0) if timeout is not None else 1.0,
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, started = inflight.pop(future)
+                    try:
+                        batches, backlog = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Tenant {name}: poll failed: {str(e)}")
+                        batches, backlog = [], False
+                    fetched = 0
+                    for batch in batches:
+                        fetched += len(batch)
+                        yield batch
+                    delay = self.schedulers[name].next_delay(fetched, backlog=backlog)
+                    polls[name] += 1
+                    if not cycles or polls[name] < cycles:
+                        heapq.heappush(due, (time.monotonic() + delay, name))
+                    self._record(name, fetched, delay, time.monotonic() - started)
+                if self.pipeline.dedup is not None and time.monotonic() - last_save >= self.save_interval:
+                    self.pipeline.dedup.save()
+                    last_save = time.monotonic()
+            for future in inflight:
+                future.cancel()
+
+    def _record(self, name, fetched, delay, seconds):
+        if fetched:
+            self.logger.info(f"Tenant {name}: fetched {fetched} events, next poll in {delay:g}s")
+        if not self.metrics.enabled:
+            return
+        self.metrics.observe("collector_poll_cycle_seconds", seconds, tenant=name)
+        self.metrics.set("collector_poll_delay_seconds", delay, tenant=name)
+        client = self.clients[name]
+        if hasattr(client, 'since_ms'):
+            for stream in self.streams:
+                self.metrics.set("cortex_checkpoint_lag_seconds",
+                                 time.time() - client.since_ms(stream) / 1000, stream=stream, tenant=name)
+        if self.pipeline.dedup is not None:
+            # One index for all tenants: unlabelled
+            stats = self.pipeline.dedup.stats()
+            for kind in ("hits", "misses"):
+                self.metrics.inc(f"dedup_{kind}_total", stats[kind] - self.dedup_exported[kind])
+                self.dedup_exported[kind] = stats[kind]
@@ -0,0 +1,92 @@
+# test/test_api_transport.py
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from api_transport import CortexTransport, TokenBucket, retry_after_seconds
+
+@pytest.fixture
+def flaky_server():
+    """Replies with the queued (status, headers) pairs, then 200 {"reply": {}}."""
+    script, seen = [], []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            seen.append(self.client_address[1])
+            status, headers = script.pop(0) if script else (200, {})
+            body = json.dumps({"reply": {"status": status}}).encode()
+            self.send_response(status)
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/", script, seen
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_retries_429_and_5xx_honoring_retry_after(flaky_server):
+    url, script, seen = flaky_server
+    script.extend([(429, {"Retry-After": "7"}), (503, {})])
+    transport = CortexTransport(retries=3, backoff=0.01)
+    sleeps = []
+    transport.sleep = sleeps.append
+    assert transport.post(url, {"request_data": {}}) == {"reply": {"status": 200}}
+    assert len(seen) == 3
+    assert sleeps[0] == 7 and sleeps[1] <= 0.02
+    # Every attempt reused the same keep-alive connection
+    assert len(set(seen)) == 1
+
+def test_retry_after_is_capped(flaky_server):
+    url, script, seen = flaky_server
+    script.append((503, {"Retry-After": "86400"}))
+    transport = CortexTransport(retries=1, backoff=0, max_retry_after=60)
+    sleeps = []
+    transport.sleep = sleeps.append
+    transport.post(url, {})
+    assert sleeps == [60]
+
+def test_gives_up_after_retries_and_does_not_retry_client_errors(flaky_server):
+    url, script, seen = flaky_server
+    transport = CortexTransport(retries=2, backoff=0)
+    transport.sleep = lambda s: None
+    script.extend([(500, {})] * 3)
+    with pytest.raises(requests.HTTPError):
+        transport.post(url, {})
+    assert len(seen) == 3
+    script.append((401, {}))
+    with pytest.raises(requests.HTTPError):
+        transport.post(url, {})
+    assert len(seen) == 4
+
+def test_token_bucket_allows_burst_then_paces():
+    now, slept = [0.0], []
+    def sleep(s):
+        slept.append(s)
+        now[0] += s
+    bucket = TokenBucket(rate=2, burst=3, clock=lambda: now[0], sleep=sleep)
+    for _ in range(5):
+        bucket.acquire()
+    assert slept == [0.5, 0.5]
+
+def test_retry_after_parses_seconds_and_dates():
+    assert retry_after_seconds("3") == 3.0
+    assert retry_after_seconds(None) is None
+    assert retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert retry_after_seconds("soon") is None
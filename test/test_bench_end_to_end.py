@@ -0,0 +1,93 @@
+# test/test_bench_end_to_end.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'bench')))
+
+import pytest
+import requests
+
+from adapters.cortex_xdr import backfill, run_once
+from checkpoint_store import CheckpointStore
+from dedup import DedupIndex
+from fake_cortex import FakeCortexServer
+from fake_logstash import FakeLogstashServer
+from generator import make_alerts, make_incidents
+
+def test_run_once_against_fake_cortex_and_logstash():
+    cortex = FakeCortexServer(make_alerts(250, start_ms=1000), make_incidents(30, start_ms=1000), page_limit=50)
+    with cortex, FakeLogstashServer() as logstash:
+        cfg = {"api_fqdn": "bench.local", "api_url": cortex.url, "api_key": "k", "api_key_id": 1,
+               "mode": "both", "since": "1970-01-01T00:00:00Z", "page_size": 50, "page_concurrency": 3,
+               "logstash": {"host": logstash.address[0], "port": logstash.address[1]}}
+        mapping = {"mappings": {"event.id": "alert_id", "@timestamp": "creation_time"}}
+
+        assert run_once(cfg, mapping) == 280
+        assert logstash.wait_for(280, timeout=10) == 280
+
+def test_backfill_ships_each_window_once_and_resumes(tmp_path):
+    # 200 alerts one minute apart: 3h20m of history split into 1h windows
+    cortex = FakeCortexServer(make_alerts(200, start_ms=0, step_ms=60_000), page_limit=50)
+    with cortex, FakeLogstashServer() as logstash:
+        cfg = {"api_fqdn": "bench.local", "api_url": cortex.url, "api_key": "k", "api_key_id": 1,
+               "mode": "alerts", "since": "1970-01-01T00:00:00Z", "page_size": 50,
+               "checkpoint_file": str(tmp_path / "checkpoints.json"),
+               "backfill": {"window_hours": 1, "workers": 3, "until": "1970-01-01T04:00:00Z",
+                            "state_file": str(tmp_path / "backfill.json")},
+               "logstash": {"host": logstash.address[0], "port": logstash.address[1]}}
+        mapping = {"mappings": {"event.id": "alert_id"}}
+
+        assert backfill(cfg, mapping) == 200
+        assert logstash.wait_for(200, timeout=10) == 200
+        assert backfill(cfg, mapping) == 0
+        assert CheckpointStore(tmp_path / "checkpoints.json").get("alerts", "bench.local") == 4 * 3600 * 1000 - 1
+
+def test_backfill_extends_the_tail_window_when_until_moves(tmp_path):
+    cortex = FakeCortexServer(make_alerts(200, start_ms=0, step_ms=60_000), page_limit=50)
+    with cortex, FakeLogstashServer() as logstash:
+        cfg = {"api_fqdn": "bench.local", "api_url": cortex.url, "api_key": "k", "api_key_id": 1,
+               "mode": "alerts", "since": "1970-01-01T00:00:00Z", "page_size": 50,
+               "backfill": {"window_hours": 1, "until": "1970-01-01T02:30:00Z",
+                            "state_file": str(tmp_path / "backfill.json")},
+               "logstash": {"host": logstash.address[0], "port": logstash.address[1]}}
+        mapping = {"mappings": {"event.id": "alert_id"}}
+
+        assert backfill(cfg, mapping) == 150
+        # The clamped 02:00-02:30 window only fetches what it had not covered
+        cfg["backfill"]["until"] = "1970-01-01T04:00:00Z"
+        assert backfill(cfg, mapping) == 50
+        assert backfill(cfg, mapping) == 0
+        assert logstash.wait_for(200, timeout=10) == 200
+
+def test_run_once_collects_several_tenants_with_separate_checkpoints(tmp_path):
+    acme = FakeCortexServer(make_alerts(120, start_ms=1000), page_limit=50)
+    globex = FakeCortexServer(make_alerts(70, start_ms=5000), page_limit=50)
+    with acme, globex, FakeLogstashServer() as logstash:
+        cfg = {"api_key": "k", "api_key_id": 1, "mode": "alerts", "since": "1970-01-01T00:00:00Z",
+               "page_size": 50, "checkpoint_file": str(tmp_path / "checkpoints.json"),
+               "tenants": [{"name": "acme", "api_fqdn": "acme.local", "api_url": acme.url},
+                           {"name": "globex", "api_fqdn": "globex.local", "api_url": globex.url}],
+               "logstash": {"host": logstash.address[0], "port": logstash.address[1]}}
+        mapping = {"mappings": {"event.id": "alert_id"}}
+
+        assert run_once(cfg, mapping) == 190
+        assert logstash.wait_for(190, timeout=10) == 190
+        store = CheckpointStore(tmp_path / "checkpoints.json")
+        assert store.get("alerts", "acme") == max(a["creation_time"] for a in acme.data["alerts"])
+        assert store.get("alerts", "globex") == max(a["creation_time"] for a in globex.data["alerts"])
+
+def test_run_once_saves_dedup_of_finished_tenants_when_one_fails(tmp_path):
+    acme = FakeCortexServer(make_alerts(60, start_ms=1000), page_limit=50)
+    with acme, FakeLogstashServer() as logstash:
+        cfg = {"api_key": "k", "api_key_id": 1, "mode": "alerts", "since": "1970-01-01T00:00:00Z",
+               "page_size": 50, "api": {"retries": 0},
+               "dedup": {"enabled": True, "file": str(tmp_path / "dedup.json")},
+               "tenants": [{"name": "acme", "api_fqdn": "acme.local", "api_url": acme.url},
+                           {"name": "down", "api_fqdn": "down.local", "api_url": "http://127.0.0.1:9"}],
+               "logstash": {"host": logstash.address[0], "port": logstash.address[1]}}
+        mapping = {"mappings": {"event.id": "alert_id"}}
+
+        with pytest.raises(requests.ConnectionError):
+            run_once(cfg, mapping)
+        assert logstash.wait_for(60, timeout=10) == 60
+        assert DedupIndex(path=tmp_path / "dedup.json").stats()["size"] == 60
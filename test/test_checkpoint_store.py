@@ -0,0 +1,29 @@
+# test/test_checkpoint_store.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from checkpoint_store import CheckpointStore
+
+def test_checkpoints_survive_reload(tmp_path):
+    path = tmp_path / "state" / "checkpoints.json"
+    store = CheckpointStore(path)
+    store.advance("alerts", 1000)
+    store.advance("incidents", 500, tenant="acme")
+
+    reloaded = CheckpointStore(path)
+    assert reloaded.get("alerts") == 1000
+    assert reloaded.get("incidents", tenant="acme") == 500
+    assert reloaded.get("incidents") is None
+    assert list(path.parent.iterdir()) == [path]
+
+def test_advance_never_moves_backwards():
+    store = CheckpointStore()
+    assert store.advance("alerts", 2000) is True
+    assert store.advance("alerts", 1000) is False
+    assert store.get("alerts") == 2000
+
+def test_corrupt_file_starts_empty(tmp_path):
+    path = tmp_path / "checkpoints.json"
+    path.write_text("{not json")
+    assert CheckpointStore(path).get("alerts", default=42) == 42
@@ -0,0 +1,36 @@
+# test/test_config_cache.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from config_cache import ConfigCache
+
+def test_unchanged_files_are_not_parsed_again(tmp_path):
+    source = tmp_path / "cfg.yaml"
+    source.write_text("mode: incidents\npage_size: 200\n")
+    cache_path = tmp_path / "cache.marshal"
+    assert ConfigCache(cache_path).load(source) == {"mode": "incidents", "page_size": 200}
+
+    # A new process (new instance) is served from the cache file
+    cache = ConfigCache(cache_path)
+    assert cache.load(source)["page_size"] == 200
+    assert (cache.hits, cache.misses) == (1, 0)
+
+    # Touched but identical: the hash matches, still no parse
+    st = os.stat(source)
+    os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert cache.load(source)["mode"] == "incidents"
+    assert (cache.hits, cache.misses) == (2, 0)
+
+    source.write_text("mode: alerts\npage_size: 200\n")
+    assert ConfigCache(cache_path).load(source)["mode"] == "alerts"
+
+def test_corrupt_cache_and_unmarshallable_values_fall_back_to_parsing(tmp_path):
+    source = tmp_path / "cfg.yaml"
+    source.write_text("since: 2025-08-01\n")
+    cache_path = tmp_path / "cache.marshal"
+    cache_path.write_bytes(b"not marshal")
+    cache = ConfigCache(cache_path)
+    assert str(cache.load(source)["since"]) == "2025-08-01"
+    assert str(cache.load(source)["since"]) == "2025-08-01"
+    assert cache.misses == 2
@@ -6,7 +6,7 @@ from unittest.mock import MagicMock
 from datetime import datetime
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 
-from cortex_client import CortexXDR 
+from cortex_client import CortexXDR, MockCortexClient
 
 @pytest.fixture
 def fake_config():
@@ -44,3 +44,156 @@ def test_get_alerts(monkeypatch, fake_config):
     alerts = client.get_alerts()
     assert len(alerts) == 1
     assert alerts[0]["alert_id"] == "A1"
+
+def test_streams_have_separate_checkpoints(monkeypatch, fake_config, tmp_path):
+    fake_config['settings']['checkpoint_file'] = str(tmp_path / "checkpoints.json")
+
+    class FakeResponse:
+        def __init__(self, key, ts):
+            self.key, self.ts = key, ts
+        def raise_for_status(self):
+            pass
+        def json(self):
+            return {"reply": {self.key: [{"creation_time": self.ts}]}}
+
+    def fake_post(url, json, **kwargs):
+        if url.endswith("get_alerts"):
+            return FakeResponse("alerts", 2000)
+        return FakeResponse("incidents", 1000)
+
+    client = CortexXDR(fake_config)
+    monkeypatch.setattr(client.session, "post", fake_post)
+    alerts = client.get_alerts()
+    incidents = client.get_incidents()
+    assert client.since_ms("alerts") == 2000
+    # Nothing is stored before the batches are shipped
+    assert client.checkpoints.get("alerts") is None
+
+    client.acknowledge(alerts)
+    client.acknowledge(incidents)
+
+    # A restarted client resumes each stream from its own watermark
+    restarted = CortexXDR(fake_config)
+    assert restarted.since_ms("alerts") == 2000
+    assert restarted.since_ms("incidents") == 1000
+
+def test_unshipped_batch_is_fetched_again(monkeypatch, fake_config):
+    rows = [{"alert_id": "A", "creation_time": 1000}, {"alert_id": "B", "creation_time": 2000}]
+
+    class FakeResponse:
+        def __init__(self, items):
+            self.items = items
+        def raise_for_status(self):
+            pass
+        def json(self):
+            return {"reply": {"alerts": self.items}}
+
+    def fake_post(url, json, **kwargs):
+        rd = json["request_data"]
+        since = rd["filters"][0]["value"]
+        return FakeResponse([r for r in rows if r["creation_time"] >= since][rd["search_from"]:rd["search_to"]])
+
+    client = CortexXDR(fake_config)
+    client.checkpoints.advance("alerts", 0)
+    monkeypatch.setattr(client.session, "post", fake_post)
+    first = client.get_alerts(max_results=1)
+    second = client.get_alerts(max_results=1)
+    assert client.since_ms("alerts") == 2000
+
+    client.acknowledge(first, shipped=False)
+    # Fetched after the failed batch: ignored, and fetched again
+    client.acknowledge(second)
+    assert client.checkpoints.get("alerts") == 0
+    assert client.pending == {}
+
+    retried = client.get_alerts(max_results=1)
+    assert retried == [rows[0]]
+    client.acknowledge(retried)
+    assert client.checkpoints.get("alerts") == 1000
+    again = client.get_alerts(max_results=1)
+    assert again == [rows[1]]
+    client.acknowledge(again)
+    assert client.checkpoints.get("alerts") == 2000
+
+def test_pages_up_to_budget_and_skips_boundary_repeats(monkeypatch, fake_config):
+    fake_config['settings']['page_size'] = 2
+    rows = [{"alert_id": f"A{i}", "creation_time": 1000 + i // 2} for i in range(5)]
+
+    class FakeResponse:
+        def __init__(self, items):
+            self.items = items
+        def raise_for_status(self):
+            pass
+        def json(self):
+            return {"reply": {"alerts": self.items}}
+
+    def fake_post(url, json, **kwargs):
+        rd = json["request_data"]
+        since = rd["filters"][0]["value"]
+        matching = [r for r in rows if r["creation_time"] >= since]
+        return FakeResponse(matching[rd["search_from"]:rd["search_to"]])
+
+    client = CortexXDR(fake_config)
+    client.checkpoints.advance("alerts", 0)
+    monkeypatch.setattr(client.session, "post", fake_post)
+
+    first = client.get_alerts(max_results=4)
+    assert [a["alert_id"] for a in first] == ["A0", "A1", "A2", "A3"]
+    assert client.has_more["alerts"] is True
+
+    # A2/A3 share the watermark timestamp and must not be returned again
+    second = client.get_alerts(max_results=4)
+    assert [a["alert_id"] for a in second] == ["A4"]
+    assert client.has_more["alerts"] is False
+    assert client.get_alerts(max_results=4) == []
+
+def test_pages_past_a_watermark_shared_by_a_full_budget(monkeypatch, fake_config):
+    fake_config['settings']['page_size'] = 3
+    rows = [{"alert_id": f"A{i}", "creation_time": 1000} for i in range(5)]
+    rows.append({"alert_id": "B", "creation_time": 2000})
+
+    class FakeResponse:
+        def __init__(self, items):
+            self.items = items
+        def raise_for_status(self):
+            pass
+        def json(self):
+            return {"reply": {"alerts": self.items}}
+
+    def fake_post(url, json, **kwargs):
+        rd = json["request_data"]
+        since = rd["filters"][0]["value"]
+        matching = [r for r in rows if r["creation_time"] >= since]
+        return FakeResponse(matching[rd["search_from"]:rd["search_to"]])
+
+    client = CortexXDR(fake_config)
+    client.checkpoints.advance("alerts", 0)
+    monkeypatch.setattr(client.session, "post", fake_post)
+
+    assert [a["alert_id"] for a in client.get_alerts(max_results=3)] == ["A0", "A1", "A2"]
+    assert [a["alert_id"] for a in client.get_alerts(max_results=3)] == ["A3", "A4", "B"]
+    assert client.since_ms("alerts") == 2000
+    assert client.get_alerts(max_results=3) == []
+    assert client.has_more["alerts"] is False
+
+def test_mock_client_reads_only_requested_records(fake_config):
+    client = MockCortexClient(fake_config)
+    assert [a["alert_id"] for a in client.get_alerts(max_results=2)] == ["12345", "12346"]
+    assert len(client.get_incidents()) == 5
+
+def test_capture_records_fetched_replies(monkeypatch, fake_config, tmp_path):
+    from capture import CaptureReader
+    fake_config['settings']['capture'] = {'enabled': True, 'dir': str(tmp_path)}
+    rows = [{"alert_id": f"A{i}", "creation_time": 1000 + i} for i in range(3)]
+
+    class FakeResponse:
+        def raise_for_status(self):
+            pass
+        def json(self):
+            return {"reply": {"alerts": rows}}
+
+    client = CortexXDR(fake_config)
+    monkeypatch.setattr(client.session, "post", lambda url, json, **kwargs: FakeResponse())
+    assert client.get_alerts(max_results=10) == rows
+    client.capture.close()
+    assert [batch for _, batch in CaptureReader(tmp_path / "default").batches("alerts")] == [rows]
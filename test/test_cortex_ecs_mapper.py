@@ -7,7 +7,7 @@ from datetime import datetime, timezone
 # Ensure src/ is in sys.path so cortex_ecs_mapper can be imported
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 
-from cortex_ecs_mapper import CortexECSMapper, ms_to_iso
+from cortex_ecs_mapper import CortexECSMapper, compile_mappings, ms_to_iso
 
 @pytest.fixture
 def sample_cortex_alert():
@@ -63,4 +63,30 @@ def test_missing_fields(cortex_mapper):
     assert ecs_event["event"]["id"] == "10002"
     assert ecs_event["event"]["action"] == "No source IP alert"
     assert "source" not in ecs_event
-    assert "user" not in ecs_event
\ No newline at end of file
+    assert "user" not in ecs_event
+
+def test_map_many_matches_map_to_ecs(sample_cortex_alert, cortex_mapper):
+    alerts = [sample_cortex_alert, {"alert_id": "10003", "category": "Network", "creation_time": 1696000000000}]
+    mapped = cortex_mapper.map_many(alerts)
+
+    assert mapped == [cortex_mapper.map_to_ecs(a) for a in alerts]
+    assert mapped[1]["observer"]["type"] == "Network"
+
+
+def test_determine_category(cortex_mapper):
+    assert cortex_mapper._determine_category({"category": "Script"}) == ["intrusion_detection"]
+    assert cortex_mapper._determine_category({"category": "connection"}) == ["network_traffic"]
+    assert cortex_mapper._determine_category({"category": "Malware"}) == ["malware"]
+    assert cortex_mapper._determine_category({}) == ["unknown"]
+
+
+def test_nested_cortex_field():
+    mapper = CortexECSMapper()
+    mapper.plan = compile_mappings([{"cortex_field": "a.b", "ecs_field": "x.y.z"}])
+
+    assert mapper.map_to_ecs({"a": {"b": 1}})["x"]["y"]["z"] == 1
+    assert "x" not in mapper.map_to_ecs({"a": "flat"})
+
+def test_tenant_field(cortex_mapper):
+    assert cortex_mapper.map_to_ecs({"alert_id": "1", "_tenant": "acme"})["tenant"] == "acme"
+    assert "tenant" not in cortex_mapper.map_to_ecs({"alert_id": "1"})
@@ -0,0 +1,97 @@
+# test/test_cortex_xdr_adapter.py
+import os
+import socket
+import sys
+import threading
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from adapters.cortex_xdr import CortexXDR, LogstashSender
+from spool import Spool
+
+@pytest.fixture
+def adapter_config():
+    return {
+        "api_fqdn": "api-fake.xdr.local",
+        "api_key_id": "1",
+        "api_key": "FAKE_KEY",
+        "page_size": 10,
+        "page_concurrency": 4,
+    }
+
+def fake_api(total):
+    """Return a _post stand-in serving `total` incidents plus the windows requested."""
+    rows = [{"incident_id": str(i), "creation_time": 1_000 + i} for i in range(total)]
+    seen = []
+    lock = threading.Lock()
+    def post(path, body):
+        rd = body["request_data"]
+        with lock:
+            seen.append(rd["search_from"])
+        return {"reply": {"total_count": total,
+                          "incidents": rows[rd["search_from"]:rd["search_to"]]}}
+    return post, seen
+
+def test_paged_parallel_fetches_all_windows_in_order(adapter_config):
+    xdr = CortexXDR(adapter_config)
+    xdr._post, seen = fake_api(95)
+
+    incidents = xdr.get_incidents_since(0)
+
+    assert [i["incident_id"] for i in incidents] == [str(i) for i in range(95)]
+    assert sorted(seen) == list(range(0, 100, 10))
+
+def test_paged_sequential_when_concurrency_is_one(adapter_config):
+    adapter_config["page_concurrency"] = 1
+    xdr = CortexXDR(adapter_config)
+    xdr._post, seen = fake_api(25)
+
+    assert len(xdr.get_incidents_since(0)) == 25
+    assert seen == [0, 10, 20]
+
+def test_parallel_pages_are_streamed_in_order(adapter_config):
+    xdr = CortexXDR(adapter_config)
+    xdr._post, _ = fake_api(45)
+
+    pages = xdr.iter_incidents_since(0)
+    assert [i["incident_id"] for i in next(pages)] == [str(i) for i in range(10)]
+    assert [len(p) for p in pages] == [10, 10, 10, 5]
+
+def test_send_batch_spools_stream_when_logstash_down(tmp_path):
+    srv = socket.socket()
+    srv.bind(("127.0.0.1", 0))
+    port = srv.getsockname()[1]
+    srv.close()
+
+    sender = LogstashSender("127.0.0.1", port, spool=Spool(tmp_path), chunk_docs=2)
+    assert sender.send_batch({"n": i} for i in range(5)) == 5
+    out = []
+    sender.spool.drain(out.append)
+    assert b"".join(out).count(b"\n") == 5
+
+def test_raw_policies_shrink_the_embedded_document():
+    from adapters.cortex_xdr import RawPolicy, apply_mapping
+    from json_codec import get_codec
+    doc = {"incident_id": "7", "status": "new", "hosts": [{"host_id": str(i), "name": "x" * 40} for i in range(50)]}
+    mapping = {"mappings": {"event.id": "incident_id"}}
+    size = len(get_codec("json").dumps(doc))
+
+    allow = RawPolicy("allow", keys=["incident_id", "status"], codec=get_codec("json"))
+    assert apply_mapping(doc, mapping, allow)["panw.cortex_xdr.raw"] == {"incident_id": "7", "status": "new"}
+    truncate = RawPolicy("truncate", max_bytes=100, codec=get_codec("json"))
+    truncated = apply_mapping(doc, mapping, truncate)["panw.cortex_xdr.raw"]
+    assert len(truncated["truncated"]) == 100 and truncated["size"] == size
+    hashed = RawPolicy("hash", codec=get_codec("json"))
+    assert apply_mapping(doc, mapping, hashed)["panw.cortex_xdr.raw"]["size"] == size
+    assert apply_mapping(doc, mapping)["panw.cortex_xdr.raw"] is doc
+    assert truncate.before == size and truncate.after == len(get_codec("json").dumps(truncated))
+
+def test_incident_details_are_not_repeated_in_raw():
+    from adapters.cortex_xdr import apply_mapping, apply_mapping_many
+    doc = {"incident_id": "7", "_tenant": "acme", "alerts": [{"alert_id": "A1"}], "file_artifacts": []}
+    mapping = {"mappings": {"event.id": "incident_id", "panw.cortex_xdr.alerts": "alerts"}}
+
+    for out in (apply_mapping(doc, mapping), apply_mapping_many([doc], mapping)[0]):
+        assert out["panw.cortex_xdr.alerts"] == [{"alert_id": "A1"}]
+        assert out["panw.cortex_xdr.raw"] == {"incident_id": "7"}
+        assert out["tenant"] == "acme"
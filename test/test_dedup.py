@@ -0,0 +1,47 @@
+# test/test_dedup.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from dedup import DedupIndex, event_key
+
+def test_filter_drops_seen_versions():
+    index = DedupIndex()
+    first = [{"alert_id": "A1", "creation_time": 1}, {"incident_id": "I1", "modification_time": 5}]
+    assert index.filter(first) == first
+
+    again = [{"alert_id": "A1", "creation_time": 1},
+             {"incident_id": "I1", "modification_time": 6},
+             {"name": "no id"}]
+    assert index.filter(again) == again[1:]
+    assert index.stats() == {"size": 3, "hits": 1, "misses": 3}
+
+def test_size_and_ttl_bounds(monkeypatch):
+    index = DedupIndex(max_size=2, ttl=10)
+    index.filter([{"alert_id": str(i)} for i in range(3)])
+    assert list(index.entries) == [event_key({"alert_id": "1"}), event_key({"alert_id": "2"})]
+
+    monkeypatch.setattr("dedup.time.time", lambda: 1e12)
+    index.filter([])
+    assert index.stats()["size"] == 0
+
+def test_index_persists(tmp_path):
+    path = tmp_path / "dedup.json"
+    index = DedupIndex(path=path)
+    index.filter([{"alert_id": "A1"}])
+    index.save()
+
+    assert DedupIndex(path=path).filter([{"alert_id": "A1"}]) == []
+
+def test_checked_events_are_recorded_or_released():
+    index = DedupIndex()
+    a, b = {"alert_id": "A"}, {"alert_id": "B"}
+    assert index.check([a, b, a]) == [a, b]
+    # In flight: not shipped twice, but not part of the index yet
+    assert index.check([a]) == []
+    assert index.stats()["size"] == 0
+
+    index.record([a])
+    index.release([b])
+    assert index.check([a, b]) == [b]
+    assert index.stats()["size"] == 1
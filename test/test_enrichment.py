@@ -0,0 +1,87 @@
+# test/test_enrichment.py
+import os
+import sys
+import threading
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from cortex_client import CortexXDR
+from enrichment import IncidentEnricher, TTLCache
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+def test_ttl_cache_expires_and_evicts_least_recent():
+    clock = Clock()
+    cache = TTLCache(max_size=2, ttl=10, clock=clock)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None and len(cache) == 2
+    clock.now = 11
+    assert cache.get("a") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def test_only_new_incident_versions_are_fetched():
+    calls = []
+    lock = threading.Lock()
+    def fetch(incident_id):
+        with lock:
+            calls.append(incident_id)
+        return {"alerts": [{"alert_id": f"{incident_id}-1"}]}
+
+    enricher = IncidentEnricher(fetch, workers=2)
+    first = [{"incident_id": str(i), "modification_time": 1} for i in range(3)]
+    enricher.enrich(first)
+    assert sorted(calls) == ["0", "1", "2"]
+    assert first[0]["alerts"] == [{"alert_id": "0-1"}]
+
+    # Same versions come from the cache; a modified incident is fetched again
+    again = [{"incident_id": "0", "modification_time": 1}, {"incident_id": "1", "modification_time": 2}]
+    enricher.enrich(again)
+    assert sorted(calls) == ["0", "1", "1", "2"]
+    assert all("alerts" in i for i in again)
+
+def test_failed_fetch_leaves_incident_unchanged():
+    def fetch(incident_id):
+        if incident_id == "bad":
+            raise RuntimeError("boom")
+        return {"file_artifacts": []}
+
+    enricher = IncidentEnricher(fetch)
+    incidents = enricher.enrich([{"incident_id": "bad"}, {"incident_id": "ok"}])
+    assert incidents == [{"incident_id": "bad"}, {"incident_id": "ok", "file_artifacts": []}]
+    # Failures are not cached
+    assert enricher.cache.get(("bad", None)) is None
+
+def test_client_enriches_incidents_from_details_endpoint(monkeypatch):
+    config = {
+        'cortex': {'url': 'https://fake.cortex', 'api_key': 'K', 'api_key_id': 1},
+        'settings': {'enrichment': {'enabled': True, 'alerts_limit': 5}},
+    }
+
+    class FakeResponse:
+        def __init__(self, body):
+            self.body = body
+        def raise_for_status(self):
+            pass
+        def json(self):
+            return self.body
+
+    requests = []
+    def fake_post(url, json, **kwargs):
+        requests.append((url, json))
+        if url.endswith("get_incident_extra_data/"):
+            return FakeResponse({"reply": {"incident": {}, "alerts": {"total_count": 1, "data": [{"alert_id": "A1"}]},
+                                           "network_artifacts": {"total_count": 0, "data": []}}})
+        return FakeResponse({"reply": {"incidents": [{"incident_id": "7", "creation_time": 1000}]}})
+
+    client = CortexXDR(config)
+    monkeypatch.setattr(client.session, "post", fake_post)
+    incidents = client.get_incidents()
+    assert incidents[0]["alerts"] == [{"alert_id": "A1"}]
+    assert incidents[0]["network_artifacts"] == []
+    assert requests[-1][1] == {"request_data": {"incident_id": "7", "alerts_limit": 5}}
@@ -0,0 +1,55 @@
+# test/test_http_sender.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'bench')))
+
+from fake_bulk import FakeBulkServer
+from http_sender import HttpBulkSender
+
+def make_sender(url, **overrides):
+    cfg = {"url": url, "index": "logs-test", "backoff": 0, "codec": "json"}
+    cfg.update(overrides)
+    sender = HttpBulkSender({"http_output": cfg})
+    sender.sleep = lambda s: None
+    return sender
+
+def events(n):
+    return [{"event": {"id": str(i)}, "message": "x" * 50} for i in range(n)]
+
+def test_bulk_retries_only_failed_items_and_drops_rejected():
+    with FakeBulkServer(reject={"2": 429, "3": 400}) as server:
+        sender = make_sender(f"{server.url}/_bulk")
+        assert sender.send_many(events(5)) == 4
+        assert sorted(d["event"]["id"] for d in server.docs) == ["0", "1", "2", "4"]
+        # Second request carried only the throttled document
+        assert server.requests == 2
+        assert server.compressed_bytes < server.raw_bytes
+        sender.close()
+
+def test_batches_are_cut_by_size():
+    with FakeBulkServer() as server:
+        sender = make_sender(f"{server.url}/_bulk", batch_bytes=300, gzip=False)
+        assert sender.send_batch(events(10)) == 10
+        assert server.requests == 4
+        assert len(server.docs) == 10
+
+def test_send_many_counts_only_delivered_events():
+    with FakeBulkServer() as server:
+        server.status_script.extend([503] * 2)
+        sender = make_sender(server.url, format="ndjson", max_retries=1)
+        assert sender.send_many(events(3)) == 0
+        assert sender.lost == 3
+        assert sender.send_ndjson(b'{"n":1}\n{"n":2}\n', 2) == 2
+        assert len(server.docs) == 2
+
+def test_undelivered_batches_are_spooled_and_replayed(tmp_path):
+    with FakeBulkServer() as server:
+        server.status_script.extend([503] * 3)
+        sender = make_sender(server.url, format="ndjson", max_retries=2, spool={"dir": str(tmp_path)})
+        assert sender.send_many(events(3)) == 3
+        assert server.docs == [] and not sender.spool.empty()
+
+        assert sender.send_many(events(1)) == 1
+        assert [d["event"]["id"] for d in server.docs] == ["0", "1", "2", "0"]
+        assert sender.spool.empty()
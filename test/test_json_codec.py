@@ -0,0 +1,36 @@
+# test/test_json_codec.py
+import io
+import json
+import os
+import sys
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import json_codec
+from json_codec import get_codec, iter_json_array
+
+def test_codecs_produce_identical_bytes():
+    event = {"event": {"id": "E1", "severity": 80}, "message": "naïve ✓", "tags": ["a"]}
+    stdlib = get_codec("json")
+    assert stdlib.dumps(event) == '{"event":{"id":"E1","severity":80},"message":"naïve ✓","tags":["a"]}'.encode("utf-8")
+    if json_codec.orjson is not None:
+        assert get_codec("orjson").dumps(event) == stdlib.dumps(event)
+    assert stdlib.loads(stdlib.dumps(event)) == event
+
+def test_auto_falls_back_to_stdlib(monkeypatch):
+    monkeypatch.setattr(json_codec, "orjson", None)
+    assert get_codec().name == "json"
+    with pytest.raises(ImportError):
+        get_codec("orjson")
+    with pytest.raises(ValueError):
+        get_codec("msgpack")
+
+def test_iter_json_array_decodes_incrementally():
+    items = [{"alert_id": str(i), "description": "x" * 50, "score": i * 1.5} for i in range(40)]
+    text = json.dumps(items, indent=2)
+
+    assert list(iter_json_array(io.StringIO(text), chunk_size=7)) == items
+    assert list(iter_json_array(io.StringIO(" [ ] "))) == []
+    assert list(iter_json_array(io.StringIO("[1, 22, 333]"), chunk_size=2)) == [1, 22, 333]
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO('[{"a": 1}'), chunk_size=4))
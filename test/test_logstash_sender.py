@@ -1,9 +1,15 @@
 # test/test_logstash_sender.py
 import os
+import socket
 import sys
+import threading
+import time
 import pytest
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'bench')))
+
+from fake_logstash import FakeLogstashServer
 from logstash_sender import LogstashSender
 
 class FakeSender:
@@ -22,3 +28,142 @@ def test_logstash_send():
 
     assert result is True
     assert sender.sent[0]["event"]["id"] == "E1"
+
+
+def _listen():
+    srv = socket.socket()
+    srv.bind(("127.0.0.1", 0))
+    srv.listen()
+    return srv
+
+def _accept_lines(srv, conns, lines, n):
+    # Accept connections and collect newline-delimited payloads until n lines arrived
+    while len(lines) < n:
+        conn, _ = srv.accept()
+        conns.append(conn)
+        data = b""
+        while len(lines) < n:
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+            *complete, data = data.split(b"\n")
+            lines.extend(complete)
+
+def test_send_many_reuses_connection(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    srv = _listen()
+    conns, lines = [], []
+    t = threading.Thread(target=_accept_lines, args=(srv, conns, lines, 5))
+    t.start()
+
+    config = {"logstash": {"host": "127.0.0.1", "port": srv.getsockname()[1],
+                           "use_ssl": False, "ssl_verify": False, "buffer_size": 64}}
+    with LogstashSender(config) as sender:
+        assert sender.send({"event": {"id": "E0"}}) is True
+        assert sender.send_many([{"event": {"id": f"E{i}"}} for i in range(1, 5)]) == 4
+    t.join(timeout=5)
+    srv.close()
+
+    assert len(conns) == 1
+    assert [l.decode() for l in lines][0] == '{"event":{"id":"E0"}}'
+    assert len(lines) == 5
+
+def test_send_reconnects_after_drop(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    srv = _listen()
+    config = {"logstash": {"host": "127.0.0.1", "port": srv.getsockname()[1],
+                           "use_ssl": False, "ssl_verify": False}}
+    sender = LogstashSender(config)
+    sender._connect()
+    # Simulate a dead connection: the next write must reconnect transparently
+    sender.sock.close()
+    conns, lines = [], []
+    t = threading.Thread(target=_accept_lines, args=(srv, conns, lines, 1))
+    t.start()
+    assert sender.send({"event": {"id": "E1"}}) is True
+    t.join(timeout=5)
+    sender.close()
+    srv.close()
+    assert lines == [b'{"event":{"id":"E1"}}']
+
+def test_spools_while_down_and_replays_first(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    srv = _listen()
+    port = srv.getsockname()[1]
+    srv.close()
+
+    config = {"logstash": {"host": "127.0.0.1", "port": port, "use_ssl": False,
+                           "ssl_verify": False, "spool": {"dir": str(tmp_path / "spool")}}}
+    sender = LogstashSender(config)
+    assert sender.send_many([{"n": 1}, {"n": 2}]) == 2
+    assert not sender.spool.empty()
+
+    srv = socket.socket()
+    srv.bind(("127.0.0.1", port))
+    srv.listen()
+    conns, lines = [], []
+    t = threading.Thread(target=_accept_lines, args=(srv, conns, lines, 3))
+    t.start()
+    assert sender.send({"n": 3}) is True
+    t.join(timeout=5)
+    sender.close()
+    srv.close()
+    assert lines == [b'{"n":1}', b'{"n":2}', b'{"n":3}']
+    assert sender.spool.empty()
+
+def test_debug_sinks_reuse_sent_bytes(tmp_path, capsys):
+    srv = _listen()
+    debug_file = tmp_path / "elk_output.json"
+    config = {"logstash": {"host": "127.0.0.1", "port": srv.getsockname()[1], "ssl_verify": False,
+                           "codec": "json", "debug_stdout": True, "debug_file": str(debug_file)}}
+    conns, lines = [], []
+    t = threading.Thread(target=_accept_lines, args=(srv, conns, lines, 1))
+    t.start()
+    with LogstashSender(config) as sender:
+        assert sender.send({"msg": "café"}) is True
+    t.join(timeout=5)
+    srv.close()
+
+    expected = '{"msg":"café"}\n'
+    assert lines == [expected.rstrip("\n").encode("utf-8")]
+    assert capsys.readouterr().out == expected
+    assert debug_file.read_text(encoding="utf-8") == expected
+
+def _closed_port():
+    srv = _listen()
+    port = srv.getsockname()[1]
+    srv.close()
+    return port
+
+def test_round_robin_across_endpoints(tmp_path):
+    with FakeLogstashServer() as a, FakeLogstashServer() as b:
+        config = {"logstash": {"hosts": [f"127.0.0.1:{a.address[1]}", {"host": "127.0.0.1", "port": b.address[1]}],
+                               "buffer_size": 1}}
+        with LogstashSender(config) as sender:
+            assert sender.send_many([{"n": i} for i in range(6)]) == 6
+            stats = sender.stats()
+        assert a.wait_for(3, timeout=5) == 3 and b.wait_for(3, timeout=5) == 3
+        assert [s["sent_events"] for s in stats] == [3, 3]
+
+def test_dead_endpoint_is_ejected_then_probed_back(tmp_path):
+    port = _closed_port()
+    with FakeLogstashServer() as live:
+        config = {"logstash": {"hosts": [f"127.0.0.1:{port}", f"127.0.0.1:{live.address[1]}"],
+                               "balance": "least_bytes", "eject_after": 2, "probe_interval": 0.05,
+                               "buffer_size": 1}}
+        sender = LogstashSender(config)
+        assert sender.send_many([{"n": i} for i in range(4)]) == 4
+        assert live.wait_for(4, timeout=5) == 4
+        dead = sender.endpoints[0]
+        assert not dead.healthy
+
+        srv = socket.socket()
+        srv.bind(("127.0.0.1", port))
+        srv.listen()
+        deadline = time.time() + 5
+        while not dead.healthy and time.time() < deadline:
+            time.sleep(0.02)
+        assert dead.healthy
+        sender.close()
+        srv.close()
@@ -0,0 +1,80 @@
+# test/test_metrics.py
+import os
+import sys
+import urllib.request
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from cortex_ecs_mapper import CortexECSMapper
+from metrics import NULL_METRICS, Metrics, MetricsServer, instrument
+
+class FakeCortex:
+    def get_alerts(self, max_results=100):
+        return [{"alert_id": "A1"}, {"alert_id": "A2"}]
+    def get_incidents(self, max_results=100):
+        return []
+
+def test_render_prometheus_text():
+    metrics = Metrics(buckets=(0.1, 1.0))
+    metrics.inc("logstash_reconnects_total")
+    metrics.inc("cortex_fetched_events_total", 5, endpoint="alerts")
+    metrics.set("cortex_checkpoint_lag_seconds", 12.5, stream="alerts")
+    metrics.observe("logstash_send_seconds", 0.5)
+
+    text = metrics.render()
+    assert "# TYPE logstash_reconnects_total counter\nlogstash_reconnects_total 1\n" in text
+    assert 'cortex_fetched_events_total{endpoint="alerts"} 5' in text
+    assert 'cortex_checkpoint_lag_seconds{stream="alerts"} 12.5' in text
+    assert 'logstash_send_seconds_bucket{le="0.1"} 0' in text
+    assert 'logstash_send_seconds_bucket{le="1.0"} 1' in text
+    assert 'logstash_send_seconds_bucket{le="+Inf"} 1' in text
+    assert "logstash_send_seconds_count 1" in text
+
+def test_instrument_wraps_components():
+    metrics = Metrics()
+    cortex, mapper = FakeCortex(), CortexECSMapper()
+    instrument(metrics, cortex=cortex, mapper=mapper)
+
+    mapper.map_many(cortex.get_alerts())
+    text = metrics.render()
+    assert 'cortex_fetched_events_total{endpoint="alerts"} 2' in text
+    assert 'cortex_fetch_seconds_count{endpoint="alerts"} 1' in text
+    assert "ecs_map_event_seconds_count 2" in text
+    assert "ecs_map_batch_seconds_count 1" in text
+
+def test_instrument_times_encoded_sends_and_chunks():
+    from parallel_encoder import ParallelEncoder
+    class Sender:
+        def send_many(self, events):
+            return len(events)
+        def send_ndjson(self, data, count):
+            return count
+        send = send_many
+    metrics = Metrics()
+    sender = Sender()
+    encoder = ParallelEncoder(dict, codec="json", workers=1, chunk_docs=2)
+    instrument(metrics, sender=sender, encoder=encoder)
+
+    with encoder:
+        for future in encoder.submit([{"n": i} for i in range(3)]):
+            count, data = future.result()
+            sender.send_ndjson(data, count)
+    text = metrics.render()
+    assert "ecs_encode_chunk_seconds_count 2" in text
+    assert 'logstash_send_seconds_count{call="send_ndjson"} 2' in text
+
+def test_disabled_metrics_leave_components_untouched():
+    cortex = FakeCortex()
+    original = cortex.get_alerts
+    instrument(NULL_METRICS, cortex=cortex)
+    assert cortex.get_alerts == original
+
+def test_metrics_endpoint():
+    metrics = Metrics()
+    metrics.inc("logstash_failed_events_total", 3)
+    server = MetricsServer(metrics, port=0).start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as resp:
+            body = resp.read().decode()
+    finally:
+        server.stop()
+    assert "logstash_failed_events_total 3" in body
@@ -0,0 +1,35 @@
+# test/test_normalize.py
+import os
+import random
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from adapters.cortex_xdr import SEV_MAP, apply_mapping, apply_mapping_many, ms_to_iso, sev_num
+from cortex_ecs_mapper import CATEGORY_TABLE
+from normalize import BatchNormalizer
+
+def test_timestamps_match_datetime_isoformat():
+    rng = random.Random(7)
+    values = [rng.randrange(-10**12, 4 * 10**12) for _ in range(2000)]
+    values += [0, 999, 1000, -1, 1735689599999, 1735689600000, 1.5e12, 1234.5]
+    normalizer = BatchNormalizer(max_entries=100)
+    assert normalizer.timestamps(values + [None]) == [ms_to_iso(v) for v in values] + [None]
+    assert len(normalizer.minutes) <= 100
+
+def test_severities_match_sev_num():
+    values = ["High", "LOW", "critical", "bogus", 3, 2.7, "med", "High", True]
+    normalizer = BatchNormalizer(SEV_MAP, 60)
+    assert normalizer.severities(values + [None]) == [sev_num(v) for v in values] + [None]
+    assert normalizer.severity(["unhashable"]) == 60
+
+def test_categories_use_first_matching_entry():
+    normalizer = BatchNormalizer(category_table=CATEGORY_TABLE)
+    assert normalizer.categories(["Process", "NETWORK", "malware", "", "other"]) == [
+        "intrusion_detection", "network_traffic", "malware", "unknown", "unknown"]
+
+def test_apply_mapping_many_matches_apply_mapping():
+    mapping = {"mappings": {"@timestamp": "creation_time", "event.severity": "severity",
+                            "event.id": "alert_id", "host.ip[]": "host_ip"}}
+    docs = [{"alert_id": str(i), "creation_time": 1735689600000 + i * 370, "severity": ["low", "high", None][i % 3],
+             "host_ip": "10.0.0.1" if i % 2 else None, "_tenant": "acme"} for i in range(50)]
+    assert apply_mapping_many(docs, mapping) == [apply_mapping(d, mapping) for d in docs]
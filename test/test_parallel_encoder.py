@@ -0,0 +1,47 @@
+# test/test_parallel_encoder.py
+import os
+import sys
+from functools import partial
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from adapters.cortex_xdr import apply_mapping
+from cortex_ecs_mapper import CortexECSMapper
+from json_codec import get_codec
+from parallel_encoder import ParallelEncoder
+from pipeline import Pipeline
+
+MAPPING = {"mappings": {"event.id": "incident_id", "@timestamp": "creation_time"}}
+MAPPING_FILE = os.path.join(os.path.dirname(__file__), '..', 'config', 'cortex_ecs_mapping.yaml')
+
+def pages(n, size):
+    return [[{"incident_id": f"{p}-{i}", "creation_time": 1700000000000 + i, "name": "é"}
+             for i in range(size)] for p in range(n)]
+
+def test_chunks_match_in_process_output_and_order():
+    dumps = get_codec("json").dumps
+    raw = pages(6, 7)
+    expected = b"".join(dumps(apply_mapping(d, MAPPING)) + b"\n" for page in raw for d in page)
+    with ParallelEncoder(partial(apply_mapping, mapping=MAPPING), codec="json", workers=2, chunk_docs=3) as encoder:
+        chunks = list(encoder.encode(iter(raw), lookahead=2))
+    assert [count for count, _ in chunks] == [3, 3, 1] * 6
+    assert b"".join(data for _, data in chunks) == expected
+
+def test_from_config_is_disabled_by_default():
+    assert ParallelEncoder.from_config(None, {}) is None
+
+class NDJSONSender:
+    def __init__(self):
+        self.data = b""
+    def send_ndjson(self, data, count):
+        self.data += data
+        return count
+
+def test_pipeline_sends_encoded_chunks_in_order():
+    mapper = CortexECSMapper(MAPPING_FILE)
+    sender = NDJSONSender()
+    raw = [[{"alert_id": f"{b}-{i}", "creation_time": 1700000000000} for i in range(5)] for b in range(4)]
+    with ParallelEncoder(CortexECSMapper(MAPPING_FILE).map_to_ecs, codec="json", workers=2, chunk_docs=2) as encoder:
+        pipeline = Pipeline(mapper, sender, queue_size=2, encoder=encoder)
+        assert pipeline.run(iter(raw)) == 20
+    dumps = get_codec("json").dumps
+    assert sender.data == b"".join(dumps(mapper.map_to_ecs(e)) + b"\n" for batch in raw for e in batch)
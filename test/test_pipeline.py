@@ -0,0 +1,108 @@
+# test/test_pipeline.py
+import os
+import sys
+import threading
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from dedup import DedupIndex
+from pipeline import Pipeline
+
+class FakeMapper:
+    def map_many(self, events):
+        return [{"event": {"id": e["alert_id"]}} for e in events]
+
+class FakeSender:
+    def __init__(self, gate=None, fail_after=None):
+        self.sent = []
+        self.gate = gate
+        self.fail_after = fail_after
+    def send_many(self, events):
+        if self.gate:
+            self.gate.wait()
+        if self.fail_after is not None:
+            events = events[:self.fail_after]
+        self.sent.extend(e["event"]["id"] for e in events)
+        return len(events)
+
+def batches(n, size=3):
+    for b in range(n):
+        yield [{"alert_id": f"{b}-{i}"} for i in range(size)]
+
+def test_pipeline_preserves_order():
+    sender = FakeSender()
+    pipeline = Pipeline(FakeMapper(), sender, queue_size=2)
+
+    assert pipeline.run(batches(5)) == 15
+    assert sender.sent == [f"{b}-{i}" for b in range(5) for i in range(3)]
+    assert pipeline.failed == 0
+
+def test_pipeline_counts_failed_sends():
+    pipeline = Pipeline(FakeMapper(), FakeSender(fail_after=1), queue_size=2)
+
+    assert pipeline.run(batches(2)) == 2
+    assert pipeline.failed == 4
+
+def test_slow_sender_applies_backpressure():
+    gate = threading.Event()
+    produced = []
+    def source():
+        for batch in batches(50):
+            produced.append(batch)
+            yield batch
+
+    pipeline = Pipeline(FakeMapper(), FakeSender(gate=gate), queue_size=1)
+    runner = threading.Thread(target=pipeline.run, args=(source(),))
+    runner.start()
+    threading.Event().wait(0.2)
+    # Sender is blocked: only a handful of batches can be in flight
+    assert len(produced) <= 5
+    gate.set()
+    runner.join(timeout=5)
+    assert len(produced) == 50
+
+def test_pipeline_dedups_before_mapping():
+    sender = FakeSender()
+    pipeline = Pipeline(FakeMapper(), sender, queue_size=2, dedup=DedupIndex())
+
+    pipeline.run(iter([[{"alert_id": "A"}], [{"alert_id": "A"}, {"alert_id": "B"}]]))
+    assert sender.sent == ["A", "B"]
+
+def test_pipeline_acknowledges_batches_in_order():
+    acks = []
+    source = list(batches(3))
+    pipeline = Pipeline(FakeMapper(), FakeSender(fail_after=2), queue_size=2,
+                        ack=lambda batch, shipped: acks.append((batch, shipped)))
+
+    pipeline.run(iter(source))
+    assert [batch for batch, _ in acks] == source
+    assert [shipped for _, shipped in acks] == [False, False, False]
+
+def test_pipeline_acknowledges_fully_deduped_batches():
+    acks = []
+    pipeline = Pipeline(FakeMapper(), FakeSender(), queue_size=2, dedup=DedupIndex(),
+                        ack=lambda batch, shipped: acks.append(shipped))
+
+    pipeline.run(iter([[{"alert_id": "A"}], [{"alert_id": "A"}]]))
+    assert acks == [True, True]
+
+def test_pipeline_records_only_shipped_events():
+    dedup = DedupIndex()
+    pipeline = Pipeline(FakeMapper(), FakeSender(fail_after=1), queue_size=2, dedup=dedup)
+
+    pipeline.run(iter([[{"alert_id": "A"}, {"alert_id": "B"}]]))
+    assert dedup.check([{"alert_id": "A"}, {"alert_id": "B"}]) == [{"alert_id": "B"}]
+
+def test_failed_http_delivery_is_acknowledged_unshipped():
+    import socket
+    from http_sender import HttpBulkSender
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    sender = HttpBulkSender({"http_output": {"url": f"http://127.0.0.1:{port}/_bulk", "max_retries": 0,
+                                             "codec": "json", "timeout": 2}})
+    acks = []
+    pipeline = Pipeline(FakeMapper(), sender, ack=lambda batch, shipped: acks.append(shipped))
+
+    assert pipeline.run(iter([[{"alert_id": "A"}]])) == 0
+    assert acks == [False]
+    assert sender.lost == 1
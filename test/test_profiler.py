@@ -0,0 +1,69 @@
+# test/test_profiler.py
+import json
+import os
+import pstats
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from cortex_ecs_mapper import CortexECSMapper
+from json_codec import get_codec
+from profiler import StageProfiler
+
+class FakeSender:
+    codec = get_codec("json")
+    def __init__(self):
+        self.written = []
+    def send_ndjson(self, data, count):
+        self.written.append(data)
+        return count
+    def send_chunks(self, chunks):
+        return sum(self.send_ndjson(data, count) for count, data in chunks)
+
+def test_nested_stages_are_accounted_separately():
+    profiler = StageProfiler().start()
+    try:
+        with profiler.stage("send"):
+            blobs = profiler.call("serialize", lambda: [bytes(100000) for _ in range(20)])
+        assert profiler.stats["send"].calls == 1 and profiler.stats["serialize"].calls == 1
+        # The serialize allocations are not charged to the enclosing send stage
+        assert profiler.stats["serialize"].allocated >= 2000000
+        assert profiler.stats["send"].allocated < 100000
+        assert profiler.active is None
+        del blobs
+    finally:
+        profiler.stop()
+
+def test_peak_falls_back_to_net_allocation_without_reset_peak(monkeypatch):
+    monkeypatch.setattr("profiler._reset_peak", None)
+    profiler = StageProfiler().start()
+    try:
+        blobs = profiler.call("map", lambda: [bytes(100000) for _ in range(20)])
+        assert profiler.stats["map"].peak >= 2000000
+        del blobs
+    finally:
+        profiler.stop()
+
+def test_instrumented_components_produce_report_and_pstats(tmp_path):
+    mapper, sender = CortexECSMapper(), FakeSender()
+    profiler = StageProfiler(top=5).start()
+    try:
+        profiler.instrument(mapper=mapper, sender=sender)
+        events = mapper.map_many([{"alert_id": str(i), "name": "scan", "creation_time": 1000} for i in range(50)])
+        assert sender.send_many(events) == 50
+        assert json.loads(sender.written[0].splitlines()[0])["event"]["id"] == "0"
+        report = profiler.write(tmp_path).read_text()
+    finally:
+        profiler.stop()
+    assert [profiler.stats[s].calls for s in ("fetch", "map", "serialize", "send")] == [0, 1, 1, 1]
+    assert "==== map ====" in report and "map_to_ecs" in report
+    assert not (tmp_path / "fetch.pstats").exists()
+    functions = {f[2] for f in pstats.Stats(str(tmp_path / "profile.pstats")).stats}
+    assert "map_to_ecs" in functions and "send_ndjson" in functions
+
+def test_chunks_profile_fetch_map_and_serialize():
+    profiler = StageProfiler()
+    pages = [[{"id": 1}, {"id": 2}], [{"id": 3}]]
+    sent = profiler.call("send", FakeSender().send_chunks,
+                         profiler.chunks(pages, lambda page: [{"n": d["id"]} for d in page], get_codec("json").dumps))
+    assert sent == 3
+    assert [profiler.stats[s].calls for s in ("fetch", "map", "serialize", "send")] == [3, 2, 2, 1]
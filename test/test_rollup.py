@@ -0,0 +1,108 @@
+# test/test_rollup.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from pipeline import Pipeline
+from rollup import RollupAggregator
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+def alert(i, host="h1", severity="low"):
+    return {"@timestamp": f"2025-01-01T00:00:{i:02d}+00:00", "tags": ["cortex-xdr"],
+            "event": {"id": f"A{i}", "action": "Port scan", "severity": severity}, "host": {"name": host}}
+
+def test_tumbling_window_summarizes_group():
+    clock = Clock()
+    agg = RollupAggregator(key=["event.action", "host.name"], window=10, max_samples=2, clock=clock)
+    assert agg.process([alert(i) for i in range(5)] + [alert(9, host="h2")]) == []
+    clock.now = 10
+    summary, single = agg.expire()
+    assert summary["event"]["count"] == 5
+    assert (summary["event"]["start"], summary["event"]["end"]) == (alert(0)["@timestamp"], alert(4)["@timestamp"])
+    assert summary["panw"]["cortex_xdr"]["rollup"]["sample_ids"] == ["A0", "A1"]
+    assert "rollup" in summary["tags"]
+    assert single == alert(9, host="h2")
+    assert agg.groups == {}
+
+def test_high_severity_passes_through_and_state_is_bounded():
+    agg = RollupAggregator(key=["host.name"], window=10, max_groups=2, clock=Clock())
+    assert agg.process([alert(1, severity="high")]) == [alert(1, severity="high")]
+    out = agg.process([alert(2, host="a"), alert(3, host="b"), alert(4, host="c")])
+    assert out == [alert(2, host="a")]
+    assert len(agg.groups) == 2
+
+def test_sliding_window_extends_until_max():
+    clock = Clock()
+    agg = RollupAggregator(key=["host.name"], window=10, mode="sliding", max_window=25, clock=clock)
+    for t in (0, 8, 16, 24):
+        clock.now = t
+        assert agg.process([alert(t)]) == []
+    clock.now = 25
+    (summary,) = agg.expire()
+    assert summary["event"]["count"] == 4
+
+def test_sliding_window_expires_capped_group_behind_newer_updates():
+    clock = Clock()
+    agg = RollupAggregator(key=["host.name"], window=10, mode="sliding", max_window=20, clock=clock)
+    for t, host in ((0, "busy"), (8, "busy"), (15, "quiet"), (16, "busy")):
+        clock.now = t
+        agg.process([alert(t, host=host)])
+    # "busy" hits max_window at 20, before "quiet" (updated earlier) closes at 25
+    clock.now = 20
+    (summary,) = agg.expire()
+    assert summary["host"]["name"] == "busy" and summary["event"]["count"] == 3
+    assert list(agg.groups) == [("quiet",)]
+
+def test_summary_keeps_existing_panw_fields():
+    agg = RollupAggregator(key=["host.name"], window=10, clock=Clock())
+    events = [dict(alert(i), panw={"cortex_xdr": {"incident_id": "7"}, "other": 1}) for i in range(2)]
+    agg.process(events)
+    (summary,) = agg.flush()
+    assert summary["panw"]["other"] == 1
+    assert summary["panw"]["cortex_xdr"]["incident_id"] == "7"
+    assert summary["panw"]["cortex_xdr"]["rollup"]["sample_ids"] == ["A0", "A1"]
+    assert "rollup" not in events[0]["panw"]["cortex_xdr"]
+
+def test_pipeline_flushes_rollups_on_stop():
+    class Mapper:
+        def map_many(self, events):
+            return [alert(e["i"]) for e in events]
+    class Sender:
+        def __init__(self):
+            self.sent = []
+        def send_many(self, events):
+            self.sent.extend(events)
+            return len(events)
+    sender = Sender()
+    pipeline = Pipeline(Mapper(), sender, aggregator=RollupAggregator(key=["host.name"], window=60))
+    assert pipeline.run([[{"i": i} for i in range(3)], [{"i": 3}]]) == 1
+    assert sender.sent[0]["event"]["count"] == 4
+
+def test_pipeline_acknowledges_absorbed_batches_after_their_summary():
+    from dedup import DedupIndex
+    class Mapper:
+        def map_many(self, events):
+            return [alert(e["i"]) for e in events]
+    class Sender:
+        def __init__(self, ok):
+            self.ok, self.sent = ok, []
+        def send_many(self, events):
+            if not self.ok:
+                return 0
+            self.sent.extend(events)
+            return len(events)
+    for ok in (True, False):
+        sender = Sender(ok)
+        dedup = DedupIndex()
+        acks = []
+        pipeline = Pipeline(Mapper(), sender, dedup=dedup, aggregator=RollupAggregator(key=["host.name"], window=60),
+                            ack=lambda batch, shipped: acks.append((len(sender.sent), shipped)))
+        pipeline.run([[{"alert_id": "A", "i": 0}], [{"alert_id": "B", "i": 1}]])
+        # Both batches wait for the summary of the group holding their events
+        assert acks == ([(1, True), (1, True)] if ok else [(0, False), (0, False)])
+        assert dedup.stats()["size"] == (2 if ok else 0)
@@ -0,0 +1,21 @@
+# test/test_scheduler.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from scheduler import AdaptivePollScheduler
+
+def test_backlog_polls_right_away_then_regular_interval():
+    scheduler = AdaptivePollScheduler(interval=60, min_interval=1, max_interval=300)
+    assert scheduler.next_delay(1000, backlog=True) == 1
+    assert scheduler.next_delay(40) == 60
+
+def test_empty_polls_back_off_to_max():
+    scheduler = AdaptivePollScheduler(interval=60, max_interval=300, backoff=2)
+    assert [scheduler.next_delay(0) for _ in range(4)] == [120, 240, 300, 300]
+    assert scheduler.next_delay(5) == 60
+
+def test_from_settings_defaults_to_fixed_interval():
+    scheduler = AdaptivePollScheduler.from_settings({"polling_interval": 30})
+    assert scheduler.next_delay(0) == 30
+    assert scheduler.next_delay(10) == 30
@@ -0,0 +1,52 @@
+# test/test_spool.py
+import os
+import sys
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from spool import Spool
+
+def records(n, start=0):
+    return [f'{{"n": {i}}}\n'.encode() for i in range(start, start + n)]
+
+def test_append_rotate_and_drain_in_order(tmp_path):
+    spool = Spool(tmp_path, segment_bytes=20)
+    assert spool.append(records(3)) == 3
+    assert spool.append(records(3, 3)) == 3
+    assert len(spool.segments) == 2
+
+    written = []
+    assert spool.drain(written.append, chunk_bytes=16) == sum(map(len, records(6)))
+    assert b"".join(written) == b"".join(records(6))
+    assert spool.empty()
+    assert list(tmp_path.glob("*.seg")) == []
+
+def test_failed_drain_resumes_from_offset(tmp_path):
+    spool = Spool(tmp_path)
+    spool.append(records(4))
+
+    written = []
+    def flaky(chunk):
+        if written:
+            raise OSError("logstash down")
+        written.append(chunk)
+    with pytest.raises(OSError):
+        spool.drain(flaky, chunk_bytes=20)
+
+    # A new process picks up after the last written chunk
+    rest = []
+    Spool(tmp_path).drain(rest.append)
+    assert b"".join(written + rest) == b"".join(records(4))
+
+def test_bounded_size_policies(tmp_path):
+    oldest = Spool(tmp_path / "oldest", segment_bytes=9, max_bytes=20)
+    for i in range(4):
+        oldest.append(records(1, i))
+    out = []
+    oldest.drain(out.append)
+    assert b"".join(out) == b"".join(records(2, 2))
+    assert oldest.dropped > 0
+
+    newest = Spool(tmp_path / "newest", max_bytes=20, policy="drop_newest")
+    assert newest.append(records(1)) == 1
+    assert newest.append(records(2, 1)) == 0
@@ -0,0 +1,76 @@
+# test/test_tenant_poller.py
+import os
+import sys
+import threading
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from adapters.cortex_xdr import apply_mapping
+from dedup import DedupIndex, event_key
+from metrics import Metrics
+from tenant_poller import TenantPoller, tenant_configs
+
+class FakeClient:
+    def __init__(self, name, pages):
+        self.name = name
+        self.pages = list(pages)
+        self.has_more = {}
+        self.calls = 0
+    def get_alerts(self, max_results=100):
+        self.calls += 1
+        return self.pages.pop(0) if self.pages else []
+
+class FakePipeline:
+    dedup = None
+    def __init__(self):
+        self.stop_event = threading.Event()
+    def wait(self, timeout):
+        return self.stop_event.wait(timeout)
+
+def test_tenant_configs_override_shared_cortex_block():
+    config = {"cortex": {"url": "https://shared", "api": {"retries": 2, "rate_limit": 10}},
+              "tenants": [{"name": "acme", "api_key": "a", "api": {"rate_limit": 5}}, {"name": "globex"}]}
+    configs = tenant_configs(config)
+    assert configs["acme"]["cortex"]["tenant"] == "acme"
+    assert configs["acme"]["cortex"]["api"] == {"retries": 2, "rate_limit": 5}
+    assert configs["globex"]["cortex"]["url"] == "https://shared"
+
+def test_polls_every_tenant_on_the_shared_pool():
+    clients = {"acme": FakeClient("acme", [[{"alert_id": "a1"}], [{"alert_id": "a2"}]]),
+               "globex": FakeClient("globex", [[{"alert_id": "g1"}]])}
+    pipeline = FakePipeline()
+    config = {"settings": {"polling_interval": 0.01, "max_polling_interval": 0.01, "tenant_workers": 2}}
+    seen = []
+    for batch in TenantPoller(clients, config, pipeline).batches():
+        seen.extend(e["alert_id"] for e in batch)
+        if len(seen) == 3:
+            pipeline.stop_event.set()
+    assert sorted(seen) == ["a1", "a2", "g1"]
+    assert seen.index("a1") < seen.index("a2")
+
+def test_tenant_tag_reaches_ecs_and_dedup_keys():
+    doc = {"alert_id": "1", "creation_time": 5, "_tenant": "acme"}
+    out = apply_mapping(doc, {"mappings": {"event.id": "alert_id"}})
+    assert out["tenant"] == "acme" and "_tenant" not in out["panw.cortex_xdr.raw"]
+    assert event_key(doc) != event_key({"alert_id": "1", "creation_time": 5, "_tenant": "globex"})
+
+def test_stops_after_cycles_per_tenant():
+    clients = {"acme": FakeClient("acme", [[{"alert_id": "a1"}]] * 5),
+               "globex": FakeClient("globex", [])}
+    config = {"settings": {"polling_interval": 0, "min_polling_interval": 0}}
+    batches = list(TenantPoller(clients, config, FakePipeline()).batches(cycles=2))
+    assert len(batches) == 4
+    assert clients["acme"].calls == 2 and clients["globex"].calls == 2
+
+def test_dedup_hits_and_misses_are_exported_as_counters():
+    dedup = DedupIndex()
+    pipeline = FakePipeline()
+    pipeline.dedup = dedup
+    metrics = Metrics()
+    poller = TenantPoller({"acme": FakeClient("acme", [])}, {"settings": {}}, pipeline, metrics)
+
+    dedup.filter([{"alert_id": "a1"}, {"alert_id": "a1"}])
+    poller._record("acme", 2, 1.0, 0.1)
+    dedup.filter([{"alert_id": "a1"}])
+    poller._record("acme", 1, 1.0, 0.1)
+    assert metrics.counters[("dedup_hits_total", ())] == 2
+    assert metrics.counters[("dedup_misses_total", ())] == 1